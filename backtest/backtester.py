@@ -0,0 +1,145 @@
+import contextlib
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+from backtest.broker import SimulatedBroker
+from backtest.data import load_bars
+from strategy_manager import StrategyManager, default_strategies
+from trader import Trader
+
+
+class Backtester:
+    """
+    Reproduce un histórico a través del mismo camino de decisión que el bot
+    en vivo: StrategyManager (señales) → Decider → should_trade /
+    close_on_signal_change → Trader.calculate_volume / send_order, contra un
+    SimulatedBroker con SL/TP, spread y slippage.
+
+    - Las señales de todas las velas se calculan de una vez con
+      StrategyManager.generate_signal_table (la fila i es idéntica a evaluar
+      las velas 0..i).
+    - El Decider resuelve todas las filas juntas (resolve_signal_table);
+      con un ModelDecider es una sola predicción para todo el histórico.
+    - La decisión se toma al cierre de la vela i y la orden se ejecuta a la
+      apertura de la vela i+1. En vivo la vela en formación también entra en
+      el cálculo, así que en el backtest la última vela siempre es una vela
+      cerrada.
+    - SL/TP se revisan con el high/low de cada vela después de ejecutar.
+    """
+
+    def __init__(self, strategies=None, symbol="USDCAD", capital=1000, risk_pct=1, sl_pips=30, tp_pips=60,
+                 spread_points=15, slippage_points=0, point=0.00001, digits=5, contract_size=100_000,
+                 verbose=False, decider=None):
+        self.strategies = strategies if strategies is not None else default_strategies()
+        self.decider = decider
+        self.symbol = symbol
+        self.capital = capital
+        self.risk_pct = risk_pct
+        self.sl_pips = sl_pips
+        self.tp_pips = tp_pips
+        self.broker_args = dict(point=point, digits=digits, contract_size=contract_size,
+                                spread_points=spread_points, slippage_points=slippage_points)
+        self.verbose = verbose
+
+    def run(self, df, max_drawdown=None):
+        """
+        Ejecuta el backtest sobre un DataFrame con columnas time, open, high,
+        low, close, volume. Devuelve un dict con trades, equity y métricas.
+
+        Si el drawdown realizado supera `max_drawdown` la corrida se corta ahí
+        (métrica "pruned"), para descartar rápido combinaciones perdedoras.
+        """
+        df = df.reset_index(drop=True)
+        start = time.perf_counter()
+
+        broker = SimulatedBroker(self.symbol, **self.broker_args)
+        trader = Trader(self.symbol, broker=broker)
+        manager = StrategyManager(self.strategies, trader=trader, decider=self.decider)
+
+        table = manager.generate_signal_table(df)
+        decisions = manager.resolve_signal_table(table, df)
+        times = df["time"].to_numpy()
+        opens = df["open"].to_numpy(dtype=float)
+        highs = df["high"].to_numpy(dtype=float)
+        lows = df["low"].to_numpy(dtype=float)
+
+        balance = peak = self.capital
+        closed = 0
+        pruned = False
+        bars = len(df)
+
+        # Los prints del camino en vivo se silencian salvo en modo verbose
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(sys.stdout if self.verbose else devnull):
+            for i in range(len(df) - 1):
+                nxt = i + 1
+                broker.set_tick(times[nxt], opens[nxt])
+
+                current_signal = decisions[i]
+                manager.close_on_signal_change(current_signal)
+
+                if manager.should_trade(current_signal) and not broker.positions_get(symbol=self.symbol):
+                    vol = trader.calculate_volume(self.capital, self.risk_pct, self.sl_pips)
+                    trader.send_order(current_signal, vol, self.sl_pips, self.tp_pips)
+
+                broker.check_stops(opens[nxt], highs[nxt], lows[nxt])
+
+                if max_drawdown is not None and len(broker.trades) > closed:
+                    for trade in broker.trades[closed:]:
+                        balance += trade["pnl"]
+                        peak = max(peak, balance)
+                    closed = len(broker.trades)
+                    if peak - balance > max_drawdown:
+                        pruned = True
+                        bars = nxt + 1
+                        break
+
+            if len(df):
+                broker.set_tick(times[bars - 1], float(df["close"].iloc[bars - 1]))
+                broker.close_all()
+
+        trades = pd.DataFrame(broker.trades, columns=[
+            "ticket", "type", "volume", "open_time", "open_price", "close_time", "close_price", "reason", "pnl"
+        ])
+        equity = self.capital + trades["pnl"].cumsum()
+        equity.index = trades["close_time"]
+        return {
+            "trades": trades,
+            "equity": equity,
+            "metrics": {**self.metrics(trades, bars, time.perf_counter() - start), "pruned": pruned},
+        }
+
+    def metrics(self, trades, bars, elapsed):
+        pnl = trades["pnl"].to_numpy(dtype=float)
+        equity = self.capital + np.cumsum(pnl)
+        peaks = np.maximum.accumulate(np.r_[self.capital, equity])
+        drawdown = (peaks - np.r_[self.capital, equity]).max() if len(pnl) else 0.0
+        gains = pnl[pnl > 0].sum()
+        losses = -pnl[pnl < 0].sum()
+        return {
+            "bars": bars,
+            "trades": len(pnl),
+            "pnl": float(pnl.sum()),
+            "final_equity": float(equity[-1]) if len(pnl) else float(self.capital),
+            "hit_rate": float((pnl > 0).mean()) if len(pnl) else 0.0,
+            "profit_factor": float(gains / losses) if losses else float("inf") if gains else 0.0,
+            "max_drawdown": float(drawdown),
+            "seconds": round(elapsed, 2),
+        }
+
+
+if __name__ == "__main__":
+    # Uso: python backtest/backtester.py velas_USDCAD_M5.csv
+    path = sys.argv[1] if len(sys.argv) > 1 else "data_generator/datos_etiquetados.csv"
+    result = Backtester().run(load_bars(path))
+    print("📈 Resultado del backtest:")
+    for key, value in result["metrics"].items():
+        print(f"  - {key}: {value}")
+    result["trades"].to_csv("backtest_trades.csv", index=False)
+    print("💾 Trades guardados en backtest_trades.csv")
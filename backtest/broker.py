@@ -0,0 +1,186 @@
+import itertools
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import numpy as np
+
+# Constantes con los mismos valores que el paquete MetaTrader5
+ORDER_TYPE_BUY = 0
+ORDER_TYPE_SELL = 1
+ORDER_FILLING_FOK = 0
+ORDER_FILLING_IOC = 1
+ORDER_FILLING_RETURN = 2
+ORDER_TIME_GTC = 0
+TRADE_ACTION_DEAL = 1
+TRADE_RETCODE_PLACED = 10008
+TRADE_RETCODE_DONE = 10009
+TRADE_RETCODE_INVALID = 10013
+DEAL_TYPE_BUY = 0
+DEAL_TYPE_SELL = 1
+DEAL_ENTRY_IN = 0
+DEAL_ENTRY_OUT = 1
+DEAL_REASON_EXPERT = 3
+DEAL_REASON_SL = 4
+DEAL_REASON_TP = 5
+
+
+class SimulatedBroker:
+    """
+    Broker simulado con la misma interfaz que el módulo MetaTrader5 para las
+    funciones que usa Trader (symbol_info, symbol_info_tick, order_send,
+    positions_get, history_deals_get). Se le pasa como `broker` a Trader.
+
+    - Las velas históricas son bid; el ask es bid + `spread_points`.
+    - Las órdenes a mercado se llenan al precio del tick actual (apertura de
+      la vela) con `slippage_points` en contra.
+    - SL/TP se evalúan con el high/low de cada vela. Si ambos se tocan en la
+      misma vela se asume el SL; si la vela abre más allá del nivel, se llena
+      a la apertura (gap).
+    """
+
+    ORDER_TYPE_BUY = ORDER_TYPE_BUY
+    ORDER_TYPE_SELL = ORDER_TYPE_SELL
+    ORDER_FILLING_FOK = ORDER_FILLING_FOK
+    ORDER_FILLING_IOC = ORDER_FILLING_IOC
+    ORDER_FILLING_RETURN = ORDER_FILLING_RETURN
+    ORDER_TIME_GTC = ORDER_TIME_GTC
+    TRADE_ACTION_DEAL = TRADE_ACTION_DEAL
+    TRADE_RETCODE_PLACED = TRADE_RETCODE_PLACED
+    TRADE_RETCODE_DONE = TRADE_RETCODE_DONE
+    TRADE_RETCODE_INVALID = TRADE_RETCODE_INVALID
+    DEAL_ENTRY_IN = DEAL_ENTRY_IN
+    DEAL_ENTRY_OUT = DEAL_ENTRY_OUT
+
+    def __init__(self, symbol, point=0.00001, digits=5, contract_size=100_000,
+                 spread_points=15, slippage_points=0, tickets=None):
+        self.symbol = symbol
+        self.info = SimpleNamespace(
+            name=symbol, point=point, digits=digits, trade_contract_size=contract_size,
+            filling_mode=3, spread=spread_points,  # SYMBOL_FILLING_FOK | SYMBOL_FILLING_IOC
+        )
+        self.spread = spread_points * point
+        self.slippage = slippage_points * point
+        self.time = None
+        self.bid = None
+        self.positions = {}
+        self.trades = []
+        self.deals = []
+        self._tickets = tickets or itertools.count(1)  # se comparte entre brokers de varios símbolos
+
+    # === Interfaz compatible con MetaTrader5 ===
+    def symbol_info(self, symbol):
+        return self.info if symbol == self.symbol else None
+
+    def symbol_info_tick(self, symbol):
+        if symbol != self.symbol or self.bid is None:
+            return None
+        return SimpleNamespace(time=self.time, bid=self.bid, ask=self.bid + self.spread)
+
+    def positions_get(self, symbol=None):
+        if symbol is not None and symbol != self.symbol:
+            return ()
+        return tuple(self.positions.values())
+
+    def history_deals_get(self, date_from=None, date_to=None, group=None, ticket=None, position=None):
+        """Deals (aperturas y cierres) entre `date_from` y `date_to`, o de una orden / posición."""
+        deals = self.deals
+        if ticket is not None:
+            return tuple(d for d in deals if d.order == ticket)
+        if position is not None:
+            return tuple(d for d in deals if d.position_id == position)
+        lo = -np.inf if date_from is None else _seconds(date_from)
+        hi = np.inf if date_to is None else _seconds(date_to)
+        return tuple(d for d in deals if lo <= d.time <= hi)
+
+    def order_send(self, request):
+        if request.get("symbol") != self.symbol or request.get("volume", 0) <= 0:
+            return self._result(TRADE_RETCODE_INVALID, request, 0.0, 0, "Invalid request")
+
+        is_buy = request["type"] == ORDER_TYPE_BUY
+        price = (self.bid + self.spread + self.slippage) if is_buy else (self.bid - self.slippage)
+
+        if "position" in request:
+            pos = self.positions.get(request["position"])
+            if pos is None:
+                return self._result(TRADE_RETCODE_INVALID, request, 0.0, 0, "Position not found")
+            self._close(pos, price, "signal")
+            return self._result(TRADE_RETCODE_DONE, request, price, pos.ticket)
+
+        ticket = next(self._tickets)
+        self.positions[ticket] = SimpleNamespace(
+            ticket=ticket, symbol=self.symbol, type=request["type"], volume=request["volume"],
+            price_open=price, sl=request.get("sl", 0.0), tp=request.get("tp", 0.0), time=self.time,
+        )
+        self._deal(ticket, ticket, request["type"], DEAL_ENTRY_IN, request["volume"], price, DEAL_REASON_EXPERT)
+        return self._result(TRADE_RETCODE_DONE, request, price, ticket)
+
+    # === Simulación ===
+    def set_tick(self, time, bid):
+        self.time = time
+        self.bid = bid
+
+    def check_stops(self, open_, high, low):
+        """Cierra las posiciones cuyo SL o TP se alcanzó dentro de la vela."""
+        for pos in list(self.positions.values()):
+            if pos.type == ORDER_TYPE_BUY:
+                # Una compra se cierra vendiendo al bid
+                if pos.sl and low <= pos.sl:
+                    self._close(pos, min(open_, pos.sl) - self.slippage, "sl")
+                elif pos.tp and high >= pos.tp:
+                    self._close(pos, max(open_, pos.tp), "tp")
+            else:
+                # Una venta se cierra comprando al ask
+                ask_open, ask_high, ask_low = open_ + self.spread, high + self.spread, low + self.spread
+                if pos.sl and ask_high >= pos.sl:
+                    self._close(pos, max(ask_open, pos.sl) + self.slippage, "sl")
+                elif pos.tp and ask_low <= pos.tp:
+                    self._close(pos, min(ask_open, pos.tp), "tp")
+
+    def close_all(self, reason="end"):
+        for pos in list(self.positions.values()):
+            price = self.bid if pos.type == ORDER_TYPE_BUY else self.bid + self.spread
+            self._close(pos, price, reason)
+
+    def _close(self, pos, price, reason):
+        direction = 1 if pos.type == ORDER_TYPE_BUY else -1
+        pnl = direction * (price - pos.price_open) * pos.volume * self.info.trade_contract_size
+        self.trades.append({
+            "ticket": pos.ticket,
+            "type": "buy" if pos.type == ORDER_TYPE_BUY else "sell",
+            "volume": pos.volume,
+            "open_time": pos.time,
+            "open_price": pos.price_open,
+            "close_time": self.time,
+            "close_price": price,
+            "reason": reason,
+            "pnl": pnl,
+        })
+        del self.positions[pos.ticket]
+        reasons = {"sl": DEAL_REASON_SL, "tp": DEAL_REASON_TP}
+        # El cierre por señal lleva el número de orden devuelto por order_send; SL/TP, uno nuevo
+        order = pos.ticket if reason not in reasons else next(self._tickets)
+        deal_type = DEAL_TYPE_SELL if pos.type == ORDER_TYPE_BUY else DEAL_TYPE_BUY
+        self._deal(order, pos.ticket, deal_type, DEAL_ENTRY_OUT, pos.volume, price,
+                   reasons.get(reason, DEAL_REASON_EXPERT), pnl)
+
+    def _deal(self, order, position_id, deal_type, entry, volume, price, reason, profit=0.0):
+        self.deals.append(SimpleNamespace(
+            ticket=next(self._tickets), order=order, position_id=position_id, symbol=self.symbol,
+            time=_seconds(self.time) if self.time is not None else 0, type=deal_type, entry=entry,
+            volume=volume, price=price, reason=reason, profit=profit,
+        ))
+
+    def _result(self, retcode, request, price, order, comment="Request executed"):
+        return SimpleNamespace(
+            retcode=retcode, price=price, order=order, volume=request.get("volume", 0.0),
+            comment=comment, request=SimpleNamespace(**request),
+        )
+
+
+def _seconds(value):
+    """Epoch en segundos de un datetime, datetime64 o número."""
+    if isinstance(value, datetime):
+        return int((value if value.tzinfo else value.replace(tzinfo=timezone.utc)).timestamp())
+    if isinstance(value, np.datetime64):
+        return int(value.astype("datetime64[s]").astype("int64"))
+    return int(value)
@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+
+# Mismo formato que devuelve MetaTrader5.copy_rates_*
+RATE_DTYPE = np.dtype([
+    ("time", "<i8"),
+    ("open", "<f8"),
+    ("high", "<f8"),
+    ("low", "<f8"),
+    ("close", "<f8"),
+    ("tick_volume", "<u8"),
+    ("spread", "<i4"),
+    ("real_volume", "<u8"),
+])
+
+
+def load_bars(path):
+    """Lee velas desde CSV (o Parquet) con columnas time, open, high, low, close, volume."""
+    df = pd.read_parquet(path) if str(path).endswith(".parquet") else pd.read_csv(path)
+    if "tick_volume" in df.columns and "volume" not in df.columns:
+        df = df.rename(columns={"tick_volume": "volume"})
+    if not pd.api.types.is_datetime64_any_dtype(df["time"]):
+        numeric = pd.api.types.is_numeric_dtype(df["time"])
+        df["time"] = pd.to_datetime(df["time"], unit="s" if numeric else None)
+    return df
+
+
+def bars_to_rates(df):
+    """Convierte un DataFrame de velas al array de MT5 (time en epoch, tick_volume...)."""
+    rates = np.zeros(len(df), dtype=RATE_DTYPE)
+    rates["time"] = df["time"].to_numpy().astype("datetime64[s]").astype("int64")
+    for field in ("open", "high", "low", "close"):
+        rates[field] = df[field].to_numpy()
+    rates["tick_volume"] = df["volume"].to_numpy() if "volume" in df.columns else 0
+    for field in ("spread", "real_volume"):
+        if field in df.columns:
+            rates[field] = df[field].to_numpy()
+    return rates
@@ -0,0 +1,390 @@
+import itertools
+import random
+import sys
+import threading
+import time
+import types
+from collections import Counter
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import numpy as np
+
+from backtest import broker as _broker
+from backtest.broker import SimulatedBroker
+from backtest.data import RATE_DTYPE, bars_to_rates, load_bars
+
+# Constantes con los mismos valores que el paquete MetaTrader5
+TIMEFRAME_M1 = 1
+TIMEFRAME_M5 = 5
+TIMEFRAME_M15 = 15
+TIMEFRAME_M30 = 30
+TIMEFRAME_H1 = 16385
+TIMEFRAME_H4 = 16388
+TIMEFRAME_D1 = 16408
+COPY_TICKS_ALL = -1
+TRADE_RETCODE_REQUOTE = 10004
+TRADE_RETCODE_REJECT = 10006
+TRADE_RETCODE_PRICE_CHANGED = 10020
+RES_E_INTERNAL_FAIL = -10001
+
+CONSTANTS = {
+    "TIMEFRAME_M1": TIMEFRAME_M1, "TIMEFRAME_M5": TIMEFRAME_M5, "TIMEFRAME_M15": TIMEFRAME_M15,
+    "TIMEFRAME_M30": TIMEFRAME_M30, "TIMEFRAME_H1": TIMEFRAME_H1, "TIMEFRAME_H4": TIMEFRAME_H4,
+    "TIMEFRAME_D1": TIMEFRAME_D1, "COPY_TICKS_ALL": COPY_TICKS_ALL,
+    "ORDER_TYPE_BUY": _broker.ORDER_TYPE_BUY, "ORDER_TYPE_SELL": _broker.ORDER_TYPE_SELL,
+    "ORDER_FILLING_FOK": _broker.ORDER_FILLING_FOK, "ORDER_FILLING_IOC": _broker.ORDER_FILLING_IOC,
+    "ORDER_FILLING_RETURN": _broker.ORDER_FILLING_RETURN, "ORDER_TIME_GTC": _broker.ORDER_TIME_GTC,
+    "TRADE_ACTION_DEAL": _broker.TRADE_ACTION_DEAL, "TRADE_RETCODE_REQUOTE": TRADE_RETCODE_REQUOTE,
+    "TRADE_RETCODE_REJECT": TRADE_RETCODE_REJECT, "TRADE_RETCODE_PLACED": _broker.TRADE_RETCODE_PLACED,
+    "TRADE_RETCODE_DONE": _broker.TRADE_RETCODE_DONE, "TRADE_RETCODE_INVALID": _broker.TRADE_RETCODE_INVALID,
+    "TRADE_RETCODE_PRICE_CHANGED": TRADE_RETCODE_PRICE_CHANGED,
+    "DEAL_TYPE_BUY": _broker.DEAL_TYPE_BUY, "DEAL_TYPE_SELL": _broker.DEAL_TYPE_SELL,
+    "DEAL_ENTRY_IN": _broker.DEAL_ENTRY_IN, "DEAL_ENTRY_OUT": _broker.DEAL_ENTRY_OUT,
+    "DEAL_REASON_EXPERT": _broker.DEAL_REASON_EXPERT, "DEAL_REASON_SL": _broker.DEAL_REASON_SL,
+    "DEAL_REASON_TP": _broker.DEAL_REASON_TP,
+}
+
+TIMEFRAME_SECONDS = {
+    TIMEFRAME_M1: 60,
+    TIMEFRAME_M5: 5 * 60,
+    TIMEFRAME_M15: 15 * 60,
+    TIMEFRAME_M30: 30 * 60,
+    TIMEFRAME_H1: 60 * 60,
+    TIMEFRAME_H4: 4 * 60 * 60,
+    TIMEFRAME_D1: 24 * 60 * 60,
+}
+
+# Funciones de MetaTrader5 que expone el simulador
+API = (
+    "initialize", "login", "shutdown", "last_error", "version", "account_info",
+    "symbol_info", "symbol_info_tick", "copy_rates_from_pos", "copy_rates_range", "copy_ticks_from",
+    "positions_get", "order_send", "history_deals_get",
+)
+
+
+class ReplayFinished(SystemExit):
+    """Se lanza desde sleep() cuando el reloj simulado pasa la última vela grabada."""
+
+
+class MT5Simulator:
+    """
+    Reemplazo local de MetaTrader5 que sirve velas grabadas (CSV/Parquet) y
+    ejecuta órdenes contra un SimulatedBroker por símbolo, para correr el bot
+    completo sin terminal.
+
+    - Reloj simulado: clock() avanza con el tiempo real de cómputo y sleep()
+      salta el tiempo sin esperar, así que un día de M5 se reproduce en
+      segundos y las mediciones de latencia reflejan sólo el cómputo y la
+      latencia inyectada.
+    - La vela en formación se ve como recién abierta (open = high = low =
+      close), igual que al despertar justo después de un cierre.
+    - Timeframes mayores que el grabado se arman agregando velas.
+    - `latency` (segundos, o (min, max) para un valor al azar) se inyecta con
+      una espera real en cada llamada; `reject_rate` rechaza esa fracción de
+      order_send con `reject_retcode`, y `error_rate` hace fallar esa fracción
+      de las lecturas de velas (devuelven None, como el terminal). Todo el azar
+      sale de `seed`, así que dos corridas con los mismos datos son idénticas.
+    """
+
+    def __init__(self, data, timeframe=TIMEFRAME_M5, start=None, warmup=300, latency=0.0,
+                 reject_rate=0.0, reject_retcode=TRADE_RETCODE_REQUOTE, error_rate=0.0, seed=0,
+                 spread_points=15, slippage_points=0, symbols=None):
+        self.timeframe = timeframe
+        self.period = TIMEFRAME_SECONDS[timeframe]
+        self.latency = latency
+        self.reject_rate = reject_rate
+        self.reject_retcode = reject_retcode
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.calls = Counter()
+        self.rejected = 0
+        self.failed = 0
+        self._lock = threading.RLock()
+        self._error = (1, "Success")
+
+        # Velas por símbolo en el formato de copy_rates_* y broker simulado
+        self.rates = {}
+        self.brokers = {}
+        self._checked = {}  # símbolo -> velas ya revisadas para SL/TP
+        self._resampled = {}
+        tickets = itertools.count(1)
+        symbols = symbols or {}
+        for symbol, source in data.items():
+            self.rates[symbol] = self._load(source)
+            params = dict(spread_points=spread_points, slippage_points=slippage_points)
+            if "JPY" in symbol:
+                params.update(point=0.001, digits=3)
+            params.update(symbols.get(symbol, {}))
+            self.brokers[symbol] = SimulatedBroker(symbol, tickets=tickets, **params)
+            self._checked[symbol] = 0
+
+        first = max(int(r["time"][min(warmup, len(r) - 1)]) for r in self.rates.values())
+        self.start = first if start is None else _epoch(start)
+        self.end = max(int(r["time"][-1]) for r in self.rates.values()) + self.period
+        self._offset = self.start - time.perf_counter()
+
+    # === Reloj simulado (para BarCloseScheduler) ===
+    def clock(self):
+        return self._offset + time.perf_counter()
+
+    def sleep(self, seconds):
+        if self.clock() >= self.end:
+            self.print_report()
+            raise ReplayFinished(0)
+        if seconds > 0:
+            with self._lock:
+                self._offset += seconds
+
+    # === API de MetaTrader5 ===
+    def initialize(self, *args, **kwargs):
+        return self._call("initialize", lambda: True)
+
+    def login(self, *args, **kwargs):
+        return self._call("login", lambda: True)
+
+    def shutdown(self):
+        return self._call("shutdown", lambda: None)
+
+    def last_error(self):
+        return self._error
+
+    def version(self):
+        return (500, 0, "simulator")
+
+    def account_info(self):
+        def account():
+            balance = sum(t["pnl"] for b in self.brokers.values() for t in b.trades)
+            return SimpleNamespace(login=0, balance=balance, equity=balance, currency="USD", server="simulator")
+        return self._call("account_info", account)
+
+    def symbol_info(self, symbol):
+        def info():
+            broker = self.brokers.get(symbol)
+            return broker.symbol_info(symbol) if broker else self._fail(f"Unknown symbol {symbol}")
+        return self._call("symbol_info", info)
+
+    def symbol_info_tick(self, symbol):
+        def tick():
+            if symbol not in self.brokers:
+                return self._fail(f"Unknown symbol {symbol}")
+            self._sync(symbol)
+            return self.brokers[symbol].symbol_info_tick(symbol)
+        return self._call("symbol_info_tick", tick)
+
+    def copy_rates_from_pos(self, symbol, timeframe, start_pos, count):
+        def rates():
+            visible = self._visible(symbol, timeframe)
+            if visible is None:
+                return None
+            hi = max(visible[1] - start_pos, 0)
+            return self._take(*visible, max(hi - count, 0), hi)
+        return self._call("copy_rates_from_pos", rates, data=True)
+
+    def copy_rates_range(self, symbol, timeframe, date_from, date_to):
+        def rates():
+            visible = self._visible(symbol, timeframe)
+            if visible is None:
+                return None
+            series, end, _ = visible
+            lo = np.searchsorted(series["time"][:end], _epoch(date_from), side="left")
+            hi = np.searchsorted(series["time"][:end], _epoch(date_to), side="right")
+            return self._take(*visible, lo, hi)
+        return self._call("copy_rates_range", rates, data=True)
+
+    def copy_ticks_from(self, symbol, date_from, count, flags):
+        # Sin ticks grabados: el modo streaming no se puede reproducir
+        return self._call("copy_ticks_from", lambda: self._fail("Ticks not available in simulator"))
+
+    def positions_get(self, symbol=None, **kwargs):
+        def positions():
+            symbols = [symbol] if symbol is not None else list(self.brokers)
+            result = []
+            for s in symbols:
+                if s in self.brokers:
+                    self._sync(s)
+                    result.extend(self.brokers[s].positions_get(symbol=s))
+            return tuple(result)
+        return self._call("positions_get", positions)
+
+    def history_deals_get(self, date_from=None, date_to=None, group=None, **kwargs):
+        def deals():
+            result = []
+            for symbol, broker in self.brokers.items():
+                self._sync(symbol)
+                result.extend(broker.history_deals_get(date_from, date_to, group, **kwargs))
+            return tuple(sorted(result, key=lambda d: d.ticket))
+        return self._call("history_deals_get", deals)
+
+    def order_send(self, request):
+        def send():
+            symbol = request.get("symbol")
+            if symbol not in self.brokers:
+                return self._fail(f"Unknown symbol {symbol}")
+            broker = self.brokers[symbol]
+            self._sync(symbol)
+            if self.reject_rate and self.random.random() < self.reject_rate:
+                self.rejected += 1
+                return broker._result(self.reject_retcode, request, 0.0, 0, "Rejected by simulator")
+            return broker.order_send(request)
+        return self._call("order_send", send)
+
+    # === Reporte ===
+    def report(self):
+        trades = [t for b in self.brokers.values() for t in b.trades]
+        return {
+            "simulated_until": datetime.fromtimestamp(min(self.clock(), self.end), timezone.utc).isoformat(),
+            "calls": dict(self.calls),
+            "rejected_orders": self.rejected,
+            "failed_reads": self.failed,
+            "open_positions": sum(len(b.positions) for b in self.brokers.values()),
+            "closed_trades": len(trades),
+            "pnl": round(float(sum(t["pnl"] for t in trades)), 2),
+        }
+
+    def print_report(self):
+        print("🧪 Fin de la simulación:")
+        for key, value in self.report().items():
+            print(f"  - {key}: {value}")
+
+    # === Internos ===
+    def _call(self, name, fn, data=False):
+        delay = self.latency
+        if isinstance(delay, (tuple, list)):
+            with self._lock:
+                delay = self.random.uniform(*delay)
+        if delay:
+            time.sleep(delay)  # espera real: cuenta como latencia en las mediciones del bot
+        with self._lock:
+            self.calls[name] += 1
+            if data and self.error_rate and self.random.random() < self.error_rate:
+                self.failed += 1
+                return self._fail("Terminal: call failed (simulated)")
+            self._error = (1, "Success")
+            return fn()
+
+    def _fail(self, message):
+        self._error = (RES_E_INTERNAL_FAIL, message)
+        return None
+
+    def _load(self, source):
+        if isinstance(source, np.ndarray):
+            rates = source.astype(RATE_DTYPE)
+        else:
+            rates = bars_to_rates(source if hasattr(source, "columns") else load_bars(source))
+        return rates[np.argsort(rates["time"], kind="stable")]
+
+    def _series(self, symbol, timeframe):
+        """Velas completas del timeframe pedido (agregando si es mayor que el grabado)."""
+        if timeframe == self.timeframe:
+            return self.rates[symbol]
+        key = (symbol, timeframe)
+        if key not in self._resampled:
+            period = TIMEFRAME_SECONDS[timeframe]
+            if period % self.period:
+                raise ValueError(f"❌ No se puede armar {timeframe} a partir de {self.timeframe}")
+            self._resampled[key] = _resample(self.rates[symbol], period)
+        return self._resampled[key]
+
+    def _visible(self, symbol, timeframe):
+        """
+        Velas que existen al instante simulado: (serie, cantidad visible, vela
+        en formación o None). La vela en formación reemplaza a la última.
+        """
+        if symbol not in self.rates:
+            return self._fail(f"Unknown symbol {symbol}")
+        now = self.clock()
+        series = self._series(symbol, timeframe)
+        end = int(np.searchsorted(series["time"], now, side="right"))
+        forming = None
+        if end and series["time"][end - 1] + TIMEFRAME_SECONDS[timeframe] > now:
+            forming = self._forming(symbol, int(series["time"][end - 1]), now)
+        return series, end, forming
+
+    @staticmethod
+    def _take(series, end, forming, lo, hi):
+        """Copia las velas [lo, hi) de la parte visible, con la vela en formación si entra."""
+        rates = series[lo:min(hi, end)].copy()
+        if forming is not None and min(hi, end) == end and len(rates):
+            rates[-1] = forming
+        return rates
+
+    def _forming(self, symbol, bar_start, now):
+        """Vela en formación: velas grabadas ya cerradas más la apertura de la actual."""
+        base = self.rates[symbol]
+        lo = np.searchsorted(base["time"], bar_start, side="left")
+        hi = np.searchsorted(base["time"], now, side="right")
+        parts = base[lo:hi]
+        closed = parts[parts["time"] + self.period <= now]
+        bar = np.zeros(1, dtype=RATE_DTYPE)[0]
+        bar["time"] = bar_start
+        first = parts[0]
+        bar["open"] = first["open"]
+        highs = [first["open"]] + list(closed["high"])
+        lows = [first["open"]] + list(closed["low"])
+        bar["high"] = max(highs)
+        bar["low"] = min(lows)
+        bar["close"] = parts["open"][-1] if len(closed) < len(parts) else closed["close"][-1]
+        bar["tick_volume"] = closed["tick_volume"].sum() + (len(closed) < len(parts))
+        bar["spread"] = first["spread"]
+        return bar
+
+    def _sync(self, symbol):
+        """Lleva el broker al instante simulado: revisa SL/TP de las velas cerradas y fija el tick."""
+        base = self.rates[symbol]
+        broker = self.brokers[symbol]
+        now = self.clock()
+        closed = np.searchsorted(base["time"], now - self.period, side="right")
+        for bar in base[self._checked[symbol]:closed]:
+            broker.set_tick(int(bar["time"]), float(bar["open"]))
+            broker.check_stops(float(bar["open"]), float(bar["high"]), float(bar["low"]))
+        self._checked[symbol] = max(self._checked[symbol], closed)
+
+        current = np.searchsorted(base["time"], now, side="right") - 1
+        if current < 0:
+            broker.set_tick(int(now), float(base["open"][0]))
+        elif current >= closed:
+            broker.set_tick(int(now), float(base["open"][current]))  # vela en formación: su apertura
+        else:
+            broker.set_tick(int(now), float(base["close"][current]))
+
+
+def _epoch(value):
+    if isinstance(value, datetime):
+        return (value if value.tzinfo else value.replace(tzinfo=timezone.utc)).timestamp()
+    if isinstance(value, str):
+        return _epoch(datetime.fromisoformat(value))
+    return float(value)
+
+
+def _resample(rates, period):
+    buckets = rates["time"] // period * period
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(rates)]
+    out = np.zeros(len(starts), dtype=RATE_DTYPE)
+    out["time"] = buckets[starts]
+    out["open"] = rates["open"][starts]
+    out["close"] = rates["close"][ends - 1]
+    out["high"] = np.maximum.reduceat(rates["high"], starts)
+    out["low"] = np.minimum.reduceat(rates["low"], starts)
+    out["tick_volume"] = np.add.reduceat(rates["tick_volume"], starts)
+    out["real_volume"] = np.add.reduceat(rates["real_volume"], starts)
+    out["spread"] = rates["spread"][starts]
+    return out
+
+
+def install(data, **kwargs):
+    """
+    Crea el simulador y lo registra como módulo `MetaTrader5`. Hay que
+    llamarlo antes de importar cualquier módulo que haga `import MetaTrader5`.
+
+    `data` es {símbolo: ruta CSV/Parquet, DataFrame o array de velas}.
+    """
+    sim = MT5Simulator(data, **kwargs)
+    module = types.ModuleType("MetaTrader5")
+    module.__dict__.update(CONSTANTS)
+    for name in API:
+        setattr(module, name, getattr(sim, name))
+    module.simulator = sim
+    sys.modules["MetaTrader5"] = module
+    return sim
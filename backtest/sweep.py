@@ -0,0 +1,251 @@
+import csv
+import itertools
+import os
+import sys
+import time
+from multiprocessing import Pool, shared_memory
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+from backtest.backtester import Backtester
+from backtest.data import load_bars
+from strategy_manager import StrategyManager, default_strategies
+
+METRICS = ["bars", "trades", "pnl", "final_equity", "hit_rate", "profit_factor", "max_drawdown", "seconds", "pruned"]
+
+# Estado de cada proceso del pool (lo arma _init_worker)
+_worker = {}
+
+
+def expand_grid(grid):
+    """{param: [valores]} -> lista de dicts con todas las combinaciones."""
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[n] for n in names))]
+
+
+class SharedBars:
+    """
+    Velas OHLCV en memoria compartida, guardadas por columnas para que cada
+    proceso arme su DataFrame sobre el mismo buffer sin copiarlo ni recibirlo
+    serializado.
+    """
+
+    COLUMNS = ("time", "open", "high", "low", "close", "volume")
+
+    def __init__(self, df):
+        self.length = len(df)
+        arrays = {
+            "time": df["time"].to_numpy().astype("datetime64[ns]").view("int64"),
+            **{col: df[col].to_numpy(dtype=np.float64) for col in self.COLUMNS[1:]},
+        }
+        self.shm = shared_memory.SharedMemory(create=True, size=max(8 * self.length * len(self.COLUMNS), 1))
+        for i, col in enumerate(self.COLUMNS):
+            self._column(self.shm, self.length, i).view(arrays[col].dtype)[:] = arrays[col]
+
+    @property
+    def spec(self):
+        """Lo mínimo para adjuntarse desde otro proceso (nombre del bloque y cantidad de velas)."""
+        return self.shm.name, self.length
+
+    @classmethod
+    def attach(cls, name, length):
+        """Devuelve (bloque, DataFrame) con columnas que apuntan a la memoria compartida."""
+        shm = shared_memory.SharedMemory(name=name)
+        columns = {col: cls._column(shm, length, i) for i, col in enumerate(cls.COLUMNS)}
+        columns["time"] = columns["time"].view("int64").view("datetime64[ns]")
+        for column in columns.values():
+            column.flags.writeable = False
+        return shm, pd.DataFrame(columns, copy=False)
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+    @staticmethod
+    def _column(shm, length, i):
+        return np.ndarray(length, dtype=np.float64, buffer=shm.buf, offset=8 * length * i)
+
+
+def _init_worker(spec, strategy_cls, backtest_args, max_drawdown):
+    shm, df = SharedBars.attach(*spec)
+    _worker.update(shm=shm, df=df, strategy_cls=strategy_cls, backtest_args=backtest_args, max_drawdown=max_drawdown)
+
+
+def _evaluate(params):
+    strategy = _worker["strategy_cls"](**params)
+    backtester = Backtester([strategy], **_worker["backtest_args"])
+    metrics = backtester.run(_worker["df"], max_drawdown=_worker["max_drawdown"])["metrics"]
+    return params, metrics
+
+
+class ParameterSweep:
+    """
+    Evalúa combinaciones de parámetros de una estrategia con el Backtester
+    (mismo camino de decisión que en vivo) en un pool de procesos.
+
+    - Las velas se copian una sola vez a memoria compartida; los procesos se
+      adjuntan al bloque en lugar de recibir el histórico serializado.
+    - Cada resultado se agrega al CSV `results_path` en cuanto termina, así
+      que una corrida cortada se retoma salteando lo ya evaluado.
+    - Poda de cada corrida: si el drawdown realizado supera `max_drawdown`
+      la combinación se corta en ese punto y queda marcada como "pruned".
+    - Poda de la grilla (`coarse_step`): primero se evalúa una grilla gruesa
+      (uno de cada `coarse_step` valores de cada parámetro, más el último) y
+      después sólo las combinaciones finas de las celdas donde alguna
+      esquina gruesa ganó; las regiones perdedoras se saltean sin evaluarlas.
+    - Si ninguna señal de la estrategia llega a resolverse (ej: devuelve
+      valores que no son buy/sell), el barrido se corta con un error en vez
+      de devolver resultados vacíos.
+    """
+
+    def __init__(self, strategy_cls, grid, results_path="sweep_results.csv", workers=None,
+                 max_drawdown=None, chunksize=1, coarse_step=None, **backtest_args):
+        self.strategy_cls = strategy_cls
+        self.grid = grid
+        self.results_path = results_path
+        self.workers = workers or os.cpu_count()
+        self.max_drawdown = max_drawdown
+        self.chunksize = chunksize
+        self.coarse_step = coarse_step
+        self.backtest_args = backtest_args
+        self.skipped = 0
+
+    def run(self, df):
+        self._check_signals(df)
+        combos = expand_grid(self.grid)
+        params = list(self.grid)
+        done = self._done(params)
+        pending = [c for c in combos if self._key(c, params) not in done]
+        print(f"🧮 {len(combos)} combinaciones ({len(combos) - len(pending)} ya evaluadas), {self.workers} procesos")
+        if not pending:
+            return self.results()
+
+        bars = SharedBars(df.reset_index(drop=True))
+        try:
+            with Pool(self.workers, _init_worker,
+                      (bars.spec, self.strategy_cls, self.backtest_args, self.max_drawdown)) as pool:
+                if self.coarse_step:
+                    coarse = self._coarse_keys(params)
+                    self._evaluate(pool, [c for c in pending if self._key(c, params) in coarse], params)
+                    losing = self._losing_regions(params)
+                    fine = [c for c in pending if self._key(c, params) not in coarse]
+                    pending = [c for c in fine if not losing(c)]
+                    self.skipped = len(fine) - len(pending)
+                    print(f"✂️ {self.skipped} combinaciones salteadas en regiones perdedoras de la grilla")
+                self._evaluate(pool, pending, params)
+        finally:
+            bars.close()
+        return self.results()
+
+    def results(self):
+        """Resultados acumulados, ordenados por PnL."""
+        return pd.read_csv(self.results_path).sort_values("pnl", ascending=False, ignore_index=True)
+
+    # === Internos ===
+    def _evaluate(self, pool, combos, params):
+        if not combos:
+            return
+        start = time.perf_counter()
+        new_file = not os.path.exists(self.results_path) or os.path.getsize(self.results_path) == 0
+        with open(self.results_path, "a", newline="") as f:
+            writer = csv.writer(f)
+            if new_file:
+                writer.writerow(params + METRICS)
+            for n, (combo, metrics) in enumerate(pool.imap_unordered(_evaluate, combos, self.chunksize), 1):
+                writer.writerow([combo[p] for p in params] + [metrics[m] for m in METRICS])
+                f.flush()
+                if n % max(len(combos) // 20, 1) == 0 or n == len(combos):
+                    elapsed = time.perf_counter() - start
+                    print(f"  ⏳ {n}/{len(combos)} ({n / elapsed:.1f} comb/s)")
+
+    def _check_signals(self, df):
+        """Con los parámetros por defecto, alguna señal de la estrategia tiene que llegar al Decider."""
+        manager = StrategyManager([self.strategy_cls()], decider=self.backtest_args.get("decider"))
+        table = manager.generate_signal_table(df)
+        raw = table.notna().to_numpy().any()
+        resolved = pd.Series(manager.resolve_signal_table(table, df)).notna().any()
+        if raw and not resolved:
+            values = sorted({str(v) for v in pd.unique(table.to_numpy().ravel()) if v is not None})
+            raise ValueError(f"❌ Las señales de {self.strategy_cls.__name__} nunca pasan el filtro "
+                             f"del StrategyManager (valores: {values})")
+
+    def _coarse_keys(self, params):
+        """Claves de la grilla gruesa: uno de cada `coarse_step` valores por parámetro, más el último."""
+        values = [[self.grid[p][i] for i in _coarse_indices(len(self.grid[p]), self.coarse_step)] for p in params]
+        return {self._key(dict(zip(params, combo)), params) for combo in itertools.product(*values)}
+
+    def _losing_regions(self, params):
+        """
+        Función combo -> True si todas las esquinas gruesas de su celda
+        perdieron (pnl <= 0 o cortadas por drawdown).
+        """
+        results = self.results()
+        losing = {
+            self._key(row, params): row["pnl"] <= 0 or bool(row["pruned"])
+            for row in results.to_dict("records")
+        }
+        coarse = {p: _coarse_indices(len(self.grid[p]), self.coarse_step) for p in params}
+
+        def check(combo):
+            corners = []
+            for p in params:
+                i = self.grid[p].index(combo[p])
+                lower = max(c for c in coarse[p] if c <= i)
+                upper = min(c for c in coarse[p] if c >= i)
+                corners.append({self.grid[p][lower], self.grid[p][upper]})
+            return all(losing.get(self._key(dict(zip(params, corner)), params), False)
+                       for corner in itertools.product(*corners))
+
+        return check
+
+    def _done(self, params):
+        if not os.path.exists(self.results_path) or os.path.getsize(self.results_path) == 0:
+            return set()
+        previous = pd.read_csv(self.results_path)
+        return {self._key(row, params) for row in previous[params].to_dict("records")}
+
+    @staticmethod
+    def _key(combo, params):
+        # Mismo formato que al releer el CSV (los enteros vuelven como float si hay mezcla)
+        return tuple(float(combo[p]) for p in params)
+
+
+def _coarse_indices(n, step):
+    return sorted(set(range(0, n, step)) | {n - 1})
+
+
+def parse_grid(args):
+    """
+    ["fast=5:30:5", "slow=26,50"] -> {"fast": [5, 10, ..., 30], "slow": [26, 50]}.
+    El rango inicio:fin:paso incluye el fin.
+    """
+    grid = {}
+    for arg in args:
+        name, spec = arg.split("=", 1)
+        if ":" in spec:
+            lo, hi, step = (float(x) for x in spec.split(":"))
+            values = np.arange(lo, hi + step / 2, step)
+        else:
+            values = [float(x) for x in spec.split(",")]
+        grid[name] = [int(v) if float(v).is_integer() else float(v) for v in values]
+    return grid
+
+
+if __name__ == "__main__":
+    # Uso: python backtest/sweep.py velas_USDCAD_M5.csv EMACrossoverStrategy fast=5:30:1 slow=20:100:5
+    path, strategy_name, *grid_args = sys.argv[1:]
+    strategies = {type(s).__name__: type(s) for s in default_strategies()}
+    sweep = ParameterSweep(
+        strategies[strategy_name], parse_grid(grid_args),
+        results_path=f"sweep_{strategy_name}.csv",
+        workers=int(os.getenv("SWEEP_WORKERS", "0")) or None,
+        max_drawdown=float(os.getenv("SWEEP_MAX_DRAWDOWN")) if os.getenv("SWEEP_MAX_DRAWDOWN") else None,
+        coarse_step=int(os.getenv("SWEEP_PASO_GRUESO", "0")) or None,
+    )
+    best = sweep.run(load_bars(path))
+    print("🏆 Mejores combinaciones:")
+    print(best.head(10).to_string(index=False))
@@ -0,0 +1,112 @@
+import os
+import pickle
+import threading
+import time
+
+FORMAT_VERSION = 1
+
+
+class Checkpoint:
+    """
+    Estado caliente del bot guardado en disco para que un reinicio (start_loop.bat
+    relanza main.py después de cada caída) vuelva al loop sin calentar de cero.
+
+    Por símbolo se guardan las velas del DataFetcher, el estado incremental de
+    la FeatureCache y la última señal del StrategyManager; además el libro de
+    posiciones con su cursor de deals. Al restaurar, el primer ciclo sólo pide
+    a MT5 las velas nuevas, los indicadores avanzan sólo esas velas y el libro
+    se pone al día con los deals ocurridos mientras el bot estuvo caído.
+
+    - update() se llama al final del ciclo de cada símbolo, desde su propio
+      hilo: el estado se serializa ahí mismo (así no cambia mientras otro
+      símbolo escribe) y el archivo completo se reescribe de forma atómica
+      (archivo temporal + os.replace), así que nunca queda a medio escribir.
+    - Un checkpoint más viejo que `max_age` segundos, "del futuro" (reloj
+      simulado reiniciado) o de otro formato se ignora y el bot arranca en
+      frío. `clock` es epoch en segundos (el reloj simulado con MT5_SIM).
+    """
+
+    def __init__(self, path="checkpoint.pkl", book=None, max_age=3600, clock=time.time):
+        self.path = path
+        self.book = book
+        self.max_age = max_age
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._symbols = {}  # símbolo -> estado ya serializado
+
+    def update(self, symbol, state):
+        """Registra el estado de un símbolo y reescribe el checkpoint."""
+        data = pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._symbols[symbol] = data
+            self._write()
+
+    def load(self):
+        """Contenido del checkpoint si existe y es utilizable; si no, None."""
+        try:
+            with open(self.path, "rb") as f:
+                payload = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"⚠️ Checkpoint {self.path} ilegible, se arranca en frío: {e}")
+            return None
+
+        if not isinstance(payload, dict) or payload.get("version") != FORMAT_VERSION:
+            print(f"⚠️ Checkpoint {self.path} de otro formato, se arranca en frío.")
+            return None
+        age = self.clock() - payload["saved_at"]
+        if not 0 <= age <= self.max_age:
+            print(f"⏱ Checkpoint {self.path} descartado (guardado hace {age:.0f} s), se arranca en frío.")
+            return None
+        return payload
+
+    def restore(self, pipelines):
+        """
+        Carga el checkpoint en el libro de posiciones y en las pipelines de
+        los símbolos guardados. Devuelve los símbolos restaurados.
+        """
+        payload = self.load()
+        if payload is None:
+            return []
+
+        if self.book is not None and payload["book"] is not None:
+            self.book.restore(payload["book"])
+        restored = []
+        for pipeline in pipelines:
+            data = payload["symbols"].get(pipeline.symbol)
+            if data is None:
+                continue
+            try:
+                pipeline.restore(pickle.loads(data))
+            except Exception as e:
+                print(f"⚠️ [{pipeline.symbol}] No se pudo restaurar el checkpoint: {e}")
+                continue
+            with self._lock:
+                self._symbols[pipeline.symbol] = data
+            restored.append(pipeline.symbol)
+
+        age = self.clock() - payload["saved_at"]
+        print(f"♻️ Estado restaurado de {self.path} (guardado hace {age:.0f} s): {', '.join(restored) or 'sin símbolos'}")
+        return restored
+
+    def clear(self):
+        """Borra el checkpoint (ej: después del cierre diario, el día siguiente arranca en frío)."""
+        with self._lock:
+            self._symbols.clear()
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+
+    def _write(self):
+        payload = {
+            "version": FORMAT_VERSION,
+            "saved_at": self.clock(),
+            "symbols": dict(self._symbols),
+            "book": self.book.state() if self.book is not None else None,
+        }
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self.path)
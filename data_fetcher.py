@@ -1,18 +1,167 @@
 import MetaTrader5 as mt5
+import numpy as np
 import pandas as pd
 
+from metrics import METRICS
+
+# Mismo formato que las velas de MT5, con 'tick_volume' renombrado a 'volume'
+BAR_DTYPE = np.dtype([
+    ("time", "datetime64[s]"),
+    ("open", "f8"),
+    ("high", "f8"),
+    ("low", "f8"),
+    ("close", "f8"),
+    ("volume", "i8"),
+    ("spread", "i4"),
+    ("real_volume", "i8"),
+])
+
+
+def rates_to_bars(rates):
+    """Convierte velas de MT5 (copy_rates_*) al formato BAR_DTYPE."""
+    bars = np.empty(len(rates), dtype=BAR_DTYPE)
+    bars["time"] = rates["time"].astype("datetime64[s]")
+    bars["volume"] = rates["tick_volume"]
+    for field in ("open", "high", "low", "close", "spread", "real_volume"):
+        bars[field] = rates[field]
+    return bars
+
+
+class BarBuffer:
+    """
+    Buffer circular de tamaño fijo con las últimas `capacity` velas.
+
+    El buffer está duplicado (cada vela se escribe en i e i + capacity), así
+    que la ventana de velas siempre es un tramo contiguo y view() devuelve una
+    vista sin copia.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._buffer = np.zeros(2 * capacity, dtype=BAR_DTYPE)
+        self._head = 0    # posición donde se escribirá la próxima vela
+        self._count = 0   # velas válidas en el buffer
+
+    def __len__(self):
+        return self._count
+
+    def clear(self):
+        self._head = 0
+        self._count = 0
+
+    def view(self):
+        """Vista de sólo lectura, válida hasta la próxima escritura."""
+        start = (self._head - self._count) % self.capacity
+        view = self._buffer[start:start + self._count]
+        view.flags.writeable = False
+        return view
+
+    def last(self):
+        """Copia de la última vela o None si el buffer está vacío."""
+        if self._count == 0:
+            return None
+        return self._buffer[(self._head - 1) % self.capacity].copy()
+
+    def last_time(self):
+        """Timestamp (epoch en segundos) de la última vela o None."""
+        if self._count == 0:
+            return None
+        return int(self._buffer["time"][(self._head - 1) % self.capacity].astype("int64"))
+
+    def append(self, bars):
+        bars = bars[-self.capacity:]
+        n = len(bars)
+        if n == 0:
+            return
+        self._write((self._head + np.arange(n)) % self.capacity, bars)
+        self._head = (self._head + n) % self.capacity
+        self._count = min(self._count + n, self.capacity)
+
+    def replace_last(self, bar):
+        self._write(np.array([(self._head - 1) % self.capacity]), np.atleast_1d(bar))
+
+    def _write(self, idx, bars):
+        self._buffer[idx] = bars
+        self._buffer[idx + self.capacity] = bars
+
+
 class DataFetcher:
+    """
+    Mantiene las últimas `bars` velas en un BarBuffer y en cada ciclo sólo pide
+    a MT5 las velas posteriores a la última guardada. La última vela (todavía
+    en formación) se reemplaza cuando llega su versión actualizada.
+    """
+
     def __init__(self, symbol, timeframe=mt5.TIMEFRAME_M5, bars=300):
         self.symbol = symbol
         self.timeframe = timeframe
         self.bars = bars
+        self.buffer = BarBuffer(bars)
+
+    def get_bars(self):
+        """
+        Actualiza el buffer y devuelve una vista de sólo lectura con las velas
+        (array estructurado con columnas time, open, high, low, close, volume...).
+        La vista es válida hasta la siguiente actualización.
+        """
+        with METRICS.timer("fetch_bars", symbol=self.symbol):
+            self.refresh()
+        return self.buffer.view()
 
     def get_ohlcv(self):
-        rates = mt5.copy_rates_from_pos(self.symbol, self.timeframe, 0, self.bars)
-        df = pd.DataFrame(rates)
-        df['time'] = pd.to_datetime(df['time'], unit='s')
-        df = df.rename(columns={
-            'tick_volume': 'volume'
-        })
+        with METRICS.timer("get_ohlcv", symbol=self.symbol):
+            df = pd.DataFrame(self.get_bars())
         print("📋 Columnas del dataframe:", df.columns.tolist())
         return df
+
+    def state(self):
+        """Copia de las velas del buffer (para el checkpoint entre reinicios)."""
+        return self.buffer.view().copy()
+
+    def restore(self, bars):
+        """Carga velas guardadas: el próximo refresh sólo pide las posteriores."""
+        self.buffer.clear()
+        self.buffer.append(np.asarray(bars, dtype=BAR_DTYPE))
+
+    def refresh(self):
+        """
+        Trae de MT5 sólo las velas nuevas y la versión final de la vela en
+        formación. Si MT5 no devuelve velas (fin de semana, hueco de mercado,
+        reconexión) el buffer queda como estaba.
+        """
+        last_time = self.buffer.last_time()
+        if last_time is None:
+            rates = self._copy_rates(self.bars)
+            if len(rates) == 0:
+                raise RuntimeError(f"❌ No hay velas de {self.symbol} para cargar la historia")
+            self.buffer.append(rates_to_bars(rates))
+            return
+
+        count = 2
+        while True:
+            rates = self._copy_rates(count)
+            if len(rates) == 0:
+                return
+            if rates["time"][0] <= last_time or count >= self.bars:
+                break
+            count = min(count * 2, self.bars)
+
+        if rates["time"][0] > last_time:
+            # Hueco mayor que el buffer: se descarta todo y se recarga
+            self.buffer.clear()
+            self.buffer.append(rates_to_bars(rates))
+            return
+
+        new = rates_to_bars(rates[rates["time"] >= last_time])
+        if len(new) == 0:
+            return
+        if new["time"][0].astype("int64") == last_time:
+            self.buffer.replace_last(new[0])
+            new = new[1:]
+        self.buffer.append(new)
+
+    def _copy_rates(self, count):
+        rates = mt5.copy_rates_from_pos(self.symbol, self.timeframe, 0, count)
+        if rates is None:
+            raise RuntimeError(f"❌ No se pudieron obtener velas de {self.symbol}: {mt5.last_error()}")
+        return rates
@@ -1,6 +1,7 @@
 import MetaTrader5 as mt5
 import pandas as pd
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 from datetime import datetime
 import os
 import sys
@@ -8,6 +9,7 @@ import sys
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(BASE_DIR)
 
+from feature_store import FeatureStore
 from strategies.ema_crossover import EMACrossoverStrategy
 from strategies.rsi_strategy import RSIStrategy
 
@@ -18,8 +20,16 @@ START_DATE = datetime(2019, 1, 1)
 END_DATE = datetime(2023, 12, 31)
 TP_PIPS = 60
 SL_PIPS = 30
+PIP_SIZE = 0.0001
+LABEL_HORIZON = 5           # velas futuras a evaluar
+LABEL_FIRST_HIT = True      # gana la barrera (TP/SL) que se toca primero
+LABEL_CHUNK_SIZE = 250_000  # filas por bloque, acota la memoria en históricos grandes
 RAW_DATA_PATH = "data/raw_data/usdcad_ohlcv.csv"
 LABELED_DATA_PATH = "data/labeled_data/training_data.csv"
+RAW_STORE_PATH = "data/store/usdcad_ohlcv"            # almacén columnar (memory-map)
+LABELED_STORE_PATH = "data/store/training_data"
+STORE_WARMUP = 500          # velas de historia para recalcular indicadores de las velas nuevas
+EXPORT_CSV = False          # exportar también los CSV de siempre
 
 
 def init_mt5():
@@ -31,7 +41,6 @@ def fetch_raw_data():
     rates = mt5.copy_rates_range(SYMBOL, TIMEFRAME, START_DATE, END_DATE)
     df = pd.DataFrame(rates)
     df["time"] = pd.to_datetime(df["time"], unit="s")
-    df.to_csv(RAW_DATA_PATH, index=False)
     return df
 
 
@@ -49,55 +58,102 @@ def compute_indicators(df):
 
 
 def generate_signals(df):
+    # Una sola pasada vectorizada por estrategia (equivale a evaluar cada prefijo)
     ema = EMACrossoverStrategy()
     rsi = RSIStrategy()
-    signals = []
-
-    for i in range(len(df)):
-        sub = df.iloc[:i+1]
-        ema_signal = ema.generate_signal(sub)
-        rsi_signal = rsi.generate_signal(sub)
-        signals.append({
-            "ema_signal": ema_signal or "none",
-            "rsi_signal": rsi_signal or "none"
-        })
-
-    return pd.DataFrame(signals)
 
+    return pd.DataFrame({
+        "ema_signal": ema.generate_signal_series(df).fillna("none").to_numpy(),
+        "rsi_signal": rsi.generate_signal_series(df).fillna("none").to_numpy()
+    })
+
+
+def _first_hit(hits):
+    """Posición de la primera vela que toca la barrera; len(ventana) si ninguna."""
+    return np.where(hits.any(axis=1), hits.argmax(axis=1), hits.shape[1])
+
+
+def generate_labels(df, horizon=5, tp_pips=TP_PIPS, sl_pips=SL_PIPS, pip_size=PIP_SIZE,
+                    first_hit=False, chunk_size=LABEL_CHUNK_SIZE):
+    """
+    Etiqueta cada vela mirando las `horizon` velas siguientes, en bloques de
+    `chunk_size` filas sobre vistas deslizantes de high/low (sin copiar).
+
+    - first_hit=False: 'buy' si el máximo futuro alcanza el TP, si no 'sell'
+      si lo alcanza el mínimo futuro (criterio original, ignora el SL).
+    - first_hit=True: una operación sólo cuenta si toca el TP antes que el SL.
+      Si TP y SL caen en la misma vela se asume el SL. Si compra y venta son
+      válidas gana la que toca su TP primero (empate: 'buy').
+
+    Las últimas `horizon` velas no tienen futuro completo y quedan en 'none'.
+    """
+    close = df["close"].to_numpy(dtype=float)
+    high = df["high"].to_numpy(dtype=float)
+    low = df["low"].to_numpy(dtype=float)
+    n = len(close)
+    labels = np.full(n, "none", dtype=object)
+    if n <= horizon:
+        return labels.tolist()
+
+    pip_factor = 1 / pip_size
+    # Fila i -> velas i+1 .. i+horizon
+    future_high = sliding_window_view(high[1:], horizon)
+    future_low = sliding_window_view(low[1:], horizon)
+
+    for start in range(0, n - horizon, chunk_size):
+        stop = min(start + chunk_size, n - horizon)
+        entry = close[start:stop, None]
+        up = (future_high[start:stop] - entry) * pip_factor
+        down = (entry - future_low[start:stop]) * pip_factor
+
+        if first_hit:
+            buy_tp = _first_hit(up >= tp_pips)
+            buy_sl = _first_hit(down >= sl_pips)
+            sell_tp = _first_hit(down >= tp_pips)
+            sell_sl = _first_hit(up >= sl_pips)
+            buy_ok = buy_tp < buy_sl
+            sell_ok = sell_tp < sell_sl
+            buy = buy_ok & (~sell_ok | (buy_tp <= sell_tp))
+            sell = sell_ok & ~buy
+        else:
+            buy = up.max(axis=1) >= tp_pips
+            sell = ~buy & (down.max(axis=1) >= tp_pips)
 
-def generate_labels(df):
-    labels = []
+        chunk = labels[start:stop]
+        chunk[buy] = "buy"
+        chunk[sell] = "sell"
 
-    for i in range(len(df) - 5):
-        row = df.iloc[i]
-        future = df.iloc[i+1:i+6]
-        buy_profit = max(future["high"] - row["close"]) * 10000
-        sell_profit = max(row["close"] - future["low"]) * 10000
+    return labels.tolist()
 
-        if buy_profit >= TP_PIPS:
-            labels.append("buy")
-        elif sell_profit >= TP_PIPS:
-            labels.append("sell")
-        else:
-            labels.append("none")
 
-    labels.extend(["none"] * 5)
-    return labels
+def build_dataset(df):
+    """Indicadores, señales y etiquetas de un tramo de velas crudas."""
+    df = compute_indicators(df.reset_index(drop=True))
+    signal_df = generate_signals(df)
+    label_series = generate_labels(df, horizon=LABEL_HORIZON, first_hit=LABEL_FIRST_HIT)
+    df = df.join(signal_df)
+    df["label"] = label_series
+    return df
 
 
 def main():
     init_mt5()
-    df = fetch_raw_data()
-    df = compute_indicators(df)
-    signal_df = generate_signals(df)
-    label_series = generate_labels(df)
-
-    df = df.reset_index(drop=True).join(signal_df)
-    df["label"] = label_series
-    df.to_csv(LABELED_DATA_PATH, index=False)
-
-    print(f"✅ Datos crudos guardados en: {RAW_DATA_PATH}")
-    print(f"✅ Dataset etiquetado guardado en: {LABELED_DATA_PATH}")
+    raw = fetch_raw_data()
+
+    # Sólo se calculan las velas nuevas; las últimas LABEL_HORIZON se
+    # recalculan porque su etiqueta depende de velas futuras
+    raw_store = FeatureStore(RAW_STORE_PATH)
+    raw_store.update(raw, lambda df: df, warmup=0, recompute=1)
+    labeled_store = FeatureStore(LABELED_STORE_PATH)
+    new_rows = labeled_store.update(raw, build_dataset, warmup=STORE_WARMUP, recompute=LABEL_HORIZON)
+
+    print(f"✅ Datos crudos guardados en: {RAW_STORE_PATH} ({len(raw_store)} velas)")
+    print(f"✅ Dataset etiquetado guardado en: {LABELED_STORE_PATH} ({len(labeled_store)} filas, {new_rows} recalculadas)")
+
+    if EXPORT_CSV:
+        raw_store.frame().to_csv(RAW_DATA_PATH, index=False)
+        labeled_store.frame().to_csv(LABELED_DATA_PATH, index=False)
+        print(f"✅ CSV exportados: {RAW_DATA_PATH}, {LABELED_DATA_PATH}")
 
 
 if __name__ == "__main__":
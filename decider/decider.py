@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 from typing import Optional
 
@@ -8,7 +9,11 @@ class Decider:
     """
 
     def __init__(self):
-        # Aquí podríamos cargar un modelo entrenado en el futuro
+        # Para decidir con un modelo entrenado ver decider/model_decider.py
+        pass
+
+    def bind(self, features):
+        """Recibe la FeatureCache del StrategyManager (la votación no la usa)."""
         pass
 
     def decide(self, signal_dict: dict[str, Optional[str]], ticker_data: pd.DataFrame) -> Optional[str]:
@@ -30,3 +35,16 @@ class Decider:
             return "sell"
         else:
             return None
+
+    def decide_batch(self, signal_table: pd.DataFrame, ticker_data) -> np.ndarray:
+        """
+        Misma votación para todas las filas de una tabla de señales
+        (StrategyManager.generate_signal_table), sin iterar fila por fila.
+        """
+        values = signal_table.to_numpy(dtype=object)
+        buy_votes = (values == "buy").sum(axis=1)
+        sell_votes = (values == "sell").sum(axis=1)
+        decisions = np.full(len(values), None, dtype=object)
+        decisions[buy_votes > sell_votes] = "buy"
+        decisions[sell_votes > buy_votes] = "sell"
+        return decisions
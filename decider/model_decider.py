@@ -0,0 +1,214 @@
+import pickle
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from decider.decider import Decider
+
+BUY_LABELS = {"buy", "BUY", 1}
+SELL_LABELS = {"sell", "SELL", -1}
+
+_MODELS = {}
+_MODELS_LOCK = threading.Lock()
+
+
+def load_model(path):
+    """
+    Carga (una sola vez por proceso) un modelo serializado con pickle.
+
+    El archivo puede contener el modelo directamente (con `feature_names_in_`,
+    como los de scikit-learn) o un dict {"model": ..., "features": ...}.
+    `features` es una lista de especificaciones o un dict columna -> especificación
+    (ver ModelDecider).
+    """
+    with _MODELS_LOCK:
+        if path not in _MODELS:
+            with open(path, "rb") as f:
+                bundle = pickle.load(f)
+            if not isinstance(bundle, dict):
+                bundle = {"model": bundle, "features": list(getattr(bundle, "feature_names_in_", []))}
+            if not bundle.get("features"):
+                raise ValueError(f"❌ El modelo {path} no declara sus features")
+            _MODELS[path] = bundle
+        return _MODELS[path]
+
+
+def _parse(spec):
+    """'ema:10' -> ('ema', (10,)); 'signal:RSIStrategy' -> ('signal', 'RSIStrategy'); 'close' -> ('bar', 'close')."""
+    name, _, rest = spec.partition(":")
+    if name == "signal":
+        return "signal", rest
+    if not rest:
+        return "bar", name
+    return name, tuple(int(p) for p in rest.split(":"))
+
+
+def _signal_value(signal):
+    if signal in BUY_LABELS:
+        return 1.0
+    if signal in SELL_LABELS:
+        return -1.0
+    return 0.0
+
+
+class ModelDecider(Decider):
+    """
+    Decider respaldado por un modelo entrenado.
+
+    El vector de features sale del estado ya calculado en el ciclo: los
+    indicadores de la FeatureCache que comparten las estrategias, la última
+    vela y las señales de cada estrategia. No se arma ningún DataFrame.
+    Especificaciones de features:
+
+    - "close", "volume", ...: columna de la última vela (la vela en formación).
+    - "ema:10", "sma:20", "std:20", "rsi:14", "macd:12:26:9",
+      "macd_signal:12:26:9": último valor del indicador en la FeatureCache.
+    - "signal:EMACrossoverStrategy": 1 compra, -1 venta, 0 sin señal.
+
+    decide() es el camino de una fila para el loop en vivo: un vector
+    preasignado y, si el modelo es lineal (coef_/intercept_), un producto
+    escalar en numpy sin pasar por predict(). decide_batch() calcula las
+    mismas features para todas las velas de un histórico (backtests) y
+    predice en una sola llamada. Con alguna feature en NaN (warm-up) no hay
+    señal.
+
+    La latencia de cada llamada queda en `latencies` (segundos, una fila) y
+    `batch_latencies` ((segundos, filas)).
+    """
+
+    def __init__(self, path, history=10_000):
+        super().__init__()
+        bundle = load_model(path)
+        self.path = path
+        self.model = bundle["model"]
+        specs = bundle["features"]
+        self.names = list(specs)
+        self.specs = [_parse(s) for s in (specs.values() if isinstance(specs, dict) else specs)]
+        self.features = None
+        self.latencies = deque(maxlen=history)
+        self.batch_latencies = deque(maxlen=history)
+        self._x = np.empty(len(self.specs), dtype=float)
+        self._linear = self._compile_linear(self.model)
+
+    def bind(self, features):
+        self.features = features
+
+    # === Una fila (en vivo) ===
+    def decide(self, signal_dict, ticker_data) -> Optional[str]:
+        start = time.perf_counter()
+        try:
+            x = self._row(signal_dict, ticker_data)
+            if np.isnan(x).any():
+                return None
+            return self._label(self._predict_row(x))
+        finally:
+            self.latencies.append(time.perf_counter() - start)
+
+    def _row(self, signal_dict, ticker_data):
+        x = self._x
+        for i, (kind, arg) in enumerate(self.specs):
+            if kind == "signal":
+                x[i] = _signal_value(signal_dict.get(arg))
+            elif kind == "bar":
+                x[i] = np.asarray(ticker_data[arg])[-1]
+            else:
+                x[i] = self._indicator(kind, arg)[-1]
+        return x
+
+    def _indicator(self, kind, params):
+        if self.features is None:
+            raise RuntimeError("ModelDecider sin FeatureCache: usar StrategyManager(decider=...)")
+        if kind in ("macd", "macd_signal"):
+            macd, signal = self.features.macd(*params)
+            return macd if kind == "macd" else signal
+        return self.features.get(kind, params)
+
+    def _predict_row(self, x):
+        if self._linear is not None:
+            coef, intercept, classes = self._linear
+            scores = coef @ x + intercept
+            if len(scores) == 1:
+                return classes[1] if scores[0] > 0 else classes[0]
+            return classes[int(np.argmax(scores))]
+        return self.model.predict(x.reshape(1, -1))[0]
+
+    @staticmethod
+    def _compile_linear(model):
+        """Pesos de un modelo lineal como arrays contiguos (evita la validación de predict())."""
+        coef = getattr(model, "coef_", None)
+        intercept = getattr(model, "intercept_", None)
+        classes = getattr(model, "classes_", None)
+        if coef is None or intercept is None or classes is None:
+            return None
+        coef = np.ascontiguousarray(np.atleast_2d(coef), dtype=float)
+        return coef, np.atleast_1d(np.asarray(intercept, dtype=float)), list(classes)
+
+    @staticmethod
+    def _label(prediction):
+        if prediction in BUY_LABELS:
+            return "buy"
+        if prediction in SELL_LABELS:
+            return "sell"
+        return None
+
+    # === Lote (backtests) ===
+    def decide_batch(self, signal_table, ticker_data):
+        """Decisión para cada fila de `signal_table` (la fila i usa las velas 0..i de `ticker_data`)."""
+        start = time.perf_counter()
+        X = self.batch_features(signal_table, ticker_data)
+        decisions = np.full(len(X), None, dtype=object)
+        valid = ~np.isnan(X).any(axis=1)
+        if valid.any():
+            predictions = self.model.predict(X[valid])
+            decisions[valid] = [self._label(p) for p in predictions]
+        self.batch_latencies.append((time.perf_counter() - start, len(X)))
+        return decisions
+
+    def batch_features(self, signal_table, ticker_data):
+        """Matriz (velas, features) con los mismos valores que calcula la FeatureCache vela a vela."""
+        close = pd.Series(np.asarray(ticker_data["close"], dtype=float))
+        X = np.empty((len(close), len(self.specs)), dtype=float)
+        for i, (kind, arg) in enumerate(self.specs):
+            if kind == "signal":
+                X[:, i] = [_signal_value(s) for s in signal_table[arg]] if arg in signal_table else 0.0
+            elif kind == "bar":
+                X[:, i] = np.asarray(ticker_data[arg], dtype=float)
+            else:
+                X[:, i] = self._indicator_series(kind, arg, close)
+        return X
+
+    @staticmethod
+    def _indicator_series(kind, params, close):
+        # Mismas definiciones que indicators/streaming.py
+        if kind == "ema":
+            return close.ewm(span=params[0], adjust=False).mean()
+        if kind == "sma":
+            return close.rolling(params[0]).mean()
+        if kind == "std":
+            return close.rolling(params[0]).std()
+        if kind == "rsi":
+            delta = close.diff()
+            gain = delta.clip(lower=0).rolling(params[0]).mean()
+            loss = (-delta).clip(lower=0).rolling(params[0]).mean()
+            return 100 - (100 / (1 + gain / loss))
+        if kind in ("macd", "macd_signal"):
+            fast, slow, signal = params
+            macd = close.ewm(span=fast, adjust=False).mean() - close.ewm(span=slow, adjust=False).mean()
+            return macd if kind == "macd" else macd.ewm(span=signal, adjust=False).mean()
+        raise ValueError(f"Indicador desconocido: {kind}")
+
+    def latency_stats(self):
+        """Percentiles (ms) de las últimas decisiones de una fila."""
+        if not self.latencies:
+            return {}
+        ms = np.fromiter(self.latencies, dtype=float) * 1000
+        return {
+            "count": len(ms),
+            "p50_ms": float(np.percentile(ms, 50)),
+            "p99_ms": float(np.percentile(ms, 99)),
+            "max_ms": float(ms.max()),
+        }
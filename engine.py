@@ -0,0 +1,301 @@
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import MetaTrader5 as mt5
+
+from data_fetcher import DataFetcher
+from execution import flatten_positions
+from metrics import METRICS
+from profiler import PROFILER
+from strategy_manager import StrategyManager
+from trader import Trader
+
+
+class MT5Pool:
+    """
+    Pool acotado de hilos para las llamadas bloqueantes a MetaTrader5. Todas
+    las pipelines comparten el pool, así que nunca hay más de `max_workers`
+    llamadas simultáneas contra el terminal.
+    """
+
+    def __init__(self, max_workers=4):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="mt5")
+
+    def call(self, fn, *args, **kwargs):
+        return self.executor.submit(fn, *args, **kwargs).result()
+
+    def submit(self, fn, *args, **kwargs):
+        return self.executor.submit(fn, *args, **kwargs)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class RiskLimits:
+    """
+    Límites globales compartidos por todos los símbolos: cantidad máxima de
+    posiciones abiertas y volumen total (en lotes). Es thread-safe.
+
+    - sync() toma las posiciones reales (libro o broker) al inicio de cada
+      ciclo; se cuentan posiciones, no símbolos. Con `symbols` sólo cuentan
+      las de esos símbolos: operaciones manuales u otros EAs sobre otros
+      símbolos no consumen el cupo del bot (sin `symbols` el límite es de
+      toda la cuenta).
+    - try_reserve() aparta cupo para una orden en vuelo y devuelve un token.
+      La reserva sobrevive a sync() hasta que se cancela (cancel, si la
+      orden falló) o se confirma (confirm) y aparece un sync con posiciones
+      tomadas después de la confirmación (ver mark()).
+    """
+
+    def __init__(self, max_positions=5, max_total_volume=None, symbols=None):
+        self.max_positions = max_positions
+        self.max_total_volume = max_total_volume
+        self.symbols = set(symbols) if symbols is not None else None
+        self._lock = threading.Lock()
+        self._open = {}      # symbol -> [posiciones, volumen] según el último sync
+        self._pending = {}   # token -> [symbol, volumen, secuencia de confirmación o None]
+        self._tokens = itertools.count(1)
+        self._seq = 0
+
+    def mark(self):
+        """Marca a pasar a sync() si las posiciones se leen después de llamarla."""
+        with self._lock:
+            return self._seq
+
+    def sync(self, positions, mark=None):
+        """
+        Reemplaza las posiciones abiertas. Las reservas confirmadas hasta
+        `mark` ya están en `positions` y se descartan (sin mark, todas las
+        confirmadas); las que siguen en vuelo se conservan.
+        """
+        with self._lock:
+            self._open = {}
+            for pos in positions or ():
+                if self.symbols is not None and pos.symbol not in self.symbols:
+                    continue
+                count = self._open.setdefault(pos.symbol, [0, 0.0])
+                count[0] += 1
+                count[1] += pos.volume
+            self._pending = {
+                token: r for token, r in self._pending.items()
+                if r[2] is None or (mark is not None and r[2] > mark)
+            }
+
+    def has_position(self, symbol):
+        """Hay posición abierta u orden en vuelo para `symbol`."""
+        with self._lock:
+            return symbol in self._open or any(r[0] == symbol for r in self._pending.values())
+
+    def try_reserve(self, symbol, volume):
+        """Reserva cupo para una orden nueva; devuelve un token, o None si supera algún límite."""
+        with self._lock:
+            positions = sum(c[0] for c in self._open.values()) + len(self._pending)
+            if positions >= self.max_positions:
+                return None
+            total = sum(c[1] for c in self._open.values()) + sum(r[1] for r in self._pending.values()) + volume
+            if self.max_total_volume is not None and total > self.max_total_volume:
+                return None
+            token = next(self._tokens)
+            self._pending[token] = [symbol, volume, None]
+            return token
+
+    def confirm(self, token):
+        """La orden se ejecutó: la reserva se mantiene hasta que el sync incluya la posición."""
+        with self._lock:
+            if token in self._pending:
+                self._seq += 1
+                self._pending[token][2] = self._seq
+
+    def cancel(self, token):
+        """La orden no se ejecutó: se libera la reserva."""
+        with self._lock:
+            self._pending.pop(token, None)
+
+    def release(self, symbol):
+        """Las posiciones de `symbol` se cerraron: se libera su cupo hasta el próximo sync."""
+        with self._lock:
+            self._open.pop(symbol, None)
+
+
+class SymbolPipeline:
+    """
+    Estado aislado de un símbolo: velas, estrategias, StrategyManager y
+    Trader propios. Las llamadas a MT5 pasan por el MT5Pool compartido.
+    """
+
+    def __init__(self, symbol, strategies, pool, risk, logger, notifier, scheduler,
+                 capital=1000, risk_pct=1, sl_pips=30, tp_pips=60, timeframe=mt5.TIMEFRAME_M5, decider=None,
+                 book=None, checkpoint=None):
+        self.symbol = symbol
+        self.pool = pool
+        self.risk = risk
+        self.logger = logger
+        self.notifier = notifier
+        self.scheduler = scheduler
+        self.capital = capital
+        self.risk_pct = risk_pct
+        self.sl_pips = sl_pips
+        self.tp_pips = tp_pips
+        self.fetcher = DataFetcher(symbol, timeframe)
+        self.trader = pool.call(Trader, symbol, book=book)
+        self.strategies = strategies
+        self.strategy_mgr = StrategyManager(strategies, trader=self.trader, decider=decider)
+        self.checkpoint = checkpoint
+        self.last_bar_time = None
+
+    def on_bar_close(self, event):
+        """Espera la vela nueva de este símbolo y ejecuta el ciclo completo."""
+        with PROFILER.cycle(self.symbol):
+            df = self.scheduler.await_new_bar(lambda: self.pool.call(self.fetcher.get_bars), self.last_bar_time)
+            self.last_bar_time = df["time"][-1]
+            with METRICS.timer("cycle", symbol=self.symbol):
+                self.run_cycle(df, event)
+            self.save_checkpoint()
+
+    def state(self):
+        """Velas, indicadores y última señal del símbolo (ver checkpoint.py)."""
+        return {
+            "bars": self.fetcher.state(),
+            "strategy": self.strategy_mgr.state(),
+            "last_bar_time": self.last_bar_time,
+        }
+
+    def restore(self, state):
+        self.fetcher.restore(state["bars"])
+        self.strategy_mgr.restore(state["strategy"])
+        self.last_bar_time = state["last_bar_time"]
+
+    def save_checkpoint(self):
+        if self.checkpoint is not None:
+            with METRICS.timer("checkpoint", symbol=self.symbol):
+                self.checkpoint.update(self.symbol, self.state())
+
+    def run_cycle(self, df, event):
+        symbol = self.symbol
+
+        # === Generar señales ===
+        signals = self.strategy_mgr.generate_signals(df)
+        print(f"📊 [{symbol}] Señales generadas:")
+        for strat, sig in signals.items():
+            print(f"  - {strat}: {sig}")
+
+        # === Resolver mejor señal con Decider ===
+        current_signal = self.strategy_mgr.resolve_signal(signals, df)
+        print(f"🎯 [{symbol}] Señal seleccionada: {current_signal}")
+        self.scheduler.record_latency(f"decision {symbol}", event.time)
+
+        # === Cerrar posiciones si cambia la señal ===
+        if self.pool.call(self.strategy_mgr.close_on_signal_change, current_signal):
+            self.risk.release(symbol)
+
+        # === Ejecutar orden si corresponde ===
+        if not self.strategy_mgr.should_trade(current_signal):
+            print(f"⏳ [{symbol}] Sin nueva señal. Esperando siguiente ciclo...")
+            return
+        if self.risk.has_position(symbol):
+            print(f"⏸ [{symbol}] Ya hay una posición abierta.")
+            return
+
+        vol = self.trader.calculate_volume(self.capital, self.risk_pct, self.sl_pips)
+        reservation = self.risk.try_reserve(symbol, vol)
+        if reservation is None:
+            print(f"🛑 [{symbol}] Límite global de riesgo alcanzado, no se abre posición.")
+            return
+
+        try:
+            result = self.pool.call(self.trader.send_order, current_signal, vol, self.sl_pips, self.tp_pips)
+        except Exception:
+            self.risk.cancel(reservation)
+            raise
+        self.scheduler.record_latency(f"orden {symbol}", event.time)
+        if not result:
+            self.risk.cancel(reservation)
+            return
+        self.risk.confirm(reservation)
+
+        self.logger.log_trade(
+            symbol, current_signal, vol, result.price,
+            result.request.sl, result.request.tp, result.order
+        )
+        self.notifier.send(
+            f"📥 Orden ejecutada:\n{symbol} {current_signal.upper()} @ {round(result.price, 5)}\n"
+            f"SL: {round(result.request.sl, 5)} | TP: {round(result.request.tp, 5)}",
+            priority=self.notifier.HIGH
+        )
+
+
+class TradingEngine:
+    """
+    Ejecuta las pipelines de todos los símbolos en paralelo. Cada ciclo lee
+    las posiciones abiertas una sola vez para todos los símbolos y lanza cada
+    pipeline en su propio hilo sin esperar a las demás: si un símbolo sigue
+    ocupado con el ciclo anterior, se salta este ciclo en lugar de demorar al
+    resto.
+    """
+
+    def __init__(self, pipelines, pool, risk, notifier, book=None):
+        self.pipelines = pipelines
+        self.book = book
+        self.pool = pool
+        self.risk = risk
+        self.notifier = notifier
+        self.executor = ThreadPoolExecutor(max_workers=max(len(pipelines), 1), thread_name_prefix="symbol")
+        self._running = {}
+        self._closing = False
+
+    def run_cycle(self, event):
+        if self._closing:
+            return
+        mark = self.risk.mark()
+        if self.book is not None:
+            # Deals nuevos desde el último ciclo (o reconciliación completa periódica)
+            with METRICS.timer("positions_sync"):
+                self.pool.call(self.book.sync)
+            self.risk.sync(self.book.positions(), mark)
+        else:
+            with METRICS.timer("positions_get"):
+                self.risk.sync(self.pool.call(mt5.positions_get), mark)
+
+        for pipeline in self.pipelines:
+            running = self._running.get(pipeline.symbol)
+            if running is not None and not running.done():
+                print(f"🐢 [{pipeline.symbol}] El ciclo anterior sigue en curso, se salta este ciclo.")
+                continue
+            future = self.executor.submit(pipeline.on_bar_close, event)
+            future.add_done_callback(lambda f, symbol=pipeline.symbol: self._report(symbol, f))
+            self._running[pipeline.symbol] = future
+
+    def wait_idle(self, timeout=None):
+        """Espera a que terminen los ciclos en curso (para reproducir con reloj simulado)."""
+        wait([f for f in self._running.values() if not f.done()], timeout)
+
+    def close_all(self):
+        """
+        Cierra las posiciones de todos los símbolos a la vez (cierre diario)
+        a través del pool MT5. Antes deja de lanzar ciclos y espera a los que
+        estén en curso, para que ninguna pipeline abra una orden durante el
+        cierre. Sólo se cierran los símbolos de las pipelines. Devuelve el
+        reporte de flatten_positions.
+        """
+        self._closing = True
+        self.wait_idle()
+        positions = self.book.positions() if self.book is not None else None
+        executors = {p.symbol: p.trader.executor for p in self.pipelines}
+        # Sólo los símbolos del bot: operaciones manuales u otros EAs quedan abiertas
+        report = flatten_positions(mt5, executors, positions, submit=self.pool.submit, symbols=executors)
+        if self.book is not None:
+            self.pool.call(self.book.full_sync)
+        for pipeline in self.pipelines:
+            self.risk.release(pipeline.symbol)
+        return report
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.pool.shutdown()
+
+    def _report(self, symbol, future):
+        error = future.exception()
+        if error is not None:
+            print(f"⚠️ [{symbol}] Error en el ciclo: {error}")
+            self.notifier.send(f"⚠️ Error en el ciclo del bot ({symbol}):\n{error}")
@@ -0,0 +1,284 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import METRICS
+
+# Retcodes de MetaTrader5 (no todos los brokers simulados los exponen como constantes)
+TRADE_RETCODE_REQUOTE = 10004
+TRADE_RETCODE_PLACED = 10008
+TRADE_RETCODE_DONE = 10009
+TRADE_RETCODE_DONE_PARTIAL = 10010
+TRADE_RETCODE_PRICE_CHANGED = 10020
+TRADE_RETCODE_PRICE_OFF = 10021
+TRADE_RETCODE_INVALID_FILL = 10030
+
+# Bits de symbol_info().filling_mode
+SYMBOL_FILLING_FOK = 1
+SYMBOL_FILLING_IOC = 2
+
+OK_RETCODES = (TRADE_RETCODE_DONE, TRADE_RETCODE_PLACED, TRADE_RETCODE_DONE_PARTIAL)
+PRICE_RETCODES = (TRADE_RETCODE_REQUOTE, TRADE_RETCODE_PRICE_CHANGED, TRADE_RETCODE_PRICE_OFF)
+
+
+def filling_modes(broker, info):
+    """
+    Modos de llenado a probar, en orden, según los bits que declara el
+    símbolo: FOK, después IOC y RETURN como último recurso.
+    """
+    allowed = getattr(info, "filling_mode", 0) or 0
+    modes = []
+    if allowed & SYMBOL_FILLING_FOK:
+        modes.append(broker.ORDER_FILLING_FOK)
+    if allowed & SYMBOL_FILLING_IOC:
+        modes.append(broker.ORDER_FILLING_IOC)
+    modes.append(broker.ORDER_FILLING_RETURN)
+    for mode in (broker.ORDER_FILLING_FOK, broker.ORDER_FILLING_IOC):
+        if mode not in modes:
+            modes.append(mode)
+    return modes
+
+
+class OrderExecutor:
+    """
+    Envío de órdenes a mercado de un símbolo.
+
+    - El modo de llenado se deduce una vez de symbol_info y queda cacheado:
+      cada orden es un solo viaje al terminal. Sólo si el broker responde
+      INVALID_FILL se prueba el siguiente modo y se cachea el que funcione.
+    - Las requests se arman copiando plantillas precalculadas (apertura de
+      compra/venta y cierre) y completando precio, volumen y SL/TP.
+    - Ante recotización / precio cambiado se reintenta hasta `max_retries`
+      veces con un tick nuevo.
+    - Cada orden deja en `fills` el precio pedido y el llenado, el slippage
+      en puntos (positivo = en contra) y la latencia envío → respuesta.
+    """
+
+    def __init__(self, broker, symbol, info=None, max_retries=2, deviation=10, history=1000):
+        self.mt5 = broker
+        self.symbol = symbol
+        self.info = info if info is not None else broker.symbol_info(symbol)
+        self.max_retries = max_retries
+        self.modes = filling_modes(broker, self.info)
+        self.filling = self.modes[0]
+        self.fills = deque(maxlen=history)
+        self._lock = threading.Lock()
+
+        base = {
+            "action": broker.TRADE_ACTION_DEAL,
+            "symbol": symbol,
+            "deviation": deviation,
+            "type_time": broker.ORDER_TIME_GTC,
+        }
+        self.templates = {
+            "BUY": {**base, "type": broker.ORDER_TYPE_BUY},
+            "SELL": {**base, "type": broker.ORDER_TYPE_SELL},
+        }
+
+    def open(self, direction, volume, sl_pips, tp_pips):
+        """Abre a mercado con SL/TP a `sl_pips`/`tp_pips` puntos del precio de ejecución pedido."""
+        direction = direction.upper()
+        template = self.templates[direction]
+        point = self.info.point
+
+        def build(tick):
+            price = tick.ask if direction == "BUY" else tick.bid
+            sign = 1 if direction == "BUY" else -1
+            return {**template, "volume": volume, "price": price,
+                    "sl": price - sign * sl_pips * point, "tp": price + sign * tp_pips * point}
+
+        return self._execute(build, direction, "open")
+
+    def close(self, position, tick=None):
+        """
+        Cierra `position` (de positions_get) con una orden opuesta por el
+        volumen completo. Con `tick` el primer intento no vuelve a pedirlo.
+        """
+        direction = "SELL" if position.type == self.mt5.ORDER_TYPE_BUY else "BUY"
+        template = self.templates[direction]
+
+        def build(tick):
+            price = tick.bid if direction == "SELL" else tick.ask
+            return {**template, "position": position.ticket, "volume": position.volume, "price": price}
+
+        return self._execute(build, direction, "close", tick)
+
+    def stats(self):
+        """Resumen de las órdenes registradas: slippage y latencia medios y máximos."""
+        fills = [f for f in self.fills if f["ok"]]
+        if not fills:
+            return {"orders": len(self.fills), "filled": 0}
+        slippage = [f["slippage_points"] for f in fills]
+        latency = [f["latency"] for f in fills]
+        return {
+            "orders": len(self.fills),
+            "filled": len(fills),
+            "avg_slippage_points": sum(slippage) / len(slippage),
+            "max_slippage_points": max(slippage),
+            "avg_latency_ms": 1000 * sum(latency) / len(latency),
+            "max_latency_ms": 1000 * max(latency),
+            "retries": sum(f["attempts"] - 1 for f in fills),
+        }
+
+    # === Internos ===
+    def _execute(self, build, direction, kind, tick=None):
+        attempts = 0
+        requotes = 0
+        start = time.perf_counter()
+        while True:
+            if tick is None or attempts:
+                tick = self.mt5.symbol_info_tick(self.symbol)
+            if tick is None:
+                print(f"❌ [{self.symbol}] Sin tick para enviar la orden")
+                return None
+            request = build(tick)
+            request["type_filling"] = self.filling
+
+            attempts += 1
+            sent = time.perf_counter()
+            with METRICS.timer("order_send", symbol=self.symbol, filling=self.filling):
+                result = self.mt5.order_send(request)
+            ack = time.perf_counter()
+
+            if result is None:
+                print(f"❌ [{self.symbol}] order_send sin respuesta: {self.mt5.last_error()}")
+                self._record(kind, direction, request, None, attempts, ack - sent, ack - start)
+                return None
+            if result.retcode in OK_RETCODES:
+                self._record(kind, direction, request, result, attempts, ack - sent, ack - start)
+                return result
+
+            print(f"❌ [{self.symbol}] Error modo {self.filling} - {result.retcode} | {result.comment}")
+            if result.retcode == TRADE_RETCODE_INVALID_FILL and self._next_filling(request["type_filling"]):
+                continue
+            if result.retcode in PRICE_RETCODES and requotes < self.max_retries:
+                requotes += 1
+                continue
+            self._record(kind, direction, request, result, attempts, ack - sent, ack - start)
+            return None
+
+    def _next_filling(self, rejected):
+        """Pasa al siguiente modo de llenado (y lo cachea). False si no quedan."""
+        with self._lock:
+            if self.filling != rejected:
+                return True  # otro hilo ya cambió el modo cacheado
+            position = self.modes.index(rejected)
+            if position + 1 >= len(self.modes):
+                return False
+            self.filling = self.modes[position + 1]
+            print(f"🔧 [{self.symbol}] Modo de llenado {rejected} rechazado, se usa {self.filling}")
+            return True
+
+    def _record(self, kind, direction, request, result, attempts, latency, total):
+        ok = result is not None and result.retcode in OK_RETCODES
+        filled = result.price if ok and result.price else None
+        slippage = None
+        if filled is not None:
+            diff = filled - request["price"] if direction == "BUY" else request["price"] - filled
+            slippage = diff / self.info.point
+        self.fills.append({
+            "time": time.time(),
+            "kind": kind,
+            "direction": direction,
+            "volume": request["volume"],
+            "requested_price": request["price"],
+            "filled_price": filled,
+            "slippage_points": slippage if slippage is not None else 0.0,
+            "latency": latency,
+            "total_latency": total,
+            "attempts": attempts,
+            "filling": request["type_filling"],
+            "retcode": None if result is None else result.retcode,
+            "ok": ok,
+        })
+        if ok:
+            METRICS.observe("order_ack", latency, symbol=self.symbol, kind=kind)
+
+
+def flatten_positions(broker, executors=None, positions=None, submit=None, max_workers=8, max_rounds=3,
+                      symbols=None, account_wide=False):
+    """
+    Cierra en paralelo las posiciones abiertas de `symbols` (por defecto, los
+    de `executors`). Las de otros símbolos (operaciones manuales, otros EAs)
+    no se tocan, ni en la lista inicial ni en las confirmaciones; para cerrar
+    toda la cuenta hay que pedirlo con `account_wide=True`.
+
+    - El tick se pide una sola vez por símbolo y ronda, y todos los cierres
+      se envían a la vez (con `submit` del pool MT5 compartido, o un pool
+      propio de `max_workers` hilos).
+    - Después de cada ronda se confirma con positions_get: lo que quede
+      abierto (rechazos, llenados parciales) se reintenta hasta `max_rounds`.
+    - `executors` ({símbolo: OrderExecutor}) reutiliza los modos de llenado
+      ya cacheados; para otros símbolos se crea uno nuevo.
+    - `positions` es la lista inicial (ej: del PositionBook); si no se pasa
+      se pide positions_get.
+
+    Devuelve un reporte con el tiempo total hasta quedar sin posiciones y la
+    latencia de cada cierre.
+    """
+    executors = dict(executors or {})
+    if not account_wide:
+        symbols = set(executors if symbols is None else symbols)
+        if not symbols:
+            raise ValueError("flatten_positions sin símbolos: pasar `symbols` o `executors`, o account_wide=True")
+
+    def ours(found):
+        return [p for p in found or () if account_wide or p.symbol in symbols]
+
+    own_pool = None
+    if submit is None:
+        own_pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="flatten")
+        submit = own_pool.submit
+
+    start = time.perf_counter()
+    closes = []
+    remaining = ours(positions if positions is not None else broker.positions_get())
+    rounds = 0
+    try:
+        while remaining and rounds < max_rounds:
+            rounds += 1
+            symbols = sorted({p.symbol for p in remaining})
+            for symbol in symbols:
+                if symbol not in executors:
+                    executors[symbol] = OrderExecutor(broker, symbol)
+            ticks = dict(zip(symbols, [f.result() for f in [submit(broker.symbol_info_tick, s) for s in symbols]]))
+
+            def close(pos):
+                sent = time.perf_counter()
+                result = executors[pos.symbol].close(pos, ticks[pos.symbol])
+                return pos, result, time.perf_counter() - sent
+
+            for future in [submit(close, pos) for pos in remaining]:
+                pos, result, latency = future.result()
+                closes.append({
+                    "round": rounds,
+                    "ticket": pos.ticket,
+                    "symbol": pos.symbol,
+                    "volume": pos.volume,
+                    "ok": result is not None,
+                    "price": result.price if result is not None else None,
+                    "latency": latency,
+                    "since_start": time.perf_counter() - start,
+                })
+
+            # Confirmación con el broker: sólo cuenta como cerrado lo que ya no aparece
+            remaining = ours(submit(broker.positions_get).result())
+            if remaining:
+                print(f"🔁 Ronda {rounds}: quedan {len(remaining)} posiciones abiertas, reintentando...")
+    finally:
+        if own_pool is not None:
+            own_pool.shutdown(wait=False)
+
+    elapsed = time.perf_counter() - start
+    latencies = [c["latency"] for c in closes if c["ok"]]
+    METRICS.observe("flatten", elapsed)
+    return {
+        "flat": not remaining,
+        "seconds": elapsed,
+        "rounds": rounds,
+        "orders": len(closes),
+        "remaining": [p.ticket for p in remaining],
+        "max_close_latency": max(latencies) if latencies else 0.0,
+        "closes": closes,
+    }
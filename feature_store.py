@@ -0,0 +1,241 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+
+class FeatureStore:
+    """
+    Almacén columnar en disco con lectura por memory-map.
+
+    Cada columna es un archivo binario crudo (`<columna>.bin`) y `meta.json`
+    guarda el esquema y la cantidad de filas confirmadas. Leer una columna es
+    abrir un np.memmap sin copiar ni parsear, así que cargar años de datos
+    tarda milisegundos.
+
+    - Las columnas de texto (ej: señales 'buy'/'sell'/None) se guardan como
+      códigos int16 con las categorías en meta.json.
+    - append() agrega filas al final de cada archivo y recién después
+      actualiza meta.json (reemplazo atómico); si el proceso se corta en el
+      medio, los bytes sobrantes se descartan en la próxima escritura.
+    - Para reescribir filas ya confirmadas (append con `start`) primero se
+      guardan los bytes originales en `rollback.npz`; si el proceso se corta
+      antes de confirmar meta.json, al abrir el almacén se restauran.
+    - Al abrir se verifica el largo de cada archivo contra meta.json: si
+      alguno quedó más corto, las filas confirmadas se reducen a las que
+      tienen todas las columnas.
+    - update() recalcula sólo las filas nuevas (más `warmup` filas de
+      historia para los indicadores y `recompute` filas finales que cambian
+      con datos nuevos, ej: la vela en formación o etiquetas a futuro).
+    """
+
+    META = "meta.json"
+    ROLLBACK = "rollback.npz"
+
+    def __init__(self, path):
+        self.path = path
+        self.meta = {"rows": 0, "index": None, "columns": {}, "version": 0}
+        if os.path.exists(os.path.join(path, self.META)):
+            with open(os.path.join(path, self.META)) as f:
+                self.meta = json.load(f)
+            self.meta.setdefault("version", 0)
+            self._recover()
+
+    def __len__(self):
+        return self.meta["rows"]
+
+    @property
+    def columns(self):
+        return list(self.meta["columns"])
+
+    # === Lectura ===
+    def column(self, name, start=0, stop=None):
+        """Vista memory-map de sólo lectura (sin copia). Las categóricas devuelven los códigos."""
+        spec = self.meta["columns"][name]
+        rows = len(self)
+        if rows == 0:
+            return np.empty(0, dtype=spec["dtype"])
+        data = np.memmap(self._file(name), dtype=spec["dtype"], mode="r", shape=(rows,))
+        return data[start:stop]
+
+    def frame(self, columns=None, start=0, stop=None):
+        """DataFrame sobre las vistas memory-map; sólo se copian las columnas categóricas."""
+        names = self.columns if columns is None else list(columns)
+        data = {}
+        for name in names:
+            values = self.column(name, start, stop)
+            categories = self.meta["columns"][name].get("categories")
+            if categories is not None:
+                values = pd.Categorical.from_codes(np.asarray(values), categories=categories)
+            elif self.meta["columns"][name]["dtype"].startswith("datetime64"):
+                values = np.asarray(values)
+            data[name] = values
+        df = pd.DataFrame(data, copy=False)
+        index = self.meta["index"]
+        if index is not None and index in self.meta["columns"]:
+            times = self.column(index, start, stop)
+            df.index = pd.DatetimeIndex(np.asarray(times), name=index)
+            if columns is None or index not in names:
+                df = df.drop(columns=index, errors="ignore")
+        return df
+
+    def tail(self, n, columns=None):
+        """Últimas `n` filas (para inferencia en vivo)."""
+        return self.frame(columns, start=max(len(self) - n, 0))
+
+    # === Escritura ===
+    def write(self, df):
+        """Reemplaza todo el contenido por `df` (el índice con nombre se guarda como columna)."""
+        self.meta = {"rows": 0, "index": None, "columns": {}, "version": self.meta.get("version", 0)}
+        for name in os.listdir(self.path) if os.path.isdir(self.path) else ():
+            if name.endswith(".bin"):
+                os.remove(os.path.join(self.path, name))
+        self.append(df)
+
+    def append(self, df, start=None):
+        """
+        Agrega las filas de `df`. Con `start` primero se descartan las filas
+        desde esa posición (para reescribir el final).
+        """
+        os.makedirs(self.path, exist_ok=True)
+        df = self._with_index(df)
+        rows = len(self) if start is None else min(start, len(self))
+        if not self.meta["columns"]:
+            self.meta["columns"] = {name: self._spec(df[name]) for name in df.columns}
+        missing = set(self.meta["columns"]) - set(df.columns)
+        if missing:
+            raise ValueError(f"❌ Faltan columnas para agregar: {sorted(missing)}")
+
+        if rows < len(self):
+            self._save_rollback(rows)
+        for name, spec in self.meta["columns"].items():
+            values = self._encode(df[name], spec)
+            with open(self._file(name), "ab") as f:
+                f.truncate(rows * values.dtype.itemsize)
+                f.seek(0, os.SEEK_END)
+                f.write(values.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+
+        self.meta["rows"] = rows + len(df)
+        self._save_meta()
+        self._remove(self.ROLLBACK)
+
+    def update(self, bars, compute, warmup=500, recompute=0):
+        """
+        Incorpora velas nuevas calculando features sólo para ellas.
+
+        `bars` es el DataFrame de velas crudas (con índice o columna de tiempo)
+        y `compute(df)` devuelve las features de esas velas. Se recalculan las
+        velas posteriores a la última guardada más las últimas `recompute`
+        filas, usando `warmup` filas previas como historia.
+        """
+        bars = self._with_index(bars)
+        index = self.meta["index"]
+        if len(self) == 0:
+            self.write(compute(bars))
+            return len(bars)
+
+        times = self.column(index)
+        first = max(len(self) - recompute, 0)
+        since = times[first] if first < len(self) else times[-1] + np.timedelta64(1, "ns")
+        new = bars[bars[index] >= since]
+        if new.empty:
+            return 0
+        history = bars[bars[index] < since].tail(warmup)
+        features = compute(pd.concat([history, new], ignore_index=True))
+        self.append(self._with_index(features).iloc[len(history):], start=first)
+        return len(new)
+
+    # === Internos ===
+    def _file(self, name):
+        return os.path.join(self.path, f"{name}.bin")
+
+    def _with_index(self, df):
+        """Pasa el índice de tiempo a columna para guardarlo como una más."""
+        if isinstance(df.index, pd.DatetimeIndex):
+            name = df.index.name or "time"
+            self.meta["index"] = self.meta["index"] or name
+            return df.reset_index(names=name)
+        if self.meta["index"] is None and "time" in df.columns:
+            self.meta["index"] = "time"
+        return df.reset_index(drop=True)
+
+    @staticmethod
+    def _spec(series):
+        if pd.api.types.is_datetime64_any_dtype(series):
+            return {"dtype": "datetime64[ns]"}
+        if pd.api.types.is_numeric_dtype(series) and not isinstance(series.dtype, pd.CategoricalDtype):
+            return {"dtype": np.dtype(series.dtype).str}
+        categories = sorted({str(v) for v in series.dropna().unique()})
+        return {"dtype": "int16", "categories": categories}
+
+    @staticmethod
+    def _encode(series, spec):
+        categories = spec.get("categories")
+        if categories is None:
+            return np.ascontiguousarray(series.to_numpy(), dtype=spec["dtype"])
+        values = series.astype("string")
+        for value in values.dropna().unique():
+            if value not in categories:
+                categories.append(value)  # categoría nueva: se agrega al final, los códigos previos no cambian
+        return pd.Categorical(values, categories=categories).codes.astype(spec["dtype"])
+
+    def _save_rollback(self, start):
+        """Copia las filas confirmadas desde `start` antes de sobreescribirlas."""
+        saved = {}
+        for name, spec in self.meta["columns"].items():
+            itemsize = np.dtype(spec["dtype"]).itemsize
+            with open(self._file(name), "rb") as f:
+                f.seek(start * itemsize)
+                saved[name] = np.frombuffer(f.read((len(self) - start) * itemsize), dtype=np.uint8)
+        tmp = os.path.join(self.path, "rollback.tmp.npz")
+        with open(tmp, "wb") as f:
+            np.savez(f, _start=start, _rows=len(self), _version=self.meta["version"], **saved)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, os.path.join(self.path, self.ROLLBACK))
+
+    def _recover(self):
+        """Deshace una reescritura sin confirmar y repara columnas más cortas que meta.json."""
+        rollback = os.path.join(self.path, self.ROLLBACK)
+        if os.path.exists(rollback):
+            with np.load(rollback) as saved:
+                # Si meta.json ya tiene otra versión, la reescritura se confirmó y la copia sobra
+                if int(saved["_version"]) == self.meta["version"] and int(saved["_rows"]) == len(self):
+                    start = int(saved["_start"])
+                    for name, spec in self.meta["columns"].items():
+                        itemsize = np.dtype(spec["dtype"]).itemsize
+                        with open(self._file(name), "r+b" if os.path.exists(self._file(name)) else "w+b") as f:
+                            f.truncate(start * itemsize)
+                            f.seek(start * itemsize)
+                            f.write(saved[name].tobytes())
+                            f.flush()
+                            os.fsync(f.fileno())
+                    print(f"♻️ FeatureStore {self.path}: reescritura incompleta deshecha")
+            self._remove(self.ROLLBACK)
+
+        rows = len(self)
+        for name, spec in self.meta["columns"].items():
+            size = os.path.getsize(self._file(name)) if os.path.exists(self._file(name)) else 0
+            rows = min(rows, size // np.dtype(spec["dtype"]).itemsize)
+        if rows < len(self):
+            print(f"⚠️ FeatureStore {self.path}: columnas incompletas, se conservan {rows} de {len(self)} filas")
+            self.meta["rows"] = rows
+            self._save_meta()
+
+    def _remove(self, name):
+        try:
+            os.remove(os.path.join(self.path, name))
+        except FileNotFoundError:
+            pass
+
+    def _save_meta(self):
+        self.meta["version"] = self.meta.get("version", 0) + 1
+        tmp = os.path.join(self.path, self.META + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump(self.meta, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, os.path.join(self.path, self.META))
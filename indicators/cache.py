@@ -0,0 +1,171 @@
+import math
+from collections import deque
+
+import numpy as np
+
+from indicators.streaming import EMA, RSI, SMA, BarCursor, RollingStd, Spread, _columns
+
+INDICATORS = {
+    "ema": EMA,
+    "sma": SMA,
+    "std": RollingStd,
+    "rsi": RSI,
+    "spread": Spread,
+}
+
+
+class _Node:
+    def __init__(self, key, indicator, sources, history):
+        self.key = key
+        self.indicator = indicator
+        self.sources = sources
+        self.closed = deque(maxlen=max(history - 1, 0))
+        self.last = math.nan
+        self.current = math.nan
+
+    def reset(self):
+        self.indicator.reset()
+        self.closed.clear()
+        self.last = math.nan
+        self.current = math.nan
+
+
+class FeatureCache:
+    """
+    Caché de indicadores compartida por todas las estrategias de un ciclo.
+
+    Cada indicador distinto (nombre, parámetros, origen) existe una sola vez y
+    se actualiza de forma incremental con las velas cerradas nuevas; la vela en
+    formación se evalúa sin consolidar. Los resultados se memorizan por
+    (indicador, parámetros, timestamp de la última vela) y se entregan como
+    arrays de sólo lectura con los últimos `history` valores (el último es la
+    vela actual), así que el DataFrame de velas nunca se modifica.
+
+    Un indicador puede tomar como origen una columna de velas o la salida de
+    otros indicadores (ej: la señal MACD es una EMA de la diferencia de EMAs),
+    lo que permite compartir las EMAs 12/26 entre estrategias.
+    """
+
+    def __init__(self, history=2):
+        self.history = history
+        self.cursor = BarCursor()
+        self._nodes = {}
+        self._memo = {}
+        self._df = None
+        self._last_time = None
+
+    def begin_cycle(self, df):
+        """Procesa las velas nuevas de `df` y descarta los resultados del ciclo anterior."""
+        self._df = df
+        self._memo.clear()
+        self._last_time = np.asarray(df["time"])[-1] if len(df) and "time" in _columns(df) else None
+        self._advance()
+        return self
+
+    def get(self, name, params=(), source="close"):
+        """
+        Devuelve un array de sólo lectura con los últimos valores del
+        indicador. `source` es una columna de velas o una tupla de claves de
+        otros indicadores ya registrados.
+        """
+        key = (name, tuple(params), source)
+        memo_key = (key, self._last_time)
+        if memo_key in self._memo:
+            return self._memo[memo_key]
+
+        node = self._nodes.get(key)
+        if node is None:
+            node = self._register(key)
+
+        values = np.array(list(node.closed) + [node.current], dtype=float)
+        if len(values) < self.history:
+            values = np.concatenate([np.full(self.history - len(values), math.nan), values])
+        values.flags.writeable = False
+        self._memo[memo_key] = values
+        return values
+
+    # === Atajos para los indicadores de las estrategias ===
+    def ema(self, span, column="close"):
+        return self.get("ema", (span,), column)
+
+    def sma(self, period, column="close"):
+        return self.get("sma", (period,), column)
+
+    def std(self, period, column="close"):
+        return self.get("std", (period,), column)
+
+    def rsi(self, period, column="close"):
+        return self.get("rsi", (period,), column)
+
+    def macd(self, fast_period, slow_period, signal_period, column="close"):
+        """Devuelve (macd, signal) reutilizando las EMAs ya registradas."""
+        fast = ("ema", (fast_period,), column)
+        slow = ("ema", (slow_period,), column)
+        self.get(*fast)
+        self.get(*slow)
+        line = ("spread", (), (fast, slow))
+        return self.get(*line), self.get("ema", (signal_period,), (line,))
+
+    # === Checkpoint ===
+    def state(self):
+        """
+        Estado incremental de los indicadores (y hasta qué vela cerrada se
+        procesó). Con restore() en otra instancia, el próximo begin_cycle sobre
+        las mismas velas sólo procesa las nuevas.
+        """
+        return {"history": self.history, "nodes": self._nodes, "last_time": self.cursor.last_time}
+
+    def restore(self, state):
+        if state["history"] != self.history:
+            raise ValueError(f"history distinto: {state['history']} != {self.history}")
+        self._nodes = state["nodes"]
+        self.cursor.last_time = state["last_time"]
+        self._memo.clear()
+        self._df = None
+        self._last_time = None
+
+    # === Internos ===
+    def _register(self, key):
+        name, params, source = key
+        if name not in INDICATORS:
+            raise ValueError(f"Indicador desconocido: {name}")
+        if not isinstance(source, str):
+            missing = [k for k in source if k not in self._nodes]
+            if missing:
+                raise ValueError(f"Indicadores de origen no registrados: {missing}")
+
+        node = _Node(key, INDICATORS[name](*params), source, self.history)
+        self._nodes[key] = node
+        # Un indicador nuevo necesita la historia completa de sus orígenes:
+        # se reprocesa la ventana actual (sólo ocurre la primera vez que se pide)
+        self.cursor.reset()
+        self._advance()
+        return node
+
+    def _inputs(self, node, columns, i, attr):
+        if isinstance(node.sources, str):
+            return (columns[node.sources][i],)
+        return tuple(getattr(self._nodes[k], attr) for k in node.sources)
+
+    def _advance(self):
+        df = self._df
+        if df is None or len(df) == 0 or not self._nodes:
+            return
+
+        start, reset = self.cursor.advance(df)
+        nodes = list(self._nodes.values())
+        if reset:
+            for node in nodes:
+                node.reset()
+
+        columns = {
+            node.sources: np.asarray(df[node.sources], dtype=float)
+            for node in nodes if isinstance(node.sources, str)
+        }
+        for i in range(start, len(df) - 1):
+            for node in nodes:
+                node.last = node.indicator.update(*self._inputs(node, columns, i, "last"))
+                node.closed.append(node.last)
+
+        for node in nodes:
+            node.current = node.indicator.peek(*self._inputs(node, columns, -1, "current"))
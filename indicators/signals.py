@@ -0,0 +1,16 @@
+import numpy as np
+import pandas as pd
+
+
+def to_signal_series(buy, sell, index, buy_label="buy", sell_label="sell"):
+    """
+    Convierte dos máscaras booleanas (compra/venta) en una serie de señales
+    por vela con `buy_label`, `sell_label` o None. La compra tiene prioridad,
+    igual que en el `if/elif` de generate_signal.
+    """
+    buy = np.asarray(buy, dtype=bool)
+    sell = np.asarray(sell, dtype=bool)
+    values = np.full(len(index), None, dtype=object)
+    values[sell] = sell_label
+    values[buy] = buy_label
+    return pd.Series(values, index=index, dtype=object)
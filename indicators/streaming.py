@@ -0,0 +1,249 @@
+import math
+from collections import deque
+
+import numpy as np
+
+
+class EMA:
+    """
+    Media móvil exponencial incremental (equivale a ewm(span, adjust=False)).
+    """
+
+    def __init__(self, span):
+        self.span = span
+        self.alpha = 2 / (span + 1)
+        self.reset()
+
+    def reset(self):
+        self.value = math.nan
+
+    def peek(self, x):
+        """Valor que tendría la EMA con `x` sin modificar el estado."""
+        if math.isnan(self.value):
+            return x
+        return self.value + self.alpha * (x - self.value)
+
+    def update(self, x):
+        self.value = self.peek(x)
+        return self.value
+
+
+class SMA:
+    """
+    Media móvil simple sobre una ventana fija (equivale a rolling(period).mean()).
+    """
+
+    def __init__(self, period):
+        self.period = period
+        self.reset()
+
+    def reset(self):
+        self.window = deque(maxlen=self.period)
+        self.total = 0.0
+
+    def _next_total(self, x):
+        if len(self.window) == self.period:
+            return self.total + x - self.window[0]
+        return self.total + x
+
+    def peek(self, x):
+        if len(self.window) + 1 < self.period:
+            return math.nan
+        return self._next_total(x) / self.period
+
+    def update(self, x):
+        value = self.peek(x)
+        self.total = self._next_total(x)
+        self.window.append(x)
+        return value
+
+
+class RollingStd:
+    """
+    Desvío estándar muestral (ddof=1) sobre una ventana fija, con
+    actualización tipo Welford al entrar y salir cada valor.
+    """
+
+    def __init__(self, period):
+        self.period = period
+        self.reset()
+
+    def reset(self):
+        self.window = deque(maxlen=self.period)
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def _next_state(self, x):
+        n = len(self.window)
+        mean, m2 = self.mean, self.m2
+        if n == self.period:
+            old = self.window[0]
+            if n == 1:
+                return x, 0.0
+            old_mean = mean
+            mean = (n * mean - old) / (n - 1)
+            m2 -= (old - old_mean) * (old - mean)
+            n -= 1
+        delta = x - mean
+        mean += delta / (n + 1)
+        m2 += delta * (x - mean)
+        return mean, max(m2, 0.0)
+
+    def peek(self, x):
+        if len(self.window) + 1 < self.period or self.period < 2:
+            return math.nan
+        _, m2 = self._next_state(x)
+        return math.sqrt(m2 / (self.period - 1))
+
+    def update(self, x):
+        value = self.peek(x)
+        self.mean, self.m2 = self._next_state(x)
+        self.window.append(x)
+        return value
+
+
+class RSI:
+    """
+    RSI con medias simples de ganancias y pérdidas, igual que RSIStrategy.
+    """
+
+    def __init__(self, period=14):
+        self.period = period
+        self.avg_gain = SMA(period)
+        self.avg_loss = SMA(period)
+        self.reset()
+
+    def reset(self):
+        self.avg_gain.reset()
+        self.avg_loss.reset()
+        self.prev_close = math.nan
+
+    @staticmethod
+    def _rsi(gain, loss):
+        if math.isnan(gain) or math.isnan(loss):
+            return math.nan
+        if loss == 0:
+            return math.nan if gain == 0 else 100.0
+        return 100 - (100 / (1 + gain / loss))
+
+    def peek(self, close):
+        if math.isnan(self.prev_close):
+            return math.nan
+        delta = close - self.prev_close
+        return self._rsi(self.avg_gain.peek(max(delta, 0.0)), self.avg_loss.peek(max(-delta, 0.0)))
+
+    def update(self, close):
+        if math.isnan(self.prev_close):
+            self.prev_close = close
+            return math.nan
+        delta = close - self.prev_close
+        self.prev_close = close
+        return self._rsi(self.avg_gain.update(max(delta, 0.0)), self.avg_loss.update(max(-delta, 0.0)))
+
+
+class MACD:
+    """
+    MACD incremental. Devuelve (macd, signal, hist).
+    """
+
+    def __init__(self, fast_period=12, slow_period=26, signal_period=9):
+        self.ema_fast = EMA(fast_period)
+        self.ema_slow = EMA(slow_period)
+        self.ema_signal = EMA(signal_period)
+
+    def reset(self):
+        self.ema_fast.reset()
+        self.ema_slow.reset()
+        self.ema_signal.reset()
+
+    def peek(self, close):
+        macd = self.ema_fast.peek(close) - self.ema_slow.peek(close)
+        signal = self.ema_signal.peek(macd)
+        return macd, signal, macd - signal
+
+    def update(self, close):
+        macd = self.ema_fast.update(close) - self.ema_slow.update(close)
+        signal = self.ema_signal.update(macd)
+        return macd, signal, macd - signal
+
+
+class Bollinger:
+    """
+    Bandas de Bollinger incrementales. Devuelve (sma, upper, lower).
+    """
+
+    def __init__(self, period=20, std_dev=2):
+        self.std_dev = std_dev
+        self.sma = SMA(period)
+        self.std = RollingStd(period)
+
+    def reset(self):
+        self.sma.reset()
+        self.std.reset()
+
+    def _bands(self, mean, std):
+        return mean, mean + self.std_dev * std, mean - self.std_dev * std
+
+    def peek(self, close):
+        return self._bands(self.sma.peek(close), self.std.peek(close))
+
+    def update(self, close):
+        return self._bands(self.sma.update(close), self.std.update(close))
+
+
+class Spread:
+    """
+    Diferencia entre dos entradas (ej: EMA rápida - EMA lenta = línea MACD).
+    """
+
+    def reset(self):
+        pass
+
+    def peek(self, a, b):
+        return a - b
+
+    def update(self, a, b):
+        return a - b
+
+
+def _columns(bars):
+    """Nombres de columna de un DataFrame o de un array estructurado de numpy."""
+    if hasattr(bars, "columns"):
+        return bars.columns
+    return bars.dtype.names or ()
+
+
+class BarCursor:
+    """
+    Recuerda la última vela cerrada ya procesada para saber qué filas de un
+    DataFrame de velas son nuevas. La última fila se considera la vela en
+    formación: nunca se consolida hasta que aparece una vela posterior.
+    """
+
+    def __init__(self, time_col="time"):
+        self.time_col = time_col
+        self.last_time = None
+
+    def reset(self):
+        self.last_time = None
+
+    def advance(self, df):
+        """
+        Devuelve (inicio, reiniciar). Las filas df[inicio:-1] son velas
+        cerradas todavía no procesadas; si `reiniciar` es True el estado del
+        indicador no enlaza con estos datos y hay que reprocesar desde cero.
+        """
+        n = len(df)
+        if self.time_col not in _columns(df):
+            self.last_time = None
+            return 0, True
+
+        times = np.asarray(df[self.time_col])
+        start, reset = 0, True
+        if self.last_time is not None and n >= 2:
+            pos = int(np.searchsorted(times, self.last_time, side="right"))
+            if 0 < pos < n and times[pos - 1] == self.last_time:
+                start, reset = pos, False
+
+        self.last_time = times[-2] if n >= 2 else None
+        return start, reset
@@ -1,20 +1,191 @@
+import atexit
 import csv
 from datetime import datetime
 import os
+import sqlite3
+import threading
+import time
+
+from metrics import METRICS
+
+COLUMNS = ['timestamp', 'symbol', 'signal', 'volume', 'price', 'sl', 'tp', 'order_id']
+
+
+def _clean(value):
+    """Redondea floats para no arrastrar ruido de representación (1.3691399999999998)."""
+    return None if value is None else round(float(value), 10)
+
 
 class TradeLogger:
-    def __init__(self, filename="trades_log.csv"):
+    """
+    Bitácora de operaciones en SQLite (modo WAL) con índices por timestamp,
+    símbolo y order_id. Exporta al mismo esquema del CSV histórico.
+
+    - Cada operación se agrega al buffer y se confirma cuando hay
+      `buffer_rows` filas o pasaron `sync_interval` segundos. Con el valor por
+      defecto (1) cada trade queda confirmado en el WAL al instante y sobrevive
+      a una caída del proceso.
+    - Cada `sync_interval` segundos se hace un checkpoint del WAL, que fuerza
+      el fsync a disco.
+    - Un hilo en segundo plano hace ese flush + checkpoint cada
+      `sync_interval` segundos aunque no lleguen trades nuevos, y close() se
+      registra con atexit: con `buffer_rows` > 1 un trade nunca queda en
+      memoria más de `sync_interval` segundos ni se pierde en una salida normal.
+    - Si la base está vacía y existe el CSV histórico, se importa al crearla.
+    """
+
+    def __init__(self, filename="trades_log.db", legacy_csv="trades_log.csv", buffer_rows=1, sync_interval=60):
         self.filename = filename
-        if not os.path.exists(self.filename):
-            with open(self.filename, 'w', newline='') as f:
-                writer = csv.writer(f)
-                writer.writerow(['timestamp', 'symbol', 'signal', 'volume', 'price', 'sl', 'tp', 'order_id'])
+        self.buffer_rows = buffer_rows
+        self.sync_interval = sync_interval
+        self._lock = threading.Lock()  # varios símbolos pueden registrar a la vez
+        self._buffer = []
+        self._last_flush = time.monotonic()
+        self._last_sync = time.monotonic()
+        self._closed = False
+        self._stop = threading.Event()
+
+        self.conn = sqlite3.connect(filename, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS trades (
+                id INTEGER PRIMARY KEY,
+                timestamp TEXT NOT NULL,
+                symbol TEXT NOT NULL,
+                signal TEXT,
+                volume REAL,
+                price REAL,
+                sl REAL,
+                tp REAL,
+                order_id INTEGER
+            );
+            CREATE INDEX IF NOT EXISTS idx_trades_timestamp ON trades (timestamp);
+            CREATE INDEX IF NOT EXISTS idx_trades_symbol_timestamp ON trades (symbol, timestamp);
+            CREATE INDEX IF NOT EXISTS idx_trades_order_id ON trades (order_id);
+        """)
+
+        if legacy_csv and os.path.exists(legacy_csv) and self.count() == 0:
+            self.import_csv(legacy_csv)
+
+        self._flusher = threading.Thread(target=self._flush_loop, name="trade-log-flush", daemon=True)
+        self._flusher.start()
+        atexit.register(self.close)
 
     def log_trade(self, symbol, signal, volume, price, sl, tp, order_id):
-        with open(self.filename, 'a', newline='') as f:
+        with METRICS.timer("trade_log"):
+            self._log_trade(symbol, signal, volume, price, sl, tp, order_id)
+        print(f"📝 Trade registrado: {symbol} {signal} @ {round(price, 5)}")
+
+    def _log_trade(self, symbol, signal, volume, price, sl, tp, order_id):
+        row = (
+            datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            symbol, signal, _clean(volume), _clean(price), _clean(sl), _clean(tp), order_id
+        )
+        with self._lock:
+            self._buffer.append(row)
+            if len(self._buffer) >= self.buffer_rows or time.monotonic() - self._last_flush >= self.sync_interval:
+                self._flush()
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def close(self):
+        self._stop.set()
+        if self._flusher is not threading.current_thread():
+            self._flusher.join()
+        atexit.unregister(self.close)
+        with self._lock:
+            if self._closed:
+                return
+            self._flush()
+            self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            self.conn.close()
+            self._closed = True
+
+    # === Consultas ===
+    def count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM trades").fetchone()[0]
+
+    def find(self, symbol=None, since=None, until=None, order_id=None):
+        """
+        Busca operaciones usando los índices. `since`/`until` son timestamps
+        con formato "%Y-%m-%d %H:%M:%S" y se comparan como texto, así que
+        `since` admite un prefijo (ej: "2025-07-08").
+        """
+        self.flush()
+        query, params = self._where(symbol, since, until, order_id)
+        cursor = self.conn.execute(f"SELECT {', '.join(COLUMNS)} FROM trades{query} ORDER BY timestamp, id", params)
+        return [dict(zip(COLUMNS, row)) for row in cursor]
+
+    def export_csv(self, path="trades_log.csv", **filters):
+        """Exporta al esquema del CSV histórico, con los floats sin ruido."""
+        rows = self.find(**filters)
+        with open(path, 'w', newline='') as f:
             writer = csv.writer(f)
-            writer.writerow([
-                datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                symbol, signal, volume, price, sl, tp, order_id
-            ])
-        print(f"📝 Trade registrado: {symbol} {signal} @ {price}")
+            writer.writerow(COLUMNS)
+            for row in rows:
+                writer.writerow([
+                    format(value, '.10g') if isinstance(value, float) else value
+                    for value in (row[col] for col in COLUMNS)
+                ])
+        print(f"📤 {len(rows)} trades exportados a {path}")
+        return len(rows)
+
+    def import_csv(self, path):
+        with open(path, newline='') as f:
+            rows = [
+                (r['timestamp'], r['symbol'], r['signal'], _clean(r['volume']), _clean(r['price']),
+                 _clean(r['sl']), _clean(r['tp']), int(r['order_id']) if r['order_id'] else None)
+                for r in csv.DictReader(f)
+            ]
+        with self._lock:
+            self._insert(rows)
+        print(f"📥 {len(rows)} trades importados desde {path}")
+
+    # === Internos ===
+    def _flush_loop(self):
+        while not self._stop.wait(self.sync_interval):
+            with self._lock:
+                if not self._closed:
+                    self._flush()
+
+    def _flush(self):
+        if self._buffer:
+            self._insert(self._buffer)
+            self._buffer = []
+        self._last_flush = time.monotonic()
+        if time.monotonic() - self._last_sync >= self.sync_interval:
+            # El checkpoint copia el WAL a la base y hace fsync
+            self.conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+            self._last_sync = time.monotonic()
+
+    def _insert(self, rows):
+        with self.conn:
+            self.conn.execute("BEGIN")
+            self.conn.executemany(
+                f"INSERT INTO trades ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})", rows
+            )
+
+    @staticmethod
+    def _where(symbol, since, until, order_id):
+        clauses, params = [], []
+        if symbol is not None:
+            clauses.append("symbol = ?")
+            params.append(symbol)
+        if since is not None:
+            clauses.append("timestamp >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("timestamp <= ?")
+            params.append(until)
+        if order_id is not None:
+            clauses.append("order_id = ?")
+            params.append(order_id)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+
+if __name__ == "__main__":
+    # Exporta la bitácora al CSV con el esquema histórico
+    TradeLogger(legacy_csv=None).export_csv("trades_log_export.csv")
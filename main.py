@@ -1,126 +1,224 @@
 import time
+INICIO = time.perf_counter()  # para medir cuánto tarda el bot en volver al loop después de un reinicio
 from datetime import datetime, timedelta, timezone
 import os
 from dotenv import load_dotenv
+
+# === Cargar credenciales ===
+load_dotenv()
+
+# === Simulador offline opcional: MT5_SIM="USDCAD=velas_USDCAD.csv,EURUSD=velas_EURUSD.parquet" ===
+# Reemplaza al módulo MetaTrader5, así que tiene que instalarse antes de importarlo
+SIMULADOR = None
+if os.getenv("MT5_SIM"):
+    from backtest import mt5_sim
+    SIMULADOR = mt5_sim.install(
+        dict(par.split("=", 1) for par in os.getenv("MT5_SIM").split(",")),
+        latency=float(os.getenv("MT5_SIM_LATENCIA_MS", "0")) / 1000,
+        reject_rate=float(os.getenv("MT5_SIM_RECHAZOS", "0")),
+        error_rate=float(os.getenv("MT5_SIM_ERRORES", "0")),
+        seed=int(os.getenv("MT5_SIM_SEMILLA", "0")),
+        start=os.getenv("MT5_SIM_INICIO") or None,  # ej: "2024-03-01 12:00" para probar un reinicio a mitad del día
+    )
+
 import MetaTrader5 as mt5
 
+from checkpoint import Checkpoint
+from decider.model_decider import ModelDecider
 from mt5_connector import MT5Connector
-from data_fetcher import DataFetcher
-from trader import Trader
+from engine import MT5Pool, RiskLimits, SymbolPipeline, TradingEngine
 from logger import TradeLogger
+from metrics import METRICS
 from notifier import Notifier
-from strategy_manager import StrategyManager
+from positions import PositionBook
+from profiler import PROFILER
+from scheduler import BarCloseScheduler
+from strategy_manager import default_strategies
+from tick_stream import TickStreamer
 
-# === Cargar credenciales ===
-load_dotenv()
 MT5_PATH = os.getenv("MT5_PATH")
-MT5_LOGIN = int(os.getenv("MT5_LOGIN"))
+MT5_LOGIN = int(os.getenv("MT5_LOGIN", "0"))
 MT5_PASSWORD = os.getenv("MT5_PASSWORD")
 MT5_SERVER = os.getenv("MT5_SERVER")
 
 TELEGRAM_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
 
+# === Símbolos y límites globales ===
+SYMBOLS = [s.strip() for s in os.getenv("SYMBOLS", "USDCAD").split(",") if s.strip()]
+MT5_WORKERS = int(os.getenv("MT5_WORKERS", "4"))        # llamadas simultáneas a MT5
+# Los límites cuentan sólo las posiciones de SYMBOLS (las manuales o de otros EAs sobre otros símbolos no)
+MAX_POSICIONES = int(os.getenv("MAX_POSICIONES", "5"))  # posiciones abiertas entre todos los símbolos del bot
+MAX_VOLUMEN_TOTAL = float(os.getenv("MAX_VOLUMEN_TOTAL")) if os.getenv("MAX_VOLUMEN_TOTAL") else None
+SYNC_POSICIONES_SEG = float(os.getenv("SYNC_POSICIONES_SEG", "60"))  # reconciliación completa con positions_get
+
+# === Estrategias activas (por nombre, ver STRATEGIES en strategy_manager.py); vacío = todas ===
+ESTRATEGIAS = [s.strip() for s in os.getenv("ESTRATEGIAS", "").split(",") if s.strip()]
+
+# === Checkpoint del estado caliente (velas, indicadores, última señal y posiciones) ===
+# Se reescribe en cada ciclo; al reiniciar se retoma si no es más viejo que CHECKPOINT_MAX_EDAD_SEG
+CHECKPOINT_ARCHIVO = os.getenv("CHECKPOINT_ARCHIVO", "checkpoint.pkl")  # vacío = desactivado
+CHECKPOINT_MAX_EDAD_SEG = float(os.getenv("CHECKPOINT_MAX_EDAD_SEG", "3600"))
+
+# === Decider con modelo entrenado opcional (si no, votación por mayoría) ===
+DECIDER_MODELO = os.getenv("DECIDER_MODELO")  # ej: models/decider.pkl
+
+# === Métricas de latencia por etapa (Prometheus en /metrics y snapshot JSON) ===
+METRICAS_PUERTO = int(os.getenv("METRICAS_PUERTO")) if os.getenv("METRICAS_PUERTO") else None
+METRICAS_JSON = os.getenv("METRICAS_JSON", "metrics_snapshot.json")
+
+# === Perfilado bajo demanda (ver profiler.py), resultados en profiles/ ===
+# PERFILAR="every=50" o "strategy=RSIStrategy", como variable de entorno o como contenido
+# de un archivo PERFILAR en el directorio de trabajo (se puede crear y borrar con el bot andando)
+
+# === Modo streaming (ticks) opcional ===
+MODO_STREAMING = os.getenv("MODO_STREAMING", "0") == "1"
+DISPARADORES_INTRAVELA = ["BreakoutStrategy"]  # estrategias que pueden disparar un ciclo dentro de la vela
+
 # === Cierre diario automático a las 17:00 GMT-3 ===
-def es_hora_de_cerrar():
-    ahora_utc = datetime.now(timezone.utc)
-    ahora_local = ahora_utc.astimezone(timezone(timedelta(hours=-3)))
-    return ahora_local.hour == 17 and ahora_local.minute < 20
+ZONA_LOCAL = timezone(timedelta(hours=-3))
+HORA_CIERRE = 17
+VENTANA_CIERRE_MIN = 20
+
+def es_hora_de_cerrar(ahora=None):
+    ahora_utc = datetime.now(timezone.utc) if ahora is None else datetime.fromtimestamp(ahora, timezone.utc)
+    ahora_local = ahora_utc.astimezone(ZONA_LOCAL)
+    return ahora_local.hour == HORA_CIERRE and ahora_local.minute < VENTANA_CIERRE_MIN
 
 def main():
     # === CONFIGURACIÓN GENERAL ===
-    symbol = "USDCAD"
+    symbols = SYMBOLS
     capital = 1000
     risk_pct = 1
     sl_pips = 30
     tp_pips = 60
-    intervalo_segundos = 300  # 5 minutos
 
     # === INICIALIZACIÓN ===
     connector = MT5Connector(MT5_PATH, MT5_LOGIN, MT5_PASSWORD, MT5_SERVER)
     connector.connect()
 
-    trader = Trader(symbol)
     logger = TradeLogger()
+    METRICS.serve(port=METRICAS_PUERTO, json_path=METRICAS_JSON)
     notifier = Notifier(TELEGRAM_TOKEN, TELEGRAM_CHAT_ID)  # 🔕 Descomentar si querés usarlo
 
-    from strategies.ema_crossover import EMACrossoverStrategy
-    from strategies.rsi_strategy import RSIStrategy
-    from strategies.macd_strategy import MACDStrategy
-    from strategies.bollinger_strategy import BollingerStrategy
-    from strategies.adx_strategy import ADXStrategy
-    from strategies.breakout_strategy import BreakoutStrategy
-    from strategies.price_action_strategy import PriceActionStrategy
-    from strategies.volume_strategy import VolumeStrategy
-
-    strategies = [
-        EMACrossoverStrategy(),
-        RSIStrategy(),
-        MACDStrategy(),
-        BollingerStrategy(),
-        ADXStrategy(),
-        BreakoutStrategy(),
-        PriceActionStrategy(),
-        VolumeStrategy()
+    # === Planificación: despertar al cierre de cada vela y cierre diario como evento propio ===
+    if SIMULADOR:
+        # Reloj simulado: las esperas entre velas no consumen tiempo real
+        scheduler = BarCloseScheduler(mt5.TIMEFRAME_M5, clock=SIMULADOR.clock, sleep=SIMULADOR.sleep)
+    else:
+        scheduler = BarCloseScheduler(mt5.TIMEFRAME_M5)
+    scheduler.add_daily_event("cierre_diario", HORA_CIERRE, 0, ZONA_LOCAL, window_minutes=VENTANA_CIERRE_MIN)
+
+    # === Una pipeline aislada por símbolo, con pool MT5 y límites de riesgo compartidos ===
+    pool = MT5Pool(MT5_WORKERS)
+    risk = RiskLimits(MAX_POSICIONES, MAX_VOLUMEN_TOTAL, symbols)
+    if SIMULADOR:
+        book = PositionBook(mt5, SYNC_POSICIONES_SEG, clock=SIMULADOR.clock, wall_clock=SIMULADOR.clock)
+    else:
+        book = PositionBook(mt5, SYNC_POSICIONES_SEG)
+    checkpoint = None
+    if CHECKPOINT_ARCHIVO:
+        checkpoint = Checkpoint(CHECKPOINT_ARCHIVO, book, CHECKPOINT_MAX_EDAD_SEG,
+                                clock=SIMULADOR.clock if SIMULADOR else time.time)
+    # El modelo se carga una sola vez; cada símbolo tiene su ModelDecider sobre su propia FeatureCache
+    pipelines = [
+        SymbolPipeline(symbol, default_strategies(ESTRATEGIAS), pool, risk, logger, notifier, scheduler,
+                       capital, risk_pct, sl_pips, tp_pips,
+                       decider=ModelDecider(DECIDER_MODELO) if DECIDER_MODELO else None, book=book,
+                       checkpoint=checkpoint)
+        for symbol in symbols
     ]
-
-    strategy_mgr = StrategyManager(strategies)
-
-    print("🚀 Bot iniciado. Escuchando señales cada 5 minutos...\n")
-    notifier.send("🚀 Bot iniciado. Escuchando señales cada 5 minutos...\n")
+    engine = TradingEngine(pipelines, pool, risk, notifier, book)
+    if checkpoint is not None:
+        # Velas e indicadores al día hasta el último ciclo: el primero después del reinicio no recalienta
+        checkpoint.restore(pipelines)
+
+    def cierre_diario(event):
+        if es_hora_de_cerrar(event.time):
+            print("🕔 Hora de cierre automático. Cerrando posiciones...")
+            reporte = engine.close_all()
+            resumen = (f"{reporte['orders']} órdenes en {reporte['rounds']} ronda(s), "
+                       f"sin posiciones en {reporte['seconds'] * 1000:.0f} ms "
+                       f"(cierre más lento: {reporte['max_close_latency'] * 1000:.0f} ms)")
+            if reporte["flat"]:
+                print(f"🔒 {resumen}")
+                notifier.send(f"🔒 Posiciones cerradas (cierre diario): {resumen}.", priority=notifier.HIGH)
+            else:
+                print(f"⚠️ Quedaron posiciones abiertas: {reporte['remaining']}")
+                notifier.send(f"⚠️ Cierre diario incompleto, quedan abiertas: {reporte['remaining']}",
+                              priority=notifier.HIGH)
+            if checkpoint is not None:
+                checkpoint.clear()  # el día siguiente arranca en frío
+            notifier.close()  # esperar a que salgan las notificaciones pendientes
+            logger.close()
+            METRICS.close(json_path=METRICAS_JSON)
+            engine.shutdown()
+            exit(42)
+
+    if MODO_STREAMING:
+        # === Modo streaming: velas construidas tick a tick y disparadores intravela, un streamer por símbolo ===
+        streamers = []
+        for pipeline in pipelines:
+            streamer = TickStreamer(pipeline.symbol, pipeline.fetcher, clock=scheduler.clock)
+            for strat in pipeline.strategies:
+                if strat.__class__.__name__ in DISPARADORES_INTRAVELA:
+                    streamer.add_trigger(strat.__class__.__name__, strat.generate_signal)
+            streamer.start()
+            streamers.append((pipeline, streamer))
+        poll_interval = min(streamer.poll_interval for _, streamer in streamers)
+
+        print(f"🚀 Bot iniciado en modo streaming ({', '.join(symbols)}) en {time.perf_counter() - INICIO:.2f} s. "
+              f"Escuchando ticks...\n")
+        notifier.send(f"🚀 Bot iniciado en modo streaming ({', '.join(symbols)}). Escuchando ticks...\n")
+
+        while True:
+            try:
+                for event in scheduler.due_events():
+                    cierre_diario(event)
+            except Exception as e:
+                print(f"⚠️ Error en el ciclo: {e}")
+                notifier.send(f"⚠️ Error en el ciclo del bot:\n{e}")
+
+            for pipeline, streamer in streamers:
+                try:
+                    for event in streamer.poll():
+                        if event.signal:
+                            print(f"⚡ [{pipeline.symbol}] Disparador intravela {event.name}: {event.signal}")
+                        mark = risk.mark()
+                        with METRICS.timer("positions_sync"):
+                            book.sync()
+                        risk.sync(book.positions(), mark)
+                        with PROFILER.cycle(pipeline.symbol):
+                            pipeline.run_cycle(streamer.bars(), event)
+                        pipeline.save_checkpoint()
+
+                except Exception as e:
+                    # Un símbolo con error no frena a los demás
+                    print(f"⚠️ [{pipeline.symbol}] Error en el ciclo: {e}")
+                    notifier.send(f"⚠️ Error en el ciclo del bot ({pipeline.symbol}):\n{e}")
+
+            time.sleep(poll_interval)
+
+    print(f"🚀 Bot iniciado ({', '.join(symbols)}) en {time.perf_counter() - INICIO:.2f} s. Escuchando señales al cierre de cada vela M5...\n")
+    notifier.send(f"🚀 Bot iniciado ({', '.join(symbols)}). Escuchando señales al cierre de cada vela M5...\n")
 
     while True:
         try:
-            if es_hora_de_cerrar():
-                print("🕔 Hora de cierre automático. Cerrando posiciones...")
-                trader.close_positions()
-                notifier.send("🔒 Posiciones cerradas (cierre diario).")
-                exit(42)
-
-            # === Obtener datos ===
-            fetcher = DataFetcher(symbol)
-            df = fetcher.get_ohlcv()
-            print("📋 Columnas del dataframe:", df.columns.tolist())
-
-            # === Generar señales ===
-            signals = strategy_mgr.generate_signals(df)
-            print(f"📊 Señales generadas:")
-            for strat, sig in signals.items():
-                print(f"  - {strat}: {sig}")
-
-            # === Resolver mejor señal con Decider ===
-            current_signal = strategy_mgr.resolve_signal(signals, df)
-            print(f"🎯 Señal seleccionada: {current_signal}")
-
-            # === Cerrar posiciones si cambia la señal ===
-            strategy_mgr.close_on_signal_change(current_signal)
-
-            # === Ejecutar orden si corresponde ===
-            if strategy_mgr.should_trade(current_signal):
-                posiciones_abiertas = mt5.positions_get(symbol=symbol)
-                if not posiciones_abiertas:
-                    vol = trader.calculate_volume(capital, risk_pct, sl_pips)
-                    result = trader.send_order(current_signal, vol, sl_pips, tp_pips)
-                    if result:
-                        logger.log_trade(
-                            symbol, current_signal, vol, result.price,
-                            result.request.sl, result.request.tp, result.order
-                        )
-                        notifier.send(
-                            f"📥 Orden ejecutada:\n{symbol} {current_signal.upper()} @ {round(result.price, 5)}\n"
-                            f"SL: {round(result.request.sl, 5)} | TP: {round(result.request.tp, 5)}"
-                        )
-                else:
-                    print("⏸ Ya hay una posición abierta.")
-            else:
-                print("⏳ Sin nueva señal. Esperando siguiente ciclo...")
+            event = scheduler.wait()
+
+            if event.name == "cierre_diario":
+                cierre_diario(event)
+                continue
+
+            engine.run_cycle(event)
+            if SIMULADOR:
+                # Con reloj simulado la espera a la próxima vela es instantánea:
+                # hay que dejar terminar el ciclo antes de adelantar el reloj
+                engine.wait_idle()
 
         except Exception as e:
             print(f"⚠️ Error en el ciclo: {e}")
             notifier.send(f"⚠️ Error en el ciclo del bot:\n{e}")
 
-        time.sleep(intervalo_segundos)
-
-
 if __name__ == "__main__":
     main()
@@ -0,0 +1,194 @@
+import bisect
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+# Límites (segundos) de los buckets acumulados que se exportan a Prometheus
+BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class LatencyHistogram:
+    """
+    Latencias de una etapa: buckets acumulados desde el arranque (formato
+    histograma de Prometheus) y las últimas `window` muestras para los
+    percentiles móviles p50/p95/p99.
+    """
+
+    def __init__(self, window=1000):
+        self.counts = [0] * (len(BUCKETS) + 1)  # el último es +Inf
+        self.total = 0
+        self.sum = 0.0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.total += 1
+        self.sum += seconds
+        self.recent.append(seconds)
+
+    def quantiles(self):
+        if not self.recent:
+            return {}
+        values = np.quantile(np.fromiter(self.recent, dtype=float), QUANTILES)
+        return {f"p{round(q * 100)}": float(v) for q, v in zip(QUANTILES, values)}
+
+
+class Metrics:
+    """
+    Registro de latencias por etapa del ciclo, thread-safe.
+
+    Cada serie es una etapa más sus etiquetas (ej: stage="strategy",
+    strategy="RSIStrategy"). Se exporta como texto de Prometheus
+    (prometheus_text, o por HTTP con serve) y como snapshot JSON
+    (snapshot / write_json).
+    """
+
+    def __init__(self, window=1000, prefix="trading_bot"):
+        self.window = window
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._series = {}
+        self._server = None
+        self._writer = None
+        self._stop = threading.Event()
+
+    def observe(self, stage, seconds, **labels):
+        key = (stage, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            histogram = self._series.get(key)
+            if histogram is None:
+                histogram = self._series[key] = LatencyHistogram(self.window)
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timer(self, stage, **labels):
+        """Mide el bloque `with` (también si termina con una excepción)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start, **labels)
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    # === Exportación ===
+    def snapshot(self):
+        """Lista de series con count, sum y percentiles móviles (segundos)."""
+        with self._lock:
+            items = [(key, h.total, h.sum, h.quantiles()) for key, h in self._series.items()]
+        return {
+            "time": time.time(),
+            "series": [
+                {"stage": stage, "labels": dict(labels), "count": total, "sum": total_sum, **quantiles}
+                for (stage, labels), total, total_sum, quantiles in sorted(items)
+            ],
+        }
+
+    def write_json(self, path):
+        """Escribe el snapshot de forma atómica (nunca queda un JSON a medio escribir)."""
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.snapshot(), f, indent=2)
+        os.replace(tmp, path)
+
+    def prometheus_text(self):
+        name = f"{self.prefix}_stage_latency_seconds"
+        rolling = f"{self.prefix}_stage_latency_rolling_seconds"
+        with self._lock:
+            items = sorted((key, list(h.counts), h.total, h.sum, h.quantiles()) for key, h in self._series.items())
+
+        lines = [
+            f"# HELP {name} Latencia de cada etapa del ciclo.",
+            f"# TYPE {name} histogram",
+        ]
+        for (stage, labels), counts, total, total_sum, _ in items:
+            base = _labels(stage, labels)
+            cumulative = 0
+            for bound, count in zip(BUCKETS + ("+Inf",), counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{base},le="{bound}"}} {cumulative}')
+            lines.append(f"{name}_sum{{{base}}} {total_sum}")
+            lines.append(f"{name}_count{{{base}}} {total}")
+
+        lines += [
+            f"# HELP {rolling} Percentiles de las últimas muestras de cada etapa.",
+            f"# TYPE {rolling} gauge",
+        ]
+        for (stage, labels), _, _, _, quantiles in items:
+            base = _labels(stage, labels)
+            for q, (key, value) in zip(QUANTILES, quantiles.items()):
+                lines.append(f'{rolling}{{{base},quantile="{q}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port=None, host="127.0.0.1", json_path=None, interval=10):
+        """
+        Exporta en segundo plano: endpoint HTTP local (/metrics en texto de
+        Prometheus, /snapshot.json) si hay `port`, y el snapshot JSON en
+        `json_path` cada `interval` segundos.
+        """
+        if port is not None and self._server is None:
+            metrics = self
+
+            class Handler(BaseHTTPRequestHandler):
+                def do_GET(self):
+                    if self.path == "/metrics":
+                        body, kind = metrics.prometheus_text().encode(), "text/plain; version=0.0.4"
+                    elif self.path == "/snapshot.json":
+                        body, kind = json.dumps(metrics.snapshot()).encode(), "application/json"
+                    else:
+                        self.send_error(404)
+                        return
+                    self.send_response(200)
+                    self.send_header("Content-Type", kind)
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+                def log_message(self, *args):
+                    pass  # sin una línea por request en la consola del bot
+
+            self._server = ThreadingHTTPServer((host, port), Handler)
+            self._server.daemon_threads = True
+            threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True).start()
+            print(f"📈 Métricas en http://{host}:{self._server.server_address[1]}/metrics")
+
+        if json_path and self._writer is None:
+            def write_loop():
+                while not self._stop.wait(interval):
+                    self.write_json(json_path)
+
+            self._writer = threading.Thread(target=write_loop, name="metrics-json", daemon=True)
+            self._writer.start()
+        return self
+
+    def close(self, json_path=None):
+        """Detiene la exportación; con `json_path` escribe un último snapshot."""
+        self._stop.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if json_path:
+            self.write_json(json_path)
+
+
+def _labels(stage, labels):
+    pairs = [("stage", stage)] + list(labels)
+    return ",".join(f'{k}="{_escape(v)}"' for k, v in pairs)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# Registro global del proceso: cualquier módulo mide con METRICS.timer(...)
+METRICS = Metrics()
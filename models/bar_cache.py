@@ -0,0 +1,135 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+import MetaTrader5 as mt5
+
+TIMEFRAME_NAMES = {
+    mt5.TIMEFRAME_M1: 'M1',
+    mt5.TIMEFRAME_M5: 'M5',
+    mt5.TIMEFRAME_M15: 'M15',
+    mt5.TIMEFRAME_M30: 'M30',
+    mt5.TIMEFRAME_H1: 'H1',
+    mt5.TIMEFRAME_H4: 'H4',
+    mt5.TIMEFRAME_D1: 'D1',
+}
+
+RATE_COLUMNS = ['time', 'open', 'high', 'low', 'close', 'tick_volume', 'spread', 'real_volume']
+
+
+class BarCache:
+    """
+    On-disk cache of MT5 bars, one Parquet file per symbol, timeframe and
+    calendar chunk (quarter by default):
+
+        {cache_dir}/{symbol}/{timeframe}/{chunk}.parquet
+
+    A chunk file only exists once the whole chunk has been downloaded, so an
+    interrupted download resumes from the first missing chunk. Chunks that
+    reach into the present are always re-fetched and never stored.
+
+    Symbols are fetched concurrently; `max_concurrent_calls` bounds how many
+    MT5 requests are in flight at once.
+    """
+
+    def __init__(self, cache_dir: str = 'data/bars', chunk_freq: str = 'Q',
+                 max_workers: int = 4, max_concurrent_calls: int = 4,
+                 connect: Optional[Callable[[], bool]] = None):
+        self.cache_dir = cache_dir
+        self.chunk_freq = chunk_freq
+        self.max_workers = max_workers
+        self.connect = connect
+        self._calls = threading.Semaphore(max_concurrent_calls)
+        self._connect_lock = threading.Lock()
+        self._count_lock = threading.Lock()
+        self.connected = False
+        self.downloaded_chunks = 0
+
+    def get(self, symbol: str, start: datetime, end: datetime,
+            timeframe=mt5.TIMEFRAME_H1) -> pd.DataFrame:
+        """
+        Bars of `symbol` between `start` and `end` (inclusive), served from
+        disk and downloading only the chunks that are missing.
+        """
+        frames = []
+        for period in pd.period_range(start, end, freq=self.chunk_freq):
+            frame = self._load_chunk(symbol, timeframe, period)
+            if frame is None:
+                frame = self._download_chunk(symbol, timeframe, period)
+            if frame is not None and not frame.empty:
+                frames.append(frame)
+
+        if not frames:
+            return pd.DataFrame(columns=RATE_COLUMNS)
+        df = pd.concat(frames, ignore_index=True)
+        mask = (df['time'] >= pd.Timestamp(start)) & (df['time'] <= pd.Timestamp(end))
+        return df.loc[mask].reset_index(drop=True)
+
+    def get_many(self, symbols: List[str], start: datetime, end: datetime,
+                 timeframe=mt5.TIMEFRAME_H1) -> Dict[str, pd.DataFrame]:
+        """
+        Fetch several symbols concurrently. Returns {symbol: bars} in the given
+        order; symbols without data map to an empty frame. Any other error
+        (e.g. ConnectionError from a broken MT5 connection) cancels the
+        pending symbols and is raised, so a failed download never turns into
+        a silently partial dataset.
+        """
+        results = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='bars') as executor:
+            futures = {executor.submit(self.get, s, start, end, timeframe): s for s in symbols}
+            for future in as_completed(futures):
+                symbol = futures[future]
+                try:
+                    results[symbol] = future.result()
+                except Exception as e:
+                    print(f"Error fetching data for {symbol}: {e}")
+                    executor.shutdown(wait=True, cancel_futures=True)
+                    raise
+        return {s: results[s] for s in symbols}
+
+    def chunk_path(self, symbol: str, timeframe, period: pd.Period) -> str:
+        name = TIMEFRAME_NAMES.get(timeframe, str(timeframe))
+        return os.path.join(self.cache_dir, symbol, name, f'{period}.parquet')
+
+    def _load_chunk(self, symbol: str, timeframe, period: pd.Period) -> Optional[pd.DataFrame]:
+        path = self.chunk_path(symbol, timeframe, period)
+        if not os.path.exists(path):
+            return None
+        return pd.read_parquet(path)
+
+    def _download_chunk(self, symbol: str, timeframe, period: pd.Period) -> Optional[pd.DataFrame]:
+        self._ensure_connected()
+        chunk_start = period.start_time.to_pydatetime().replace(tzinfo=timezone.utc)
+        chunk_end = period.end_time.floor('s').to_pydatetime().replace(tzinfo=timezone.utc)
+
+        with self._calls:
+            rates = mt5.copy_rates_range(symbol, timeframe, chunk_start, chunk_end)
+        if rates is None:
+            # Terminal error: nothing is stored so the next run retries this chunk
+            print(f"No data for {symbol} {period}: {mt5.last_error()}")
+            return None
+
+        df = pd.DataFrame(rates, columns=RATE_COLUMNS)
+        df['time'] = pd.to_datetime(df['time'], unit='s')
+
+        if chunk_end < datetime.now(timezone.utc):
+            path = self.chunk_path(symbol, timeframe, period)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f'{path}.tmp'
+            df.to_parquet(tmp, index=False)
+            os.replace(tmp, path)  # atomic: an interruption never leaves a half-written chunk
+            with self._count_lock:
+                self.downloaded_chunks += 1
+        return df
+
+    def _ensure_connected(self):
+        if self.connect is None or self.connected:
+            return
+        with self._connect_lock:
+            if not self.connected:
+                if not self.connect():
+                    raise ConnectionError("MT5 initialization failed")
+                self.connected = True
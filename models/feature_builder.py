@@ -0,0 +1,241 @@
+import time
+import tracemalloc
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from models.lagged_features import LaggedFeatures
+
+TARGET_COLUMNS = ['target', 'target_class', 'target_multiclass']
+
+
+class FeatureBuilder:
+    """
+    Single-pass builder for the TradingDataPipeline feature matrix.
+
+    Produces the same columns, in the same order, as the original
+    join → calculate_technical_indicators → create_lagged_features →
+    create_target_variable chain, but every feature is computed once into
+    its own numpy array and all of them are stacked into a single
+    contiguous block at the end: no per-symbol `df.copy()` of the growing
+    frame and no column-by-column inserts.
+
+    All columns share one dtype (float64, or float32 with `dtype=np.float32`);
+    signal columns and `target_multiclass` are stored as numeric codes.
+
+    The close/returns lags are always available as `self.lags` (strided
+    views, see LaggedFeatures). With `lazy_lags=True` they are left out of
+    the matrix instead of being materialized as columns.
+    """
+
+    def __init__(self, pipeline, dtype=np.float64, track_memory: bool = True, lazy_lags: bool = False):
+        self.pipeline = pipeline
+        self.dtype = np.dtype(dtype)
+        self.track_memory = track_memory
+        self.lazy_lags = lazy_lags
+        self.lags: Optional[LaggedFeatures] = None
+        self.report: Dict[str, float] = {}
+
+    def build(self, data: Dict[str, pd.DataFrame], target_symbol: str = 'USDCAD',
+              horizon: int = 1) -> pd.DataFrame:
+        if target_symbol not in data:
+            raise ValueError(f"{target_symbol} data not found")
+
+        start = time.perf_counter()
+        tracing = self.track_memory and not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start()
+
+        index = data[target_symbol].index
+        columns = self._raw_columns(data, target_symbol, index)
+        names: List[str] = list(columns)
+        blocks: List[np.ndarray] = [self._cast(values) for values in columns.values()]
+
+        for symbol in self.pipeline.all_symbols:
+            if symbol in data:
+                for name, values in self._indicators(columns, symbol):
+                    columns[name] = values
+                    names.append(name)
+                    blocks.append(self._cast(values))
+
+        self.lags = self._lagged(columns, target_symbol, index)
+        if self.lags is not None and not self.lazy_lags:
+            for name, values in self._lag_columns(self.lags):
+                names.append(name)
+                blocks.append(self._cast(values))
+
+        for name, values in self._target(columns, target_symbol, horizon):
+            names.append(name)
+            blocks.append(self._cast(values))
+
+        for name, values in self._time_features(index):
+            names.append(name)
+            blocks.append(self._cast(values))
+
+        del columns
+        # One (features, rows) block: each column is a contiguous row and the
+        # DataFrame wraps the transpose without copying
+        matrix = np.stack(blocks)
+        del blocks
+        df = pd.DataFrame(matrix.T, index=index, columns=names, copy=False)
+
+        self.report = {
+            'rows': len(df),
+            'columns': len(names),
+            'matrix_mb': matrix.nbytes / 1e6,
+            'lags_mb': self.lags.nbytes / 1e6 if self.lags is not None else 0.0,
+            'seconds': time.perf_counter() - start,
+        }
+        if tracing:
+            self.report['peak_mb'] = tracemalloc.get_traced_memory()[1] / 1e6
+            tracemalloc.stop()
+        return df
+
+    def print_report(self):
+        peak = f", peak {self.report['peak_mb']:.0f} MB" if 'peak_mb' in self.report else ""
+        lags = f" (+{self.report['lags_mb']:.0f} MB lazy lags)" if self.lazy_lags else ""
+        print(f"Feature matrix: {self.report['rows']} x {self.report['columns']} {self.dtype}, "
+              f"{self.report['matrix_mb']:.0f} MB{lags}{peak}, built in {self.report['seconds']:.2f}s")
+
+    # === Feature blocks ===
+    def _cast(self, values) -> np.ndarray:
+        return np.asarray(values, dtype=self.dtype)
+
+    @staticmethod
+    def _raw_columns(data: Dict[str, pd.DataFrame], target_symbol: str,
+                     index: pd.Index) -> Dict[str, pd.Series]:
+        """Raw OHLCV columns aligned to the target index (same as the left joins)."""
+        columns = {}
+        for symbol, df in [(target_symbol, data[target_symbol])] + \
+                [(s, d) for s, d in data.items() if s != target_symbol]:
+            aligned = df if symbol == target_symbol else df.reindex(index)
+            for col in aligned.columns:
+                columns[col] = aligned[col]
+        return columns
+
+    def _indicators(self, columns: Dict[str, pd.Series], symbol: str) -> List[Tuple[str, pd.Series]]:
+        """Same indicators as TradingDataPipeline.calculate_technical_indicators."""
+        strategies = self.pipeline.strategies
+        close_col = f'{symbol}_close'
+        high_col = f'{symbol}_high'
+        low_col = f'{symbol}_low'
+        volume_col = f'{symbol}_tick_volume'
+        if close_col not in columns:
+            return []
+
+        close = columns[close_col]
+        out = {}
+
+        # Price features
+        returns = close.pct_change()
+        out[f'{symbol}_returns'] = returns
+        out[f'{symbol}_log_returns'] = np.log(close / close.shift(1))
+        out[f'{symbol}_volatility'] = returns.rolling(20).std()
+
+        # EMA Crossover
+        config = strategies['EMACrossoverStrategy']
+        ema_fast = close.ewm(span=config['fast_period']).mean()
+        ema_slow = close.ewm(span=config['slow_period']).mean()
+        out[f'{symbol}_ema_fast'] = ema_fast
+        out[f'{symbol}_ema_slow'] = ema_slow
+        out[f'{symbol}_ema_signal'] = np.where(ema_fast > ema_slow, 1, -1)
+
+        # RSI
+        config = strategies['RSIStrategy']
+        delta = close.diff()
+        gain = (delta.where(delta > 0, 0)).rolling(window=config['period']).mean()
+        loss = (-delta.where(delta < 0, 0)).rolling(window=config['period']).mean()
+        rsi = 100 - (100 / (1 + gain / loss))
+        out[f'{symbol}_rsi'] = rsi
+        out[f'{symbol}_rsi_signal'] = np.where(
+            rsi > config['overbought'], -1, np.where(rsi < config['oversold'], 1, 0)
+        )
+
+        # MACD
+        config = strategies['MACDStrategy']
+        macd = close.ewm(span=config['fast']).mean() - close.ewm(span=config['slow']).mean()
+        signal_line = macd.ewm(span=config['signal']).mean()
+        out[f'{symbol}_macd'] = macd
+        out[f'{symbol}_macd_signal_line'] = signal_line
+        out[f'{symbol}_macd_histogram'] = macd - signal_line
+        out[f'{symbol}_macd_signal'] = np.where(macd > signal_line, 1, -1)
+
+        # Bollinger Bands
+        config = strategies['BollingerStrategy']
+        sma = close.rolling(window=config['period']).mean()
+        std = close.rolling(window=config['period']).std()
+        upper = sma + (std * config['std'])
+        lower = sma - (std * config['std'])
+        out[f'{symbol}_bb_upper'] = upper
+        out[f'{symbol}_bb_lower'] = lower
+        out[f'{symbol}_bb_signal'] = np.where(close > upper, -1, np.where(close < lower, 1, 0))
+
+        # ADX (simplified version)
+        config = strategies['ADXStrategy']
+        if high_col in columns and low_col in columns:
+            plus_dm = columns[high_col].diff()
+            minus_dm = columns[low_col].diff()
+            plus_dm = plus_dm.where(plus_dm > 0, 0)
+            minus_dm = minus_dm.where(minus_dm < 0, 0).abs()
+            adx = (plus_dm + minus_dm).rolling(config['period']).mean()
+            out[f'{symbol}_adx'] = adx
+            out[f'{symbol}_adx_signal'] = np.where(adx > config['threshold'], 1, 0)
+
+        # Volume analysis
+        if volume_col in columns:
+            config = strategies['VolumeStrategy']
+            volume = columns[volume_col]
+            volume_ma = volume.rolling(config['volume_ma']).mean()
+            out[f'{symbol}_volume_ma'] = volume_ma
+            out[f'{symbol}_volume_signal'] = np.where(volume > volume_ma, 1, -1)
+
+        return list(out.items())
+
+    def _lagged(self, columns: Dict[str, pd.Series], target_symbol: str,
+                index: pd.Index) -> Optional[LaggedFeatures]:
+        """Close and returns of every non-target symbol, lagged as in create_lagged_features."""
+        base = {}
+        for symbol in self.pipeline.all_symbols:
+            close_col = f'{symbol}_close'
+            if symbol == target_symbol or close_col not in columns:
+                continue
+            base[close_col] = columns[close_col]
+            base[f'{symbol}_returns'] = columns[f'{symbol}_returns']
+        if not base:
+            return None
+        return LaggedFeatures.from_columns(base, max(self.pipeline.lookback_periods), self.dtype, index)
+
+    def _lag_columns(self, lagged: LaggedFeatures) -> List[Tuple[str, np.ndarray]]:
+        """Materialized lag columns in the create_lagged_features order (symbol, lag, close/returns)."""
+        out = []
+        for i in range(0, len(lagged.names), 2):
+            for lag in self.pipeline.lookback_periods:
+                if lag > 0:
+                    for s in (i, i + 1):
+                        out.append((f'{lagged.names[s]}_lag_{lag}', lagged.tensor[:, s, lag]))
+        return out
+
+    @staticmethod
+    def _target(columns: Dict[str, pd.Series], target_symbol: str,
+                horizon: int) -> List[Tuple[str, np.ndarray]]:
+        """Same targets as TradingDataPipeline.create_target_variable (multiclass as codes)."""
+        close_col = f'{target_symbol}_close'
+        if close_col not in columns:
+            return []
+        target = columns[close_col].shift(-horizon).pct_change()
+        multiclass = pd.cut(target, bins=[-np.inf, -0.002, 0, 0.002, np.inf], labels=False)
+        return [
+            ('target', target),
+            ('target_class', np.where(target > 0, 1, 0)),
+            ('target_multiclass', multiclass),
+        ]
+
+    @staticmethod
+    def _time_features(index: pd.DatetimeIndex) -> List[Tuple[str, np.ndarray]]:
+        return [
+            ('hour', index.hour),
+            ('day_of_week', index.dayofweek),
+            ('month', index.month),
+            ('quarter', index.quarter),
+        ]
@@ -0,0 +1,83 @@
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+class LaggedFeatures:
+    """
+    Lagged copies of a set of base series exposed as strided views instead of
+    materialized shifted columns.
+
+    The base series are stored once (with `max_lag` rows of NaN in front) and
+    `tensor[t, s, lag]` is `base[t - lag, s]`, a read-only (time, series, lag)
+    view over that storage. Memory is that of the base series regardless of
+    how many lags are used; rows are only copied when a batch is requested.
+    """
+
+    def __init__(self, base: np.ndarray, names: Sequence[str], max_lag: int,
+                 index: Optional[pd.Index] = None):
+        base = np.asarray(base)
+        if base.ndim != 2 or base.shape[1] != len(names):
+            raise ValueError("base must be a (time, series) array with one name per series")
+        rows, series = base.shape
+        self.names = list(names)
+        self.max_lag = max_lag
+        self.index = index
+
+        # (series, max_lag + time): each series contiguous, NaN warm-up in front
+        self._storage = np.full((series, max_lag + rows), np.nan, dtype=np.result_type(base.dtype, np.float32))
+        self._storage[:, max_lag:] = base.T
+        self._storage.flags.writeable = False
+
+        windows = sliding_window_view(self._storage, max_lag + 1, axis=1)  # [s, t, k] = base[t + k - max_lag]
+        self.tensor = windows.transpose(1, 0, 2)[:, :, ::-1]                # [t, s, lag] = base[t - lag]
+
+    @classmethod
+    def from_columns(cls, columns: Dict[str, np.ndarray], max_lag: int, dtype=np.float64,
+                     index: Optional[pd.Index] = None) -> 'LaggedFeatures':
+        base = np.empty((len(next(iter(columns.values()))), len(columns)), dtype=dtype)
+        for i, values in enumerate(columns.values()):
+            base[:, i] = values
+        return cls(base, list(columns), max_lag, index)
+
+    def __len__(self) -> int:
+        return self.tensor.shape[0]
+
+    @property
+    def nbytes(self) -> int:
+        """Memory actually held (the base series), not the size of the virtual tensor."""
+        return self._storage.nbytes
+
+    def lags(self, lags: Optional[Sequence[int]] = None) -> np.ndarray:
+        """(time, series, lag) view restricted to `lags` (default 1..max_lag). Contiguous ranges stay views."""
+        lags = self._lag_list(lags)
+        if lags == list(range(lags[0], lags[-1] + 1)):
+            return self.tensor[:, :, lags[0]:lags[-1] + 1]
+        return self.tensor[:, :, lags]
+
+    def batch(self, rows, lags: Optional[Sequence[int]] = None) -> np.ndarray:
+        """Flattened (rows, series * lags) copy for the given rows (slice, index array or mask)."""
+        block = self.lags(lags)[rows]
+        return np.ascontiguousarray(block).reshape(block.shape[0], -1)
+
+    def iter_batches(self, batch_size: int, lags: Optional[Sequence[int]] = None,
+                     start: int = 0, stop: Optional[int] = None) -> Iterator[np.ndarray]:
+        stop = len(self) if stop is None else stop
+        for lo in range(start, stop, batch_size):
+            yield self.batch(slice(lo, min(lo + batch_size, stop)), lags)
+
+    def column_names(self, lags: Optional[Sequence[int]] = None) -> List[str]:
+        """Names of the flattened batch columns (series-major, then lag)."""
+        return [f'{name}_lag_{lag}' for name in self.names for lag in self._lag_list(lags)]
+
+    def to_frame(self, lags: Optional[Sequence[int]] = None) -> pd.DataFrame:
+        """Materialize every row as a DataFrame (the old wide layout)."""
+        return pd.DataFrame(self.batch(slice(None), lags), index=self.index, columns=self.column_names(lags))
+
+    def _lag_list(self, lags: Optional[Sequence[int]]) -> List[int]:
+        lags = list(range(1, self.max_lag + 1)) if lags is None else [int(lag) for lag in lags]
+        if not lags or min(lags) < 0 or max(lags) > self.max_lag:
+            raise ValueError(f"lags must be within 0..{self.max_lag}")
+        return lags
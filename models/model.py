@@ -3,9 +3,19 @@ import numpy as np
 import MetaTrader5 as mt5
 from datetime import datetime, timedelta
 from typing import Dict, List, Tuple, Optional
+import os
+import sys
 import warnings
 warnings.filterwarnings('ignore')
 
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+from feature_store import FeatureStore
+from models.bar_cache import BarCache
+from models.feature_builder import FeatureBuilder
+from models.walk_forward import Fold, WalkForward
+
 class TradingDataPipeline:
     """
     Comprehensive trading data pipeline for USDCAD prediction
@@ -81,28 +91,40 @@ class TradingDataPipeline:
             return pd.DataFrame()
     
     def fetch_all_data(self, start_date: str = "2019-01-01", 
-                      end_date: str = "2025-01-01") -> Dict[str, pd.DataFrame]:
+                      end_date: str = "2025-01-01", timeframe=mt5.TIMEFRAME_H1,
+                      cache_dir: str = "data/bars", max_workers: int = 4) -> Dict[str, pd.DataFrame]:
         """
-        Fetch all market data
+        Fetch all market data through the on-disk bar cache: only missing
+        chunks are downloaded (symbols in parallel) and MT5 is only
+        initialized if something is missing.
         """
-        if not self.initialize_mt5():
-            return {}
-            
         start_dt = datetime.strptime(start_date, "%Y-%m-%d")
         end_dt = datetime.strptime(end_date, "%Y-%m-%d")
         
+        cache = BarCache(cache_dir, max_workers=max_workers, max_concurrent_calls=max_workers,
+                         connect=self.initialize_mt5)
+        print(f"Fetching data for {len(self.all_symbols)} symbols...")
+        try:
+            bars = cache.get_many(self.all_symbols, start_dt, end_dt, timeframe)
+        except ConnectionError as e:
+            print(e)
+            return {}
+        finally:
+            if cache.connected:
+                mt5.shutdown()
+        
         data = {}
         
-        for symbol in self.all_symbols:
-            print(f"Fetching data for {symbol}...")
-            df = self.get_historical_data(symbol, start_dt, end_dt)
-            if not df.empty:
+        for symbol, rates in bars.items():
+            if not rates.empty:
+                df = rates.set_index('time')
+                df.columns = [f'{symbol}_{col}' for col in df.columns]
                 data[symbol] = df
                 print(f"✓ {symbol}: {len(df)} records")
             else:
                 print(f"✗ {symbol}: No data")
         
-        mt5.shutdown()
+        print(f"Downloaded {cache.downloaded_chunks} new chunks")
         return data
     
     def calculate_technical_indicators(self, df: pd.DataFrame, symbol: str) -> pd.DataFrame:
@@ -239,38 +261,22 @@ class TradingDataPipeline:
         
         return result
     
-    def prepare_features(self, data: Dict[str, pd.DataFrame]) -> pd.DataFrame:
-        """
-        Combine all data and prepare features
+    def prepare_features(self, data: Dict[str, pd.DataFrame], float32: bool = False,
+                         lazy_lags: bool = False) -> pd.DataFrame:
         """
-        # Start with USDCAD as base
-        if 'USDCAD' not in data:
-            raise ValueError("USDCAD data not found")
-            
-        combined_df = data['USDCAD'].copy()
-        
-        # Add other symbols
-        for symbol, df in data.items():
-            if symbol != 'USDCAD':
-                combined_df = combined_df.join(df, how='left')
+        Combine all data and prepare features.
         
-        # Calculate technical indicators for all symbols
-        for symbol in self.all_symbols:
-            if symbol in data:
-                combined_df = self.calculate_technical_indicators(combined_df, symbol)
-        
-        # Create lagged features
-        combined_df = self.create_lagged_features(combined_df)
-        
-        # Create target variable
-        combined_df = self.create_target_variable(combined_df)
-        
-        # Add time features
-        combined_df['hour'] = combined_df.index.hour
-        combined_df['day_of_week'] = combined_df.index.dayofweek
-        combined_df['month'] = combined_df.index.month
-        combined_df['quarter'] = combined_df.index.quarter
+        Same columns as joining all symbols and chaining calculate_technical_indicators,
+        create_lagged_features and create_target_variable, built in a single pass into
+        one contiguous block (float32 halves the memory).
         
+        With lazy_lags=True the *_lag_N columns are left out of the frame and exposed
+        as self.lagged_features, a (time, symbol, lag) view (see LaggedFeatures).
+        """
+        builder = FeatureBuilder(self, dtype=np.float32 if float32 else np.float64, lazy_lags=lazy_lags)
+        combined_df = builder.build(data)
+        self.lagged_features = builder.lags
+        builder.print_report()
         return combined_df
     
     def train_test_split(self, df: pd.DataFrame, train_ratio: float = 0.7, 
@@ -294,6 +300,25 @@ class TradingDataPipeline:
         
         return train_df, test_df, val_df
 
+    def walk_forward_splits(self, data, n_splits: int = 5, test_size: Optional[int] = None,
+                            train_size: Optional[int] = None, horizon: int = 1, embargo: int = 0,
+                            columns: Optional[List[str]] = None) -> List[Fold]:
+        """
+        Walk-forward folds as row ranges over `data` (DataFrame or FeatureStore).
+        
+        Nothing is dropped or copied: only the NaN warm-up of the features and
+        the NaN tail of the target are skipped (first/last valid row per column),
+        and `horizon` rows are purged before every test window so that no training
+        label looks into it. Use fold.views(data) to get the train/test slices.
+        """
+        splitter = WalkForward(n_splits=n_splits, test_size=test_size, train_size=train_size,
+                               purge=horizon, embargo=embargo)
+        folds = splitter.folds(data, columns=columns)
+        for fold in folds:
+            print(f"Fold {fold.number}: train rows {fold.train.start}-{fold.train.stop}, "
+                  f"test rows {fold.test.start}-{fold.test.stop}")
+        return folds
+
 # Example usage
 if __name__ == "__main__":
     # Initialize pipeline
@@ -307,8 +332,15 @@ if __name__ == "__main__":
     print("Preparing features...")
     features_df = pipeline.prepare_features(data)
     
+    # Persist the matrix: later loads are memory-mapped instead of rebuilt
+    FeatureStore("data/store/features").write(features_df)
+    
     # Split data
     train_df, test_df, val_df = pipeline.train_test_split(features_df)
     
+    # Walk-forward folds over the memory-mapped store (views, no copies)
+    store = FeatureStore("data/store/features")
+    folds = pipeline.walk_forward_splits(store, n_splits=10)
+    
     print(f"Feature matrix shape: {features_df.shape}")
     print(f"Available features: {len([col for col in features_df.columns if col not in ['target', 'target_class', 'target_multiclass']])}")
\ No newline at end of file
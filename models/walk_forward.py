@@ -0,0 +1,119 @@
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+def _columns(data, columns: Optional[Sequence[str]]) -> Dict[str, np.ndarray]:
+    """Column arrays of a DataFrame, FeatureStore or 2-D array, without copying."""
+    if isinstance(data, pd.DataFrame):
+        names = list(data.columns) if columns is None else list(columns)
+        return {name: data[name].to_numpy() for name in names}
+    if hasattr(data, 'column'):  # FeatureStore
+        names = data.columns if columns is None else list(columns)
+        return {name: data.column(name) for name in names}
+    data = np.asarray(data)
+    names = range(data.shape[1]) if columns is None else columns
+    return {name: data[:, name] for name in names}
+
+
+def _length(data) -> int:
+    return data.shape[0] if hasattr(data, 'shape') else len(data)
+
+
+def valid_rows(data, columns: Optional[Sequence[str]] = None) -> Dict[str, Tuple[int, int]]:
+    """
+    (first, last + 1) row with a non-NaN value for each column: the warm-up
+    of rolling indicators / lags at the start and forward-looking targets at
+    the end. Non-float columns are valid everywhere.
+    """
+    rows = {}
+    for name, values in _columns(data, columns).items():
+        if not np.issubdtype(values.dtype, np.floating):
+            rows[name] = (0, len(values))
+            continue
+        valid = np.flatnonzero(~np.isnan(values))
+        rows[name] = (int(valid[0]), int(valid[-1]) + 1) if len(valid) else (len(values), len(values))
+    return rows
+
+
+def valid_range(data, columns: Optional[Sequence[str]] = None) -> Tuple[int, int]:
+    """Rows where every selected column is past its warm-up and before its trailing NaNs."""
+    rows = valid_rows(data, columns)
+    if not rows:
+        return 0, _length(data)
+    start = max(first for first, _ in rows.values())
+    stop = min(last for _, last in rows.values())
+    return start, max(start, stop)
+
+
+class Fold:
+    """Train/test row ranges of one walk-forward fold (plain slices, no data)."""
+
+    def __init__(self, number: int, train: slice, test: slice):
+        self.number = number
+        self.train = train
+        self.test = test
+
+    def __repr__(self):
+        return (f"Fold({self.number}, train=[{self.train.start}:{self.train.stop}), "
+                f"test=[{self.test.start}:{self.test.stop}))")
+
+    def views(self, data):
+        """(train, test) over `data` without copying: iloc slices, store frames or array views."""
+        if isinstance(data, pd.DataFrame):
+            return data.iloc[self.train], data.iloc[self.test]
+        if hasattr(data, 'frame'):  # FeatureStore
+            return (data.frame(start=self.train.start, stop=self.train.stop),
+                    data.frame(start=self.test.start, stop=self.test.stop))
+        return data[self.train], data[self.test]
+
+
+class WalkForward:
+    """
+    Walk-forward fold generator over row ranges.
+
+    - Expanding window by default; `train_size` turns it into a rolling
+      window of fixed length.
+    - `purge` rows are removed from the end of every training window so that
+      labels looking `purge` bars ahead never overlap the test window, and
+      `embargo` further rows are left out on top of that (serial
+      correlation buffer).
+    - Only rows inside the valid range (see valid_range) are used, so the
+      NaN warm-up of indicators and the NaN tail of forward targets are
+      skipped without dropping rows anywhere else.
+    """
+
+    def __init__(self, n_splits: int = 5, test_size: Optional[int] = None,
+                 train_size: Optional[int] = None, min_train_size: Optional[int] = None,
+                 purge: int = 0, embargo: int = 0):
+        self.n_splits = n_splits
+        self.test_size = test_size
+        self.train_size = train_size
+        self.min_train_size = min_train_size
+        self.purge = purge
+        self.embargo = embargo
+
+    def split(self, data=None, columns: Optional[Sequence[str]] = None,
+              n_rows: Optional[int] = None) -> Iterator[Fold]:
+        if data is not None:
+            start, stop = valid_range(data, columns)
+        else:
+            start, stop = 0, n_rows
+        gap = self.purge + self.embargo
+        usable = stop - start
+        test_size = self.test_size or usable // (self.n_splits + 1)
+        min_train = self.min_train_size or max(usable - self.n_splits * test_size - gap, 1)
+        if test_size <= 0 or min_train + gap + self.n_splits * test_size > usable:
+            raise ValueError(f"Not enough valid rows ({usable}) for {self.n_splits} folds of {test_size} "
+                             f"with a minimum train of {min_train} and a gap of {gap}")
+
+        first_test = stop - self.n_splits * test_size
+        for number in range(self.n_splits):
+            test_start = first_test + number * test_size
+            train_stop = test_start - gap
+            train_start = start if self.train_size is None else max(start, train_stop - self.train_size)
+            yield Fold(number, slice(train_start, train_stop), slice(test_start, test_start + test_size))
+
+    def folds(self, *args, **kwargs) -> List[Fold]:
+        return list(self.split(*args, **kwargs))
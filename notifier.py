@@ -1,18 +1,167 @@
+import atexit
+import threading
+import time
+from collections import deque
+
 import requests
+from requests.adapters import HTTPAdapter
+
+from metrics import METRICS
+
 
 class Notifier:
-    def __init__(self, bot_token, chat_id):
+    """
+    Notificaciones de Telegram sin bloquear el bot: send() sólo encola y un
+    hilo en segundo plano envía los mensajes con una sesión HTTP reutilizada
+    y timeout.
+
+    - Rate limit: como mucho un envío cada `min_interval` segundos (Telegram
+      admite ~1 mensaje por segundo por chat).
+    - Las ráfagas se agrupan en un solo mensaje (ventana `coalesce_window`) y
+      los mensajes repetidos se cuentan en lugar de duplicarse.
+    - La cola está acotada a `max_queue`: si se llena se descarta primero el
+      mensaje de prioridad baja más viejo. Un mensaje de prioridad alta nunca
+      desplaza a otro de prioridad alta: espera hasta `full_wait` segundos a
+      que se libere lugar y, si no, se descarta el mensaje nuevo. Los
+      descartes quedan en `dropped` y en la métrica "notify_dropped".
+
+    `base_url` permite apuntar a un servidor HTTP local para pruebas.
+    """
+
+    HIGH = 0
+    LOW = 1
+
+    def __init__(self, bot_token, chat_id, base_url="https://api.telegram.org", timeout=5,
+                 min_interval=1.0, coalesce_window=0.5, max_queue=50, max_length=4096, full_wait=0.2):
         self.token = bot_token
         self.chat_id = chat_id
+        self.url = f"{base_url}/bot{bot_token}/sendMessage"
+        self.timeout = timeout
+        self.min_interval = min_interval
+        self.coalesce_window = coalesce_window
+        self.max_queue = max_queue
+        self.max_length = max_length
+        self.full_wait = full_wait
+        self.dropped = 0
+
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=1))
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=1))
+
+        self._queue = deque()  # [prioridad, mensaje, repeticiones]
+        self._cond = threading.Condition()
+        self._busy = False
+        self._closed = False
+        self._last_sent = 0.0
+        self._thread = threading.Thread(target=self._worker, name="notifier", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def send(self, message, priority=LOW):
+        """Encola el mensaje y vuelve de inmediato. Devuelve False si se descartó."""
+        with METRICS.timer("notify_enqueue"):
+            return self._enqueue(message, priority)
+
+    def _enqueue(self, message, priority):
+        with self._cond:
+            if self._closed:
+                return False
+            for entry in self._queue:
+                if entry[1] == message:
+                    entry[0] = min(entry[0], priority)
+                    entry[2] += 1
+                    return True
+
+            if len(self._queue) >= self.max_queue:
+                victim = next((e for e in self._queue if e[0] == self.LOW), None)
+                if victim is None and priority == self.HIGH:
+                    # Sólo hay mensajes importantes: se espera a que el hilo de envío libere lugar
+                    self._cond.wait_for(lambda: len(self._queue) < self.max_queue or self._closed, self.full_wait)
+                    victim = next((e for e in self._queue if e[0] == self.LOW), None)
+                if len(self._queue) >= self.max_queue:
+                    self.dropped += 1
+                    if victim is None:
+                        METRICS.observe("notify_dropped", 0.0, priority="high" if priority == self.HIGH else "low")
+                        return False
+                    self._queue.remove(victim)
+                    METRICS.observe("notify_dropped", 0.0, priority="low")
+
+            self._queue.append([priority, message, 1])
+            self._cond.notify_all()
+            return True
+
+    def flush(self, timeout=None):
+        """Espera a que se envíe todo lo encolado. Devuelve False si venció el timeout."""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._queue and not self._busy, timeout)
+
+    def close(self, timeout=5):
+        self.flush(timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+        self.session.close()
+
+    # === Hilo de envío ===
+    def _worker(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._queue or self._closed)
+                if not self._queue:
+                    return
+                self._busy = True
+
+            # Ventana para juntar ráfagas y respetar el rate limit
+            wait = max(self.coalesce_window, self._last_sent + self.min_interval - time.monotonic())
+            if not self._closed and wait > 0:
+                time.sleep(wait)
+
+            with self._cond:
+                text, batch = self._take_batch()
+                self._cond.notify_all()  # hay lugar para los send() que esperan con la cola llena
+
+            with METRICS.timer("notify_post"):
+                retry_after = self._post(text)
+            self._last_sent = time.monotonic()
+
+            with self._cond:
+                if retry_after:
+                    # Telegram pidió esperar: se reencola el lote al frente
+                    self._queue.extendleft(reversed(batch))
+                    self._last_sent += retry_after
+                self._busy = False
+                self._cond.notify_all()
+
+    def _take_batch(self):
+        """Saca mensajes de la cola (alta prioridad primero) hasta completar un mensaje de Telegram."""
+        ordered = sorted(self._queue, key=lambda e: e[0])
+        batch, parts, length = [], [], 0
+        for entry in ordered:
+            part = entry[1] if entry[2] == 1 else f"{entry[1]} (x{entry[2]})"
+            part = part[:self.max_length]
+            if batch and length + len(part) + 2 > self.max_length:
+                break
+            batch.append(entry)
+            parts.append(part)
+            length += len(part) + 2
+        for entry in batch:
+            self._queue.remove(entry)
+        return "\n\n".join(parts), batch
 
-    def send(self, message):
-        url = f"https://api.telegram.org/bot{self.token}/sendMessage"
-        data = {"chat_id": self.chat_id, "text": message}
+    def _post(self, text):
+        """Envía el texto. Devuelve los segundos a esperar si Telegram respondió 429."""
+        data = {"chat_id": self.chat_id, "text": text}
         try:
-            response = requests.post(url, data=data)
+            response = self.session.post(self.url, data=data, timeout=self.timeout)
             if response.status_code == 200:
                 print("✅ Notificación enviada")
+            elif response.status_code == 429:
+                retry_after = response.json().get("parameters", {}).get("retry_after", 1)
+                print(f"⏳ Telegram pidió esperar {retry_after}s")
+                return retry_after
             else:
                 print("❌ Error al enviar notificación")
         except Exception as e:
             print("⚠️ Fallo al notificar:", e)
+        return 0
@@ -0,0 +1,202 @@
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import MetaTrader5 as mt5
+
+DEAL_ENTRY_IN = 0
+DEAL_ENTRY_OUT = 1
+DEAL_ENTRY_INOUT = 2
+DEAL_ENTRY_OUT_BY = 3
+
+
+class PositionBook:
+    """
+    Libro local de posiciones abiertas: las decisiones lo leen en memoria
+    (microsegundos) en lugar de llamar a positions_get en cada ciclo.
+
+    - apply_result() incorpora el resultado de nuestras propias órdenes en
+      el momento en que se confirman.
+    - sync() aplica los deals nuevos de history_deals_get desde el último
+      ticket visto (cierres por SL/TP del broker, operaciones manuales). Los
+      deals de órdenes propias ya aplicadas se saltean.
+    - Cada `full_sync_interval` segundos, o si el broker no tiene
+      history_deals_get, se reemplaza todo con positions_get (reconciliación
+      completa). El snapshot sólo se acepta si no llegaron deals mientras se
+      pedía; si no, el cursor podría volver a aplicar un deal ya reflejado.
+    - Las órdenes propias se recuerdan durante `lookback` (no se borran en la
+      reconciliación completa): sus deals pueden llegar después del snapshot.
+
+    `clock` mide el intervalo de reconciliación y `wall_clock` (epoch en
+    segundos) fija la ventana de history_deals_get; con el simulador ambos
+    son su reloj simulado.
+    """
+
+    def __init__(self, broker=mt5, full_sync_interval=60, lookback=timedelta(days=1), clock=time.monotonic,
+                 wall_clock=time.time, max_attempts=3):
+        self.mt5 = broker
+        self.full_sync_interval = full_sync_interval
+        self.lookback = lookback
+        self.clock = clock
+        self.wall_clock = wall_clock
+        self.max_attempts = max_attempts
+        self.full_syncs = 0
+        self.deals_applied = 0
+        self._lock = threading.Lock()
+        self._positions = {}
+        self._own_orders = {}  # orden -> momento (wall_clock) en que se confirmó
+        self._last_deal = 0
+        self._deals_from = None
+        self._next_full = 0.0
+
+    # === Lectura (sin llamadas al terminal) ===
+    def positions(self, symbol=None):
+        with self._lock:
+            return [p for p in self._positions.values() if symbol is None or p.symbol == symbol]
+
+    def has_position(self, symbol):
+        with self._lock:
+            return any(p.symbol == symbol for p in self._positions.values())
+
+    def get(self, ticket):
+        with self._lock:
+            return self._positions.get(ticket)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._positions)
+
+    # === Actualización ===
+    def apply_result(self, result):
+        """Registra una orden propia ya confirmada (apertura o cierre)."""
+        request = result.request
+        closing = getattr(request, "position", 0)
+        volume = getattr(result, "volume", 0) or request.volume
+        with self._lock:
+            self._own_orders[result.order] = self.wall_clock()
+            if closing:
+                self._reduce(closing, volume)
+                return
+            self._positions[result.order] = SimpleNamespace(
+                ticket=result.order, symbol=request.symbol, type=request.type, volume=volume,
+                price_open=result.price, sl=getattr(request, "sl", 0.0), tp=getattr(request, "tp", 0.0),
+                time=self.wall_clock(),
+            )
+
+    def sync(self):
+        """Reconciliación incremental por deals, o completa si ya corresponde."""
+        if self.clock() >= self._next_full or not hasattr(self.mt5, "history_deals_get"):
+            return self.full_sync()
+        deals = self._new_deals()
+        if deals is None:
+            return self.full_sync()
+        with self._lock:
+            for deal in deals:
+                self._apply_deal(deal)
+        return len(deals)
+
+    def full_sync(self):
+        """
+        Reemplaza el libro con positions_get y mueve el cursor de deals al
+        último existente. El cursor se mueve antes del snapshot y se vuelve a
+        consultar después: si en el medio llegó algún deal (ej: un cierre
+        parcial) no se sabe si el snapshot lo refleja, así que se repite.
+        """
+        has_history = hasattr(self.mt5, "history_deals_get")
+        seen = 0
+        for _ in range(self.max_attempts):
+            deals = self._new_deals() if has_history else ()
+            seen += len(deals or ())
+            positions = self.mt5.positions_get()
+            if positions is None:
+                raise RuntimeError(f"❌ positions_get falló: {self.mt5.last_error()}")
+            late = self._new_deals() if has_history else []
+            seen += len(late or ())
+            confirmed = late == []  # None: el terminal falló y no se puede confirmar
+            if confirmed:
+                break
+        else:
+            # Siguen llegando deals: se usa el último snapshot y se reconcilia de nuevo en el próximo sync
+            print(f"⚠️ Deals nuevos durante {self.max_attempts} reconciliaciones seguidas, se reintenta en el próximo sync")
+
+        cutoff = self.wall_clock() - self.lookback.total_seconds()
+        with self._lock:
+            self._positions = {
+                p.ticket: SimpleNamespace(
+                    ticket=p.ticket, symbol=p.symbol, type=p.type, volume=p.volume, price_open=p.price_open,
+                    sl=getattr(p, "sl", 0.0), tp=getattr(p, "tp", 0.0), time=getattr(p, "time", 0),
+                )
+                for p in positions
+            }
+            self._own_orders = {order: t for order, t in self._own_orders.items() if t >= cutoff}
+        self.full_syncs += 1
+        self._next_full = self.clock() + self.full_sync_interval if confirmed else 0.0
+        return seen
+
+    # === Checkpoint entre reinicios ===
+    def state(self):
+        """Posiciones y cursor de deals, para retomar con sync() incremental después de reiniciar."""
+        with self._lock:
+            return {
+                "positions": dict(self._positions),
+                "own_orders": dict(self._own_orders),
+                "last_deal": self._last_deal,
+                "deals_from": self._deals_from,
+            }
+
+    def restore(self, state):
+        """
+        Retoma un state() guardado: el próximo sync() aplica sólo los deals
+        ocurridos desde entonces (incluidos los de mientras el bot estuvo
+        caído) y la reconciliación completa queda para dentro de
+        `full_sync_interval`.
+        """
+        with self._lock:
+            self._positions = dict(state["positions"])
+            self._own_orders = dict(state["own_orders"])
+            self._last_deal = state["last_deal"]
+            self._deals_from = state["deals_from"]
+        self._next_full = self.clock() + self.full_sync_interval
+
+    # === Internos ===
+    def _new_deals(self):
+        """Deals con ticket posterior al último visto (None si el terminal falló)."""
+        now = datetime.fromtimestamp(self.wall_clock(), timezone.utc)
+        if self._deals_from is None:
+            self._deals_from = now - self.lookback
+        # La hora del servidor puede ir adelantada: el límite superior es holgado
+        deals = self.mt5.history_deals_get(self._deals_from, now + timedelta(days=1))
+        if deals is None:
+            return None
+        new = sorted((d for d in deals if d.ticket > self._last_deal), key=lambda d: d.ticket)
+        if new:
+            self._last_deal = new[-1].ticket
+            # Se vuelve a pedir desde la hora del último deal (en segundos de epoch del servidor)
+            self._deals_from = datetime.fromtimestamp(new[-1].time, timezone.utc) - timedelta(seconds=1)
+        return new
+
+    def _apply_deal(self, deal):
+        if deal.order in self._own_orders:
+            return
+        self.deals_applied += 1
+        if deal.entry == DEAL_ENTRY_IN:
+            self._positions.setdefault(deal.position_id, SimpleNamespace(
+                ticket=deal.position_id, symbol=deal.symbol, type=deal.type, volume=deal.volume,
+                price_open=deal.price, sl=0.0, tp=0.0, time=deal.time,
+            ))
+        elif deal.entry in (DEAL_ENTRY_OUT, DEAL_ENTRY_OUT_BY):
+            self._reduce(deal.position_id, deal.volume)
+        elif deal.entry == DEAL_ENTRY_INOUT:
+            # Reversa en cuentas netting: el volumen y el sentido ya no son los del libro
+            self._next_full = 0.0
+
+    def _reduce(self, ticket, volume):
+        pos = self._positions.get(ticket)
+        if pos is None:
+            return
+        remaining = round(pos.volume - volume, 8)
+        if remaining <= 0:
+            del self._positions[ticket]
+        else:
+            self._positions[ticket] = SimpleNamespace(**{**vars(pos), "volume": remaining})
@@ -0,0 +1,174 @@
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+
+_OFF = nullcontext()
+
+
+def parse_config(text):
+    """
+    "every=10", "strategy=RSIStrategy" o varias separadas por coma / línea.
+    Un texto vacío equivale a every=1 (perfilar todos los ciclos).
+    """
+    config = {"every": 1, "strategy": None}
+    for part in text.replace("\n", ",").split(","):
+        key, _, value = part.strip().partition("=")
+        if key == "every" and value:
+            config["every"] = max(int(value), 1)
+        elif key == "strategy" and value:
+            config["strategy"] = value
+    return config
+
+
+class _Sampler:
+    """
+    Toma muestras del stack de un hilo cada `interval` segundos y las cuenta
+    como stacks colapsados ("raíz;...;hoja"), el formato de flamegraph.pl y
+    speedscope.
+    """
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if names:
+                self.stacks[";".join(reversed(names))] += 1
+
+
+class CycleProfiler:
+    """
+    Perfilado bajo demanda de ciclos en vivo.
+
+    Se activa con la variable de entorno `env` o creando el archivo
+    `trigger_file` (se revisa como mucho una vez por `check_interval`
+    segundos, así que se puede prender y apagar sin reiniciar el bot). El
+    contenido, igual en los dos casos, elige qué perfilar:
+
+    - "every=N": uno de cada N ciclos (por etiqueta, ej: por símbolo).
+    - "strategy=RSIStrategy": sólo esa estrategia dentro de generate_signals.
+
+    Cada perfil deja en `directory`:
+    - <etiqueta>.collapsed: stacks colapsados por muestreo, para flamegraph.
+    - <etiqueta>.top.txt: las `top` funciones más caras (tiempo propio y acumulado).
+    - <etiqueta>.prof: volcado de cProfile (pstats / snakeviz).
+
+    Apagado, cycle() y strategy() sólo comparan un flag y devuelven un
+    contexto vacío. Se perfila un solo bloque a la vez: si otro hilo ya está
+    perfilando, el bloque corre sin perfilar.
+    """
+
+    def __init__(self, directory="profiles", trigger_file="PERFILAR", env="PERFILAR",
+                 check_interval=1.0, sample_interval=0.001, top=30):
+        self.directory = directory
+        self.trigger_file = trigger_file
+        self.check_interval = check_interval
+        self.sample_interval = sample_interval
+        self.top = top
+        self.env_config = parse_config(os.environ[env]) if os.getenv(env) is not None else None
+        self.config = self.env_config
+        self.written = []
+        self._counts = Counter()
+        self._busy = threading.Lock()
+        self._next_check = 0.0
+
+    @property
+    def active(self):
+        now = time.monotonic()
+        if now >= self._next_check:
+            self._next_check = now + self.check_interval
+            self._reload()
+        return self.config is not None
+
+    def cycle(self, label="cycle"):
+        """Contexto para un ciclo completo; perfila uno de cada `every`."""
+        if not self.active or self.config["strategy"] is not None:
+            return _OFF
+        self._counts[label] += 1
+        if (self._counts[label] - 1) % self.config["every"]:
+            return _OFF
+        return self._profile(f"cycle_{label}")
+
+    def strategy(self, name):
+        """Contexto para una estrategia dentro de generate_signals."""
+        if not self.active or self.config["strategy"] != name:
+            return _OFF
+        return self._profile(f"strategy_{name}")
+
+    @contextmanager
+    def _profile(self, label):
+        if not self._busy.acquire(blocking=False):
+            yield
+            return
+        try:
+            sampler = _Sampler(threading.get_ident(), self.sample_interval)
+            profile = cProfile.Profile()
+            start = time.perf_counter()
+            sampler.start()
+            profile.enable()
+            try:
+                yield
+            finally:
+                profile.disable()
+                sampler.stop()
+                self._write(label, profile, sampler.stacks, time.perf_counter() - start)
+        finally:
+            self._busy.release()
+
+    def _reload(self):
+        try:
+            with open(self.trigger_file) as f:
+                self.config = parse_config(f.read())
+        except FileNotFoundError:
+            self.config = self.env_config
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Configuración de perfilado inválida en {self.trigger_file}: {e}")
+            self.config = self.env_config
+
+    def _write(self, label, profile, stacks, elapsed):
+        os.makedirs(self.directory, exist_ok=True)
+        base = os.path.join(self.directory, f"{datetime.now():%Y%m%d_%H%M%S_%f}_{label}")
+
+        with open(f"{base}.collapsed", "w") as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+        profile.dump_stats(f"{base}.prof")
+        report = io.StringIO()
+        report.write(f"{label}: {elapsed * 1000:.1f} ms\n\n")
+        stats = pstats.Stats(profile, stream=report)
+        stats.sort_stats("tottime").print_stats(self.top)
+        stats.sort_stats("cumulative").print_stats(self.top)
+        with open(f"{base}.top.txt", "w") as f:
+            f.write(report.getvalue())
+
+        self.written.append(base)
+        print(f"🔬 Perfil {label} ({elapsed * 1000:.1f} ms) guardado en {base}.*")
+
+
+# Perfilador global del proceso (apagado salvo PERFILAR o el archivo PERFILAR)
+PROFILER = CycleProfiler()
@@ -0,0 +1,125 @@
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+
+import MetaTrader5 as mt5
+import numpy as np
+
+from metrics import METRICS
+
+TIMEFRAME_SECONDS = {
+    mt5.TIMEFRAME_M1: 60,
+    mt5.TIMEFRAME_M5: 5 * 60,
+    mt5.TIMEFRAME_M15: 15 * 60,
+    mt5.TIMEFRAME_M30: 30 * 60,
+    mt5.TIMEFRAME_H1: 60 * 60,
+    mt5.TIMEFRAME_H4: 4 * 60 * 60,
+    mt5.TIMEFRAME_D1: 24 * 60 * 60,
+}
+
+
+class Event:
+    def __init__(self, name, time, signal=None):
+        self.name = name      # "bar_close", el nombre del evento diario o del disparador intravela
+        self.time = time      # instante programado o de detección (epoch en segundos)
+        self.signal = signal  # señal que originó el evento, si la hay
+
+    def __repr__(self):
+        return f"Event({self.name!r}, {datetime.fromtimestamp(self.time, timezone.utc):%Y-%m-%d %H:%M:%S} UTC)"
+
+
+class BarCloseScheduler:
+    """
+    Planificador alineado al cierre de vela: despierta `delay` segundos
+    después de cada cierre del timeframe en lugar de dormir un intervalo fijo,
+    y dispara además eventos diarios a hora fija (ej: el cierre de las 17:00).
+
+    `utc_offset` es el desfase en segundos del servidor respecto de UTC; sólo
+    importa para timeframes de H4 o más, donde las velas se alinean con la
+    hora del servidor.
+    """
+
+    BAR_CLOSE = "bar_close"
+
+    def __init__(self, timeframe=mt5.TIMEFRAME_M5, delay=0.5, poll_interval=0.25, max_wait=30,
+                 utc_offset=0, clock=time.time, sleep=time.sleep):
+        self.period = TIMEFRAME_SECONDS[timeframe]
+        self.delay = delay
+        self.poll_interval = poll_interval
+        self.max_wait = max_wait
+        self.utc_offset = utc_offset
+        self.clock = clock
+        self.sleep = sleep
+        self._daily = {}
+        self.latencies = {}
+
+    def next_bar_close(self, now=None):
+        now = self.clock() if now is None else now
+        shifted = now + self.utc_offset
+        return (shifted // self.period + 1) * self.period - self.utc_offset
+
+    def add_daily_event(self, name, hour, minute, tz=timezone.utc, window_minutes=0):
+        """
+        Registra un evento diario a la hora local `hour:minute` de `tz`. Si el
+        bot arranca dentro de los `window_minutes` posteriores, el evento se
+        dispara de inmediato.
+        """
+        now = self.clock()
+        local = datetime.fromtimestamp(now, tz)
+        target = local.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        if local >= target + timedelta(minutes=window_minutes):
+            target += timedelta(days=1)
+        # [próximo disparo, hora nominal]; el disparo puede adelantarse al arranque
+        self._daily[name] = [max(target.timestamp(), now), target.timestamp()]
+
+    def wait(self):
+        """Duerme hasta el próximo evento (cierre de vela o evento diario) y lo devuelve."""
+        now = self.clock()
+        bar_close = self.next_bar_close(now)
+        name, due = self.BAR_CLOSE, bar_close + self.delay
+        for event_name, (event_time, _) in self._daily.items():
+            if event_time <= due:
+                name, due = event_name, event_time
+
+        if due > now:
+            self.sleep(due - now)
+
+        if name == self.BAR_CLOSE:
+            return Event(name, bar_close)
+        return self._fire_daily(name)
+
+    def due_events(self):
+        """Eventos diarios vencidos, sin dormir (para bucles que no esperan al cierre de vela)."""
+        now = self.clock()
+        due = [name for name, (event_time, _) in self._daily.items() if event_time <= now]
+        return [self._fire_daily(name) for name in due]
+
+    def _fire_daily(self, name):
+        due, nominal = self._daily[name]
+        nominal += 24 * 60 * 60
+        self._daily[name] = [nominal, nominal]
+        return Event(name, due)
+
+    def await_new_bar(self, fetch_bars, last_bar_time):
+        """
+        Llama a `fetch_bars` hasta que la última vela tenga un timestamp
+        posterior a `last_bar_time` (el servidor puede publicarla con algo de
+        retraso). Si no aparece en `max_wait` segundos devuelve lo último leído.
+        """
+        deadline = self.clock() + self.max_wait
+        while True:
+            bars = fetch_bars()
+            if last_bar_time is None or np.asarray(bars["time"])[-1] > last_bar_time:
+                return bars
+            if self.clock() >= deadline:
+                print("⚠️ No llegó una vela nueva, se usan los últimos datos disponibles")
+                return bars
+            self.sleep(self.poll_interval)
+
+    def record_latency(self, stage, bar_close, at=None, maxlen=1000):
+        """Registra los segundos transcurridos desde el cierre de la vela hasta `at`."""
+        latency = (self.clock() if at is None else at) - bar_close
+        self.latencies.setdefault(stage, deque(maxlen=maxlen)).append(latency)
+        METRICS.observe("since_bar_close", latency, point=stage)
+        print(f"⏱ Latencia cierre de vela → {stage}: {latency * 1000:.0f} ms")
+        return latency
@@ -1,5 +1,8 @@
+import numpy as np
 import pandas as pd
 
+from indicators.signals import to_signal_series
+
 class ADXStrategy:
     """
     Estrategia basada en ADX y DI+ / DI-
@@ -15,7 +18,7 @@ class ADXStrategy:
         # Placeholder para no detener código
         return pd.Series([25] * len(df))  # Supongamos ADX > 25 constante
 
-    def generate_signal(self, df: pd.DataFrame) -> str | None:
+    def generate_signal(self, df: pd.DataFrame, features=None) -> str | None:
         if len(df) < self.period + 1:
             return None
 
@@ -31,3 +34,12 @@ class ADXStrategy:
             return "sell"
         else:
             return None
+
+    def generate_signal_series(self, df: pd.DataFrame) -> pd.Series:
+        """
+        Señal de cada vela del histórico en una sola pasada vectorizada.
+        El valor de la fila i coincide con generate_signal(df.iloc[:i+1]).
+        """
+        # Mismos valores simulados que generate_signal: compra en cuanto hay datos suficientes
+        enough_data = np.arange(len(df)) >= self.period
+        return to_signal_series(enough_data, np.zeros(len(df), dtype=bool), df.index)
@@ -1,5 +1,9 @@
+import numpy as np
 import pandas as pd
 
+from indicators.signals import to_signal_series
+from indicators.cache import FeatureCache
+
 class BollingerStrategy:
     """
     Estrategia basada en Bandas de Bollinger
@@ -11,6 +15,7 @@ class BollingerStrategy:
     def __init__(self, period=20, std_dev=2):
         self.period = period
         self.std_dev = std_dev
+        self._features = FeatureCache()
 
     def calculate_bollinger_bands(self, df):
         """Calcula las bandas de Bollinger"""
@@ -20,18 +25,20 @@ class BollingerStrategy:
         df["Lower"] = df["SMA"] - (self.std_dev * df["STD"])
         return df
 
-    def generate_signal(self, df: pd.DataFrame) -> str | None:
+    def generate_signal(self, df: pd.DataFrame, features: FeatureCache | None = None) -> str | None:
         """
         Devuelve 'buy', 'sell' o None si no hay señal.
         """
-        df = self.calculate_bollinger_bands(df)
-
         if len(df) < 2:
             return None
 
-        close_price = df["close"].iloc[-1]
-        lower_band = df["Lower"].iloc[-1]
-        upper_band = df["Upper"].iloc[-1]
+        # Indicadores compartidos del ciclo (StrategyManager); si no hay, caché propia
+        features = features or self._features.begin_cycle(df)
+        sma = features.sma(self.period)[-1]
+        std = features.std(self.period)[-1]
+        upper_band = sma + (self.std_dev * std)
+        lower_band = sma - (self.std_dev * std)
+        close_price = np.asarray(df["close"])[-1]
 
         if close_price < lower_band:
             return "buy"
@@ -39,3 +46,16 @@ class BollingerStrategy:
             return "sell"
         else:
             return None
+
+    def generate_signal_series(self, df: pd.DataFrame) -> pd.Series:
+        """
+        Señal de cada vela del histórico en una sola pasada vectorizada.
+        El valor de la fila i coincide con generate_signal(df.iloc[:i+1]).
+        """
+        close = df["close"]
+        sma = close.rolling(window=self.period).mean()
+        std = close.rolling(window=self.period).std()
+        upper = sma + (self.std_dev * std)
+        lower = sma - (self.std_dev * std)
+
+        return to_signal_series(close < lower, close > upper, df.index)
@@ -1,5 +1,8 @@
+import numpy as np
 import pandas as pd
 
+from indicators.signals import to_signal_series
+
 class BreakoutStrategy:
     """
     Detecta rupturas de rango basado en max y min de últimas N velas.
@@ -7,7 +10,7 @@ class BreakoutStrategy:
     def __init__(self, period=20):
         self.period = period
 
-    def generate_signal(self, df: pd.DataFrame) -> str | None:
+    def generate_signal(self, df: pd.DataFrame, features=None) -> str | None:
         if len(df) < self.period + 1:
             return None
 
@@ -15,7 +18,7 @@ class BreakoutStrategy:
         max_range = recent['high'].max()
         min_range = recent['low'].min()
 
-        last_close = df.iloc[-1]['close']
+        last_close = np.asarray(df['close'])[-1]
 
         if last_close > max_range:
             return "buy"
@@ -23,3 +26,15 @@ class BreakoutStrategy:
             return "sell"
         else:
             return None
+
+    def generate_signal_series(self, df: pd.DataFrame) -> pd.Series:
+        """
+        Señal de cada vela del histórico en una sola pasada vectorizada.
+        El valor de la fila i coincide con generate_signal(df.iloc[:i+1]).
+        """
+        # Rango de las N velas anteriores (sin incluir la actual)
+        max_range = df['high'].shift(1).rolling(self.period).max()
+        min_range = df['low'].shift(1).rolling(self.period).min()
+        last_close = df['close']
+
+        return to_signal_series(last_close > max_range, last_close < min_range, df.index)
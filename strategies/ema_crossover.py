@@ -1,18 +1,35 @@
+from indicators.signals import to_signal_series
+from indicators.cache import FeatureCache
+
+
 class EMACrossoverStrategy:
     def __init__(self, fast=12, slow=26):
         self.fast = fast
         self.slow = slow
+        self._features = FeatureCache()
 
-    def generate_signal(self, df):
-        df['ema_fast'] = df['close'].ewm(span=self.fast, adjust=False).mean()
-        df['ema_slow'] = df['close'].ewm(span=self.slow, adjust=False).mean()
-
-        df['prev_fast'] = df['ema_fast'].shift(1)
-        df['prev_slow'] = df['ema_slow'].shift(1)
+    def generate_signal(self, df, features=None):
+        # Indicadores compartidos del ciclo (StrategyManager); si no hay, caché propia
+        features = features or self._features.begin_cycle(df)
+        prev_fast, ema_fast = features.ema(self.fast)
+        prev_slow, ema_slow = features.ema(self.slow)
 
-        last = df.iloc[-1]
-        if last['prev_fast'] < last['prev_slow'] and last['ema_fast'] > last['ema_slow']:
+        if prev_fast < prev_slow and ema_fast > ema_slow:
             return 'BUY'
-        elif last['prev_fast'] > last['prev_slow'] and last['ema_fast'] < last['ema_slow']:
+        elif prev_fast > prev_slow and ema_fast < ema_slow:
             return 'SELL'
         return None
+
+    def generate_signal_series(self, df):
+        """
+        Señal de cada vela del histórico en una sola pasada vectorizada.
+        El valor de la fila i coincide con generate_signal(df.iloc[:i+1]).
+        """
+        ema_fast = df['close'].ewm(span=self.fast, adjust=False).mean()
+        ema_slow = df['close'].ewm(span=self.slow, adjust=False).mean()
+        prev_fast = ema_fast.shift(1)
+        prev_slow = ema_slow.shift(1)
+
+        buy = (prev_fast < prev_slow) & (ema_fast > ema_slow)
+        sell = (prev_fast > prev_slow) & (ema_fast < ema_slow)
+        return to_signal_series(buy, sell, df.index, 'BUY', 'SELL')
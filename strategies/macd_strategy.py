@@ -2,6 +2,9 @@
 
 import pandas as pd
 
+from indicators.signals import to_signal_series
+from indicators.cache import FeatureCache
+
 class MACDStrategy:
     """
     Estrategia MACD (Moving Average Convergence Divergence)
@@ -14,6 +17,7 @@ class MACDStrategy:
         self.fast_period = fast_period
         self.slow_period = slow_period
         self.signal_period = signal_period
+        self._features = FeatureCache()
 
     def calculate_macd(self, df):
         """Calcula las columnas MACD, Signal y Histogram en el dataframe"""
@@ -24,19 +28,18 @@ class MACDStrategy:
         df["Hist"] = df["MACD"] - df["Signal"]
         return df
 
-    def generate_signal(self, df: pd.DataFrame) -> str | None:
+    def generate_signal(self, df: pd.DataFrame, features: FeatureCache | None = None) -> str | None:
         """
         Devuelve 'buy', 'sell' o None según el cruce de MACD y Signal.
         """
-        df = self.calculate_macd(df)
-
         if len(df) < 2:
             return None
 
-        prev_macd = df["MACD"].iloc[-2]
-        prev_signal = df["Signal"].iloc[-2]
-        curr_macd = df["MACD"].iloc[-1]
-        curr_signal = df["Signal"].iloc[-1]
+        # Indicadores compartidos del ciclo (StrategyManager); si no hay, caché propia
+        features = features or self._features.begin_cycle(df)
+        macd, signal = features.macd(self.fast_period, self.slow_period, self.signal_period)
+        prev_macd, curr_macd = macd
+        prev_signal, curr_signal = signal
 
         if prev_macd < prev_signal and curr_macd > curr_signal:
             return "buy"
@@ -44,3 +47,19 @@ class MACDStrategy:
             return "sell"
         else:
             return None
+
+    def generate_signal_series(self, df: pd.DataFrame) -> pd.Series:
+        """
+        Señal de cada vela del histórico en una sola pasada vectorizada.
+        El valor de la fila i coincide con generate_signal(df.iloc[:i+1]).
+        """
+        ema_fast = df["close"].ewm(span=self.fast_period, adjust=False).mean()
+        ema_slow = df["close"].ewm(span=self.slow_period, adjust=False).mean()
+        macd = ema_fast - ema_slow
+        signal = macd.ewm(span=self.signal_period, adjust=False).mean()
+        prev_macd = macd.shift(1)
+        prev_signal = signal.shift(1)
+
+        buy = (prev_macd < prev_signal) & (macd > signal)
+        sell = (prev_macd > prev_signal) & (macd < signal)
+        return to_signal_series(buy, sell, df.index)
@@ -1,24 +1,43 @@
+import numpy as np
 import pandas as pd
 
+from indicators.signals import to_signal_series
+
 class PriceActionStrategy:
     """
     Detecta patrón de vela envolvente simple.
     """
-    def generate_signal(self, df: pd.DataFrame) -> str | None:
+    def generate_signal(self, df: pd.DataFrame, features=None) -> str | None:
         if len(df) < 2:
             return None
 
-        prev = df.iloc[-2]
-        curr = df.iloc[-1]
+        prev_open, curr_open = np.asarray(df['open'])[-2:]
+        prev_close, curr_close = np.asarray(df['close'])[-2:]
 
         # Vela envolvente alcista: cuerpo actual envuelve cuerpo anterior y cierra arriba
-        if curr['close'] > curr['open'] and prev['close'] < prev['open'] \
-            and curr['open'] < prev['close'] and curr['close'] > prev['open']:
+        if curr_close > curr_open and prev_close < prev_open \
+            and curr_open < prev_close and curr_close > prev_open:
             return "buy"
 
         # Vela envolvente bajista
-        if curr['close'] < curr['open'] and prev['close'] > prev['open'] \
-            and curr['open'] > prev['close'] and curr['close'] < prev['open']:
+        if curr_close < curr_open and prev_close > prev_open \
+            and curr_open > prev_close and curr_close < prev_open:
             return "sell"
 
         return None
+
+    def generate_signal_series(self, df: pd.DataFrame) -> pd.Series:
+        """
+        Señal de cada vela del histórico en una sola pasada vectorizada.
+        El valor de la fila i coincide con generate_signal(df.iloc[:i+1]).
+        """
+        prev_open = df['open'].shift(1)
+        prev_close = df['close'].shift(1)
+        curr_open = df['open']
+        curr_close = df['close']
+
+        buy = (curr_close > curr_open) & (prev_close < prev_open) \
+            & (curr_open < prev_close) & (curr_close > prev_open)
+        sell = (curr_close < curr_open) & (prev_close > prev_open) \
+            & (curr_open > prev_close) & (curr_close < prev_open)
+        return to_signal_series(buy, sell, df.index)
@@ -1,10 +1,30 @@
+from indicators.signals import to_signal_series
+from indicators.cache import FeatureCache
+
+
 class RSIStrategy:
     def __init__(self, period=14, overbought=70, oversold=30):
         self.period = period
         self.overbought = overbought
         self.oversold = oversold
+        self._features = FeatureCache()
+
+    def generate_signal(self, df, features=None):
+        # Indicadores compartidos del ciclo (StrategyManager); si no hay, caché propia
+        features = features or self._features.begin_cycle(df)
+        last_rsi = features.rsi(self.period)[-1]
+
+        if last_rsi < self.oversold:
+            return 'BUY'
+        elif last_rsi > self.overbought:
+            return 'SELL'
+        return None
 
-    def generate_signal(self, df):
+    def generate_signal_series(self, df):
+        """
+        Señal de cada vela del histórico en una sola pasada vectorizada.
+        El valor de la fila i coincide con generate_signal(df.iloc[:i+1]).
+        """
         delta = df['close'].diff()
         gain = delta.clip(lower=0)
         loss = -delta.clip(upper=0)
@@ -12,10 +32,5 @@ class RSIStrategy:
         avg_loss = loss.rolling(self.period).mean()
         rs = avg_gain / avg_loss
         rsi = 100 - (100 / (1 + rs))
-        last_rsi = rsi.iloc[-1]
 
-        if last_rsi < self.oversold:
-            return 'BUY'
-        elif last_rsi > self.overbought:
-            return 'SELL'
-        return None
+        return to_signal_series(rsi < self.oversold, rsi > self.overbought, df.index, 'BUY', 'SELL')
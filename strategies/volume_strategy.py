@@ -1,5 +1,8 @@
+import numpy as np
 import pandas as pd
 
+from indicators.signals import to_signal_series
+
 class VolumeStrategy:
     """
     Confirma señales con volumen alto (simplificado).
@@ -7,18 +10,34 @@ class VolumeStrategy:
     def __init__(self, volume_threshold=1.5):
         self.volume_threshold = volume_threshold
 
-    def generate_signal(self, df: pd.DataFrame) -> str | None:
+    def generate_signal(self, df: pd.DataFrame, features=None) -> str | None:
         if len(df) < 2:
             return None
 
-        curr_volume = df.iloc[-1]['volume']
-        avg_volume = df['volume'][-20:].mean()
+        volume = np.asarray(df['volume'])
+        prev_close, curr_close = np.asarray(df['close'])[-2:]
+        curr_volume = volume[-1]
+        avg_volume = volume[-20:].mean()
 
         if curr_volume > avg_volume * self.volume_threshold:
             # Retorna señal 'buy' o 'sell' según tendencia del precio
-            if df.iloc[-1]['close'] > df.iloc[-2]['close']:
+            if curr_close > prev_close:
                 return "buy"
-            elif df.iloc[-1]['close'] < df.iloc[-2]['close']:
+            elif curr_close < prev_close:
                 return "sell"
 
         return None
+
+    def generate_signal_series(self, df: pd.DataFrame) -> pd.Series:
+        """
+        Señal de cada vela del histórico en una sola pasada vectorizada.
+        El valor de la fila i coincide con generate_signal(df.iloc[:i+1]).
+        """
+        # generate_signal promedia las últimas 20 velas disponibles (incluida la actual)
+        avg_volume = df['volume'].rolling(20, min_periods=1).mean()
+        high_volume = df['volume'] > avg_volume * self.volume_threshold
+        prev_close = df['close'].shift(1)
+
+        buy = high_volume & (df['close'] > prev_close)
+        sell = high_volume & (df['close'] < prev_close)
+        return to_signal_series(buy, sell, df.index)
@@ -1,28 +1,111 @@
+import importlib
+
+import numpy as np
+import pandas as pd
+
 from decider.decider import Decider
+from indicators.cache import FeatureCache
+from metrics import METRICS
+from profiler import PROFILER
+
+
+# Registro de estrategias: nombre -> "módulo:clase". El módulo se importa
+# recién cuando se pide la estrategia, así que un bot configurado con unas
+# pocas no paga el import de las demás al arrancar
+STRATEGIES = {
+    "EMACrossoverStrategy": "strategies.ema_crossover:EMACrossoverStrategy",
+    "RSIStrategy": "strategies.rsi_strategy:RSIStrategy",
+    "MACDStrategy": "strategies.macd_strategy:MACDStrategy",
+    "BollingerStrategy": "strategies.bollinger_strategy:BollingerStrategy",
+    "ADXStrategy": "strategies.adx_strategy:ADXStrategy",
+    "BreakoutStrategy": "strategies.breakout_strategy:BreakoutStrategy",
+    "PriceActionStrategy": "strategies.price_action_strategy:PriceActionStrategy",
+    "VolumeStrategy": "strategies.volume_strategy:VolumeStrategy",
+}
+
+
+def load_strategy(name):
+    """Clase de la estrategia registrada como `name` (importa su módulo la primera vez)."""
+    if name not in STRATEGIES:
+        raise ValueError(f"Estrategia desconocida: {name} (disponibles: {', '.join(STRATEGIES)})")
+    module, _, cls = STRATEGIES[name].partition(":")
+    return getattr(importlib.import_module(module), cls)
+
+
+def default_strategies(names=None):
+    """
+    Instancias nuevas del set de estrategias con el que opera el bot: todas
+    las registradas, o sólo `names` (en ese orden).
+    """
+    return [load_strategy(name)() for name in (names or STRATEGIES)]
+
+
+def normalize_signal(signal):
+    """'BUY' / 'Sell' -> 'buy' / 'sell' (algunas estrategias devuelven mayúsculas); el resto no cambia."""
+    return signal.lower() if isinstance(signal, str) and signal.lower() in ("buy", "sell") else signal
+
 
 class StrategyManager:
-    def __init__(self, strategies):
+    def __init__(self, strategies, trader=None, decider=None):
         self.strategies = strategies
+        self.trader = trader  # Trader del símbolo, para cerrar posiciones al cambiar la señal
         self.last_signal = None
-        self.decider = Decider()
+        self.decider = decider if decider is not None else Decider()
+        self.features = FeatureCache()
+        self.decider.bind(self.features)  # un ModelDecider lee los indicadores ya calculados
+        self.symbol = getattr(trader, "symbol", "")
 
     def generate_signals(self, df):
+        # Cada indicador se calcula una sola vez por ciclo y se comparte
+        # entre estrategias como arrays de sólo lectura
+        self.features.begin_cycle(df)
         signals = {}
         for strat in self.strategies:
             try:
                 name = strat.__class__.__name__
-                signals[name] = strat.generate_signal(df)
+                with METRICS.timer("strategy", symbol=self.symbol, strategy=name), PROFILER.strategy(name):
+                    signals[name] = strat.generate_signal(df, self.features)
             except Exception as e:
                 signals[name] = f"⚠️ Error: {e}"
         return signals
 
+    def generate_signal_table(self, df):
+        """
+        Señales de todas las estrategias para cada vela del histórico, en una
+        pasada vectorizada por estrategia. La fila i equivale a lo que
+        devolvería generate_signals(df.iloc[:i+1]).
+        """
+        columns = {}
+        for strat in self.strategies:
+            name = strat.__class__.__name__
+            try:
+                columns[name] = strat.generate_signal_series(df)
+            except Exception as e:
+                columns[name] = pd.Series(f"⚠️ Error: {e}", index=df.index, dtype=object)
+        return pd.DataFrame(columns, index=df.index)
+
     def resolve_signal(self, signals, df):
-        # Solo pasamos señales válidas (buy/sell/None) al Decider
+        # Solo pasamos señales válidas (buy/sell/None, sin importar mayúsculas) al Decider
         filtered_signals = {
-            k: v for k, v in signals.items()
-            if v in ["buy", "sell", None]
+            k: normalize_signal(v) for k, v in signals.items()
+            if normalize_signal(v) in ["buy", "sell", None]
         }
-        return self.decider.decide(filtered_signals, df)
+        with METRICS.timer("decide", symbol=self.symbol):
+            return self.decider.decide(filtered_signals, df)
+
+    def resolve_signal_table(self, table, df):
+        """
+        resolve_signal para todas las filas de generate_signal_table(df) de
+        una vez (backtests). Las señales se normalizan y las inválidas se
+        descartan igual que en resolve_signal.
+        """
+        # Se normaliza cada valor distinto una sola vez (hay pocos) y se expande con los códigos
+        codes, uniques = pd.factorize(table.to_numpy(dtype=object).ravel())
+        normalized = [normalize_signal(v) for v in uniques]
+        normalized = np.array([v if v in ("buy", "sell") else None for v in normalized] + [None], dtype=object)
+        table = pd.DataFrame(normalized[codes].reshape(table.shape), index=table.index, columns=table.columns,
+                             dtype=object)
+        return self.decider.decide_batch(table, df)
 
     def should_trade(self, new_signal):
         if new_signal and new_signal != self.last_signal:
@@ -31,7 +114,21 @@ class StrategyManager:
         return False
 
     def close_on_signal_change(self, new_signal):
+        """Cierra la posición anterior si cambió la señal. Devuelve True si intentó cerrar."""
         if new_signal != self.last_signal and self.last_signal is not None:
-            from trader import Trader
+            if self.trader is None:
+                print("⚠️ StrategyManager sin Trader: no se puede cerrar la posición anterior.")
+                return False
             print("🔁 Señal cambiada, cerrando posición anterior...")
-            Trader().close_positions()
+            self.trader.close_positions()
+            return True
+        return False
+
+    # === Checkpoint entre reinicios ===
+    def state(self):
+        """Última señal e indicadores incrementales, para retomar sin recalcular la historia."""
+        return {"last_signal": self.last_signal, "features": self.features.state()}
+
+    def restore(self, state):
+        self.features.restore(state["features"])
+        self.last_signal = state["last_signal"]
@@ -0,0 +1,23 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+from backtest import mt5_sim
+
+# MetaTrader5 sólo existe en Windows y los tests nunca hablan con un terminal:
+# se registra el simulador como módulo `MetaTrader5` antes de importar los
+# módulos del bot (trader, data_fetcher...), con unas velas cualquiera
+_bars = pd.DataFrame({
+    "time": pd.date_range("2024-01-01", periods=400, freq="5min"),
+    "open": np.full(400, 1.35),
+    "high": np.full(400, 1.3502),
+    "low": np.full(400, 1.3498),
+    "close": np.full(400, 1.35),
+    "volume": np.full(400, 100),
+})
+mt5_sim.install({"USDCAD": _bars})
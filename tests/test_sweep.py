@@ -0,0 +1,85 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+from backtest.sweep import ParameterSweep
+from strategies.ema_crossover import EMACrossoverStrategy
+
+
+def synthetic_bars(n=3000, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 1.35 + np.cumsum(rng.normal(0, 0.0003, n))
+    open_ = np.r_[close[0], close[:-1]]
+    return pd.DataFrame({
+        "time": pd.date_range("2024-01-01", periods=n, freq="5min"),
+        "open": open_,
+        "high": np.maximum(open_, close) + rng.random(n) * 0.0003,
+        "low": np.minimum(open_, close) - rng.random(n) * 0.0003,
+        "close": close,
+        "volume": rng.integers(50, 500, n),
+    })
+
+
+class BiasStrategy:
+    """Compra siempre con bias > 0, vende siempre con bias < 0 (sin señal con 0)."""
+
+    def __init__(self, bias=0, period=1):
+        self.signal = "buy" if bias > 0 else "sell" if bias < 0 else None
+
+    def generate_signal(self, df, features=None):
+        return self.signal
+
+    def generate_signal_series(self, df):
+        return pd.Series(self.signal, index=df.index, dtype=object)
+
+
+def trending_bars(n=500):
+    # Tendencia alcista sin ruido: las compras llegan al TP y las ventas al SL
+    close = 1.35 + 0.0001 * np.arange(n)
+    return pd.DataFrame({
+        "time": pd.date_range("2024-01-01", periods=n, freq="5min"),
+        "open": close - 0.00005,
+        "high": close + 0.00002,
+        "low": close - 0.00007,
+        "close": close,
+        "volume": np.full(n, 100),
+    })
+
+
+def test_ema_crossover_sweep_trades(tmp_path):
+    # EMACrossoverStrategy emite 'BUY'/'SELL' en mayúsculas: tienen que llegar al Decider
+    sweep = ParameterSweep(EMACrossoverStrategy, {"fast": [5, 10], "slow": [20, 30]},
+                           results_path=str(tmp_path / "sweep.csv"), workers=1)
+    results = sweep.run(synthetic_bars())
+    assert len(results) == 4
+    assert (results["trades"] > 0).all()
+
+
+def test_coarse_grid_skips_losing_regions(tmp_path):
+    grid = {"fast": [3, 4, 5, 6, 7], "slow": [20, 25, 30]}
+    sweep = ParameterSweep(EMACrossoverStrategy, grid, results_path=str(tmp_path / "sweep.csv"),
+                           workers=1, coarse_step=2)
+    results = sweep.run(synthetic_bars())
+    assert len(results) + sweep.skipped == 15
+    coarse = results[results["fast"].isin([3, 5, 7]) & results["slow"].isin([20, 30])]
+    assert len(coarse) == 6
+
+
+def test_coarse_grid_prunes_known_losing_region(tmp_path):
+    # Grilla gruesa bias = -4, -2, 0, 2, 4: todo bias <= 0 pierde o no opera,
+    # así que las combinaciones finas bias = -3 y -1 caen en celdas perdedoras
+    grid = {"bias": [-4, -3, -2, -1, 0, 1, 2, 3, 4], "period": [1, 3]}
+    sweep = ParameterSweep(BiasStrategy, grid, results_path=str(tmp_path / "sweep.csv"),
+                           workers=1, coarse_step=2)
+    results = sweep.run(trending_bars())
+
+    evaluated = set(results["bias"])
+    assert evaluated == {-4, -2, 0, 1, 2, 3, 4}
+    assert sweep.skipped == 2 * 2
+    assert (results.loc[results["bias"] > 0, "pnl"] > 0).all()
+    assert (results.loc[results["bias"] < 0, "pnl"] < 0).all()
@@ -0,0 +1,157 @@
+import time
+from collections import deque
+
+import MetaTrader5 as mt5
+import numpy as np
+
+from data_fetcher import BAR_DTYPE
+from scheduler import TIMEFRAME_SECONDS, Event
+
+
+class TickBarBuilder:
+    """
+    Construye velas OHLCV en memoria a partir de ticks, sobre el mismo
+    BarBuffer que usa DataFetcher. Como las velas de MT5, usa el precio bid y
+    cuenta ticks como volumen.
+    """
+
+    def __init__(self, buffer, timeframe=mt5.TIMEFRAME_M5, point=None):
+        self.buffer = buffer
+        self.period = TIMEFRAME_SECONDS[timeframe]
+        self.point = point
+
+    def on_ticks(self, ticks):
+        """
+        Incorpora un lote de ticks (ordenados por tiempo) y devuelve cuántas
+        velas quedaron cerradas por ellos.
+        """
+        ticks = ticks[ticks["bid"] > 0]
+        if len(ticks) == 0:
+            return 0
+
+        buckets = (ticks["time_msc"] // 1000 // self.period) * self.period
+        # Cortes donde cambia la vela dentro del lote
+        splits = np.flatnonzero(np.diff(buckets)) + 1
+        closed = 0
+        for bucket, segment in zip(buckets[np.r_[0, splits]], np.split(ticks, splits)):
+            bid = segment["bid"]
+            last = self.buffer.last()
+            last_time = None if last is None else int(last["time"].astype("int64"))
+
+            if last_time is not None and bucket < last_time:
+                continue  # ticks viejos, ya incluidos en la historia
+            if last_time == bucket:
+                last["high"] = max(last["high"], bid.max())
+                last["low"] = min(last["low"], bid.min())
+                last["close"] = bid[-1]
+                last["volume"] += len(segment)
+                last["spread"] = self._spread(segment)
+                self.buffer.replace_last(last)
+                continue
+
+            if last is not None:
+                closed += 1
+            bar = np.zeros(1, dtype=BAR_DTYPE)
+            bar["time"] = np.datetime64(int(bucket), "s")
+            bar["open"] = bid[0]
+            bar["high"] = bid.max()
+            bar["low"] = bid.min()
+            bar["close"] = bid[-1]
+            bar["volume"] = len(segment)
+            bar["spread"] = self._spread(segment)
+            self.buffer.append(bar)
+        return closed
+
+    def _spread(self, ticks):
+        if not self.point:
+            return 0
+        return int(round((ticks["ask"][-1] - ticks["bid"][-1]) / self.point))
+
+
+class TickStreamer:
+    """
+    Modo streaming: consume ticks de MT5 (copy_ticks_from desde el último tick
+    visto) y actualiza las velas en memoria. En cada poll devuelve eventos:
+
+    - "bar_close" cuando los ticks abren una vela nueva, con la hora de
+      cierre de la vela (así since_bar_close incluye la demora en detectarlo).
+    - el nombre de un disparador intravela cuando éste devuelve una señal
+      (se dispara una sola vez por vela y señal).
+
+    Los ticks recientes se guardan en un deque acotado a `max_ticks`. Varios
+    ticks pueden compartir milisegundo: se recuerda cuántos del último
+    milisegundo ya se procesaron para no perder los que lleguen después.
+    """
+
+    def __init__(self, symbol, fetcher, max_ticks=10_000, poll_interval=0.05, clock=time.time):
+        self.symbol = symbol
+        self.clock = clock
+        self.fetcher = fetcher
+        self.max_ticks = max_ticks
+        self.poll_interval = poll_interval
+        info = mt5.symbol_info(symbol)
+        self.builder = TickBarBuilder(fetcher.buffer, fetcher.timeframe, info.point if info else None)
+        self.ticks = deque(maxlen=max_ticks)
+        self.triggers = {}
+        self._fired = {}
+        self._last_msc = None
+        self._seen_at_last = None  # ticks ya procesados con time_msc == _last_msc (None: todos)
+
+    def add_trigger(self, name, trigger):
+        """`trigger(bars)` devuelve una señal ('buy'/'sell'...) o None."""
+        self.triggers[name] = trigger
+
+    def bars(self):
+        return self.fetcher.buffer.view()
+
+    def start(self):
+        """Carga la historia de velas y fija el punto de partida de los ticks."""
+        self.fetcher.refresh()
+        tick = mt5.symbol_info_tick(self.symbol)
+        if tick is None:
+            raise RuntimeError(f"❌ No se pudo obtener el último tick de {self.symbol}: {mt5.last_error()}")
+        self._last_msc = tick.time_msc
+        self._seen_at_last = None
+
+    def poll(self):
+        """Lee los ticks nuevos, actualiza las velas y devuelve los eventos resultantes."""
+        if self._last_msc is None:
+            self.start()
+
+        ticks = mt5.copy_ticks_from(self.symbol, self._last_msc // 1000, self.max_ticks, mt5.COPY_TICKS_ALL)
+        if ticks is None or len(ticks) == 0:
+            return []
+        times = ticks["time_msc"]
+        if self._seen_at_last is None:
+            first = np.searchsorted(times, self._last_msc, side="right")
+        else:
+            first = np.searchsorted(times, self._last_msc, side="left") + self._seen_at_last
+        ticks = ticks[first:]
+        if len(ticks) == 0:
+            return []
+
+        received = self.clock()
+        last_msc = int(ticks["time_msc"][-1])
+        at_last = int(np.count_nonzero(ticks["time_msc"] == last_msc))
+        if last_msc == self._last_msc:
+            at_last += self._seen_at_last or 0
+        self._last_msc, self._seen_at_last = last_msc, at_last
+        self.ticks.extend(ticks)
+
+        if self.builder.on_ticks(ticks):
+            # La vela anterior cerró cuando abrió la nueva (la última del buffer). Las
+            # horas de MT5 son del servidor: el desfase (múltiplo de 30 min) se
+            # estima con el último tick para pasar el cierre al reloj local
+            bar_time = int(self.bars()["time"][-1].astype("int64"))
+            server_offset = round((last_msc / 1000 - received) / 1800) * 1800
+            return [Event("bar_close", bar_time - server_offset)]
+
+        events = []
+        bars = self.bars()
+        bar_time = bars["time"][-1]
+        for name, trigger in self.triggers.items():
+            signal = trigger(bars)
+            if signal and self._fired.get(name) != (bar_time, signal):
+                self._fired[name] = (bar_time, signal)
+                events.append(Event(name, received, signal))
+        return events
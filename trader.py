@@ -1,9 +1,17 @@
 import MetaTrader5 as mt5
 
+from execution import OrderExecutor
+from metrics import METRICS
+
 class Trader:
-    def __init__(self, symbol):
+    def __init__(self, symbol, broker=mt5, book=None):
+        # `broker` es el módulo MetaTrader5 o algo con su misma interfaz (ej: SimulatedBroker)
+        self.mt5 = broker
         self.symbol = symbol
-        self.symbol_info = mt5.symbol_info(symbol)
+        self.book = book  # PositionBook compartido (opcional): posiciones en memoria
+        self.symbol_info = broker.symbol_info(symbol)
+        # Modo de llenado cacheado, plantillas de requests y registro de slippage/latencia
+        self.executor = OrderExecutor(broker, symbol, self.symbol_info)
 
     def calculate_volume(self, capital, risk_pct, sl_pips):
         point = self.symbol_info.point
@@ -14,50 +22,21 @@ class Trader:
         return round(volume, 2)
 
     def send_order(self, direction, volume, sl_pips, tp_pips):
-        tick = mt5.symbol_info_tick(self.symbol)
-        price = tick.ask if direction == 'BUY' else tick.bid
-        point = self.symbol_info.point
-
-        sl = price - sl_pips * point if direction == 'BUY' else price + sl_pips * point
-        tp = price + tp_pips * point if direction == 'BUY' else price - tp_pips * point
-        order_type = mt5.ORDER_TYPE_BUY if direction == 'BUY' else mt5.ORDER_TYPE_SELL
-
-        for mode in [mt5.ORDER_FILLING_RETURN, mt5.ORDER_FILLING_IOC, mt5.ORDER_FILLING_FOK]:
-            request = {
-                "action": mt5.TRADE_ACTION_DEAL,
-                "symbol": self.symbol,
-                "volume": volume,
-                "type": order_type,
-                "price": price,
-                "sl": sl,
-                "tp": tp,
-                "type_time": mt5.ORDER_TIME_GTC,
-                "type_filling": mode
-            }
-            result = mt5.order_send(request)
-            if result.retcode in [mt5.TRADE_RETCODE_DONE, mt5.TRADE_RETCODE_PLACED]:
-                print(f"✅ Orden enviada ({direction}) con SL/TP")
-                return result
-            else:
-                print(f"❌ Error modo {mode} - {result.retcode} | {result.comment}")
-        return None
+        with METRICS.timer("send_order", symbol=self.symbol):
+            result = self.executor.open(direction, volume, sl_pips, tp_pips)
+        if result is not None:
+            print(f"✅ Orden enviada ({direction}) con SL/TP")
+            if self.book is not None:
+                self.book.apply_result(result)
+        return result
 
     def close_positions(self):
-        positions = mt5.positions_get(symbol=self.symbol)
-        for pos in positions:
-            opposite_type = mt5.ORDER_TYPE_SELL if pos.type == mt5.ORDER_TYPE_BUY else mt5.ORDER_TYPE_BUY
-            tick = mt5.symbol_info_tick(pos.symbol)
-            price = tick.bid if opposite_type == mt5.ORDER_TYPE_SELL else tick.ask
-
-            close_request = {
-                "action": mt5.TRADE_ACTION_DEAL,
-                "position": pos.ticket,
-                "symbol": pos.symbol,
-                "volume": pos.volume,
-                "type": opposite_type,
-                "price": price,
-                "type_time": mt5.ORDER_TIME_GTC,
-                "type_filling": mt5.ORDER_FILLING_FOK
-            }
-            result = mt5.order_send(close_request)
-            print(f"🔁 Cierre {pos.symbol} - Retcode: {result.retcode}")
+        if self.book is not None:
+            positions = self.book.positions(self.symbol)
+        else:
+            positions = self.mt5.positions_get(symbol=self.symbol)
+        for pos in positions or ():
+            result = self.executor.close(pos)
+            if result is not None and self.book is not None:
+                self.book.apply_result(result)
+            print(f"🔁 Cierre {pos.symbol} - {'OK' if result is not None else 'falló'}")